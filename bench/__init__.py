@@ -0,0 +1,93 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2014-2017 Susam Pal
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Benchmarks for ice.
+
+Each benchmark suite is a module in this package with a run() function
+that accepts the parsed command line arguments and returns a list of
+results. Every result is a dictionary of plain values, so that the
+results of all suites can be written as a single JSON document and
+compared across runs to catch performance regressions.
+"""
+
+
+import time
+
+
+def measure(func, number, max_time):
+    """Call a function repeatedly and return timing statistics.
+
+    The function is called without arguments *number* times or until
+    *max_time* seconds have elapsed, whichever happens first, but at
+    least once.
+
+    Arguments:
+      func (callable): Function to call.
+      number (int): Maximum number of calls.
+      max_time (float): Maximum time to spend in seconds.
+
+    Returns:
+      dict: Number of calls, throughput in calls per second, and mean
+      and percentile latencies of a call in microseconds.
+    """
+    timer = time.perf_counter
+    latencies = []
+    start = timer()
+    deadline = start + max_time
+    while True:
+        t0 = timer()
+        func()
+        t1 = timer()
+        latencies.append(t1 - t0)
+        if len(latencies) >= number or t1 >= deadline:
+            break
+    elapsed = timer() - start
+
+    latencies.sort()
+    return {
+        'calls': len(latencies),
+        'ops_per_sec': round(len(latencies) / elapsed, 1),
+        'mean_us': round(sum(latencies) / len(latencies) * 1e6, 3),
+        'p50_us': round(percentile(latencies, 50) * 1e6, 3),
+        'p90_us': round(percentile(latencies, 90) * 1e6, 3),
+        'p99_us': round(percentile(latencies, 99) * 1e6, 3),
+        'max_us': round(latencies[-1] * 1e6, 3),
+    }
+
+
+def percentile(values, p):
+    """Return the p-th percentile of sorted values.
+
+    The nearest-rank method is used, so the returned value is always
+    one of the values.
+
+    Arguments:
+      values (list): Sorted list of numbers.
+      p (float): Percentile between 0 and 100.
+
+    Returns:
+      float: The p-th percentile of the values.
+    """
+    rank = max(1, -(-len(values) * p // 100))
+    return values[int(rank) - 1]
@@ -0,0 +1,82 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2014-2017 Susam Pal
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Run benchmarks and write the results as a JSON document.
+
+Usage: python3 -m bench [-h] [--sizes SIZES [SIZES ...]] [--number NUMBER]
+                        [--max-time MAX_TIME] [--output OUTPUT]
+                        [suite [suite ...]]
+"""
+
+
+import argparse
+import json
+import platform
+import sys
+
+import ice
+from bench import form
+from bench import multidict
+from bench import router
+
+
+suites = {
+    'form': form.run,
+    'multidict': multidict.run,
+    'router': router.run,
+}
+
+parser = argparse.ArgumentParser(prog='python3 -m bench',
+                                 description='Run ice benchmarks.')
+parser.add_argument('suite', nargs='*',
+                    help='benchmark suites to run: {} (default: all)'
+                         .format(', '.join(sorted(suites))))
+parser.add_argument('--sizes', type=int, nargs='+',
+                    help='numbers of routes, fields or parameters to '
+                         'benchmark with (default: depends on suite)')
+parser.add_argument('--number', type=int, default=1000,
+                    help='maximum number of calls per benchmark')
+parser.add_argument('--max-time', type=float, default=0.5,
+                    help='maximum seconds to spend per benchmark')
+parser.add_argument('--output', type=argparse.FileType('w'),
+                    default=sys.stdout,
+                    help='file to write the JSON document to '
+                         '(default: standard output)')
+args = parser.parse_args()
+for name in args.suite:
+    if name not in suites:
+        parser.error('unknown suite: {}'.format(name))
+
+results = []
+for name in args.suite or sorted(suites):
+    results.extend(suites[name](args))
+
+document = {
+    'ice': ice.__version__,
+    'python': platform.python_version(),
+    'implementation': platform.python_implementation(),
+    'results': results,
+}
+json.dump(document, args.output, indent=2)
+args.output.write('\n')
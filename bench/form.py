@@ -0,0 +1,114 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2014-2017 Susam Pal
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Benchmarks for parsing application/x-www-form-urlencoded bodies.
+
+The form parser of class Request is compared with cgi.FieldStorage,
+which Request used to parse such bodies. The cgi module is not
+available from Python 3.13 onwards, so the comparison is skipped there.
+"""
+
+
+import io
+import warnings
+
+import ice
+from bench import measure
+
+try:
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', DeprecationWarning)
+        import cgi
+except ImportError:
+    cgi = None
+
+
+sizes = [10, 100, 1000, 10000]
+
+
+def body(size):
+    """Return a form body with the specified number of fields.
+
+    Arguments:
+      size (int): Number of fields.
+
+    Returns:
+      bytes: Form body.
+    """
+    return '&'.join('field{0}=value+{0}%21'.format(i)
+                    for i in range(size)).encode()
+
+
+def parse_with_ice(data):
+    """Parse form body with class Request."""
+    environ = {
+        'REQUEST_METHOD': 'POST',
+        'CONTENT_TYPE': 'application/x-www-form-urlencoded',
+        'CONTENT_LENGTH': str(len(data)),
+        'wsgi.input': io.BytesIO(data),
+    }
+    return ice.Request(environ).form
+
+
+def parse_with_cgi(data):
+    """Parse form body with cgi.FieldStorage."""
+    environ = {
+        'REQUEST_METHOD': 'POST',
+        'CONTENT_TYPE': 'application/x-www-form-urlencoded',
+        'CONTENT_LENGTH': str(len(data)),
+    }
+    form = ice.MultiDict()
+    fs = cgi.FieldStorage(fp=io.BytesIO(data), environ=environ)
+    for k in fs:
+        for v in fs.getlist(k):
+            form[k] = v
+    return form
+
+
+def run(args):
+    """Run form parsing benchmarks.
+
+    Arguments:
+      args (argparse.Namespace): Parsed command line arguments.
+
+    Returns:
+      list: List of results.
+    """
+    parsers = [('ice', parse_with_ice)]
+    if cgi is not None:
+        parsers.append(('cgi', parse_with_cgi))
+    results = []
+    for size in args.sizes or sizes:
+        data = body(size)
+        for parser, parse in parsers:
+            stats = measure(lambda: parse(data), args.number, args.max_time)
+            result = {
+                'suite': 'form',
+                'parser': parser,
+                'fields': size,
+                'bytes': len(data),
+            }
+            result.update(stats)
+            results.append(result)
+    return results
@@ -0,0 +1,115 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2014-2017 Susam Pal
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Benchmarks for class MultiDict.
+
+Query strings with various numbers of parameters are parsed and the
+time taken to build the dictionary of parameters is measured with
+class MultiDict and with a dictionary built on collections.UserDict
+one item at a time, which is how MultiDict used to be implemented.
+The time taken by Request.query to parse the same query strings is
+measured too, both without and with a QueryCache.
+"""
+
+
+import collections
+import urllib.parse
+
+import ice
+from bench import measure
+
+
+sizes = [1, 10, 100]
+
+
+class UserDictMultiDict(collections.UserDict):
+
+    """Dictionary with multiple values for a key built on UserDict."""
+
+    def __setitem__(self, key, value):
+        if key not in self.data:
+            self.data[key] = [value]
+        else:
+            self.data[key].append(value)
+
+    def __getitem__(self, key):
+        return self.data[key][-1]
+
+
+def query_string(size):
+    """Return a query string with the specified number of parameters.
+
+    Arguments:
+      size (int): Number of parameters.
+
+    Returns:
+      str: Query string.
+    """
+    return '&'.join('p{0}=v{0}'.format(i) for i in range(size))
+
+
+def build_userdict(pairs):
+    """Build dictionary one item at a time with UserDictMultiDict."""
+    d = UserDictMultiDict()
+    for k, v in pairs:
+        d[k] = v
+    return d
+
+
+def parse_query(query, query_cache=None):
+    """Parse query string with Request.query."""
+    return ice.Request({'QUERY_STRING': query},
+                       query_cache=query_cache).query
+
+
+def run(args):
+    """Run MultiDict benchmarks.
+
+    Arguments:
+      args (argparse.Namespace): Parsed command line arguments.
+
+    Returns:
+      list: List of results.
+    """
+    results = []
+    for size in args.sizes or sizes:
+        query = query_string(size)
+        pairs = urllib.parse.parse_qsl(query)
+        query_cache = ice.QueryCache(1)
+        benchmarks = (
+            ('userdict', lambda: build_userdict(pairs)),
+            ('multidict', lambda: ice.MultiDict.from_pairs(pairs)),
+            ('request', lambda: parse_query(query)),
+            ('request-cached', lambda: parse_query(query, query_cache)),
+        )
+        for impl, func in benchmarks:
+            stats = measure(func, args.number, args.max_time)
+            result = {
+                'suite': 'multidict',
+                'impl': impl,
+                'params': size,
+            }
+            result.update(stats)
+            results.append(result)
+    return results
@@ -0,0 +1,107 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2014-2017 Susam Pal
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Benchmarks for class Router.
+
+Route tables of literal, wildcard and regex routes of various sizes are
+generated and the time taken to resolve three kinds of request paths is
+measured:
+
+  - hit: path that matches the most recently added route
+  - late: path that matches the earliest added route, i.e. the route
+    that a linear search tries last
+  - miss: path that matches no route
+
+Wildcard routes are measured with every router engine. Literal and
+regex routes do not depend on the engine and are measured with the
+default engine only.
+"""
+
+
+import ice
+from bench import measure
+
+
+sizes = [10, 100, 1000, 10000]
+
+
+def patterns(kind, size):
+    """Return route patterns and matching request paths.
+
+    Arguments:
+      kind (str): Kind of routes: 'literal', 'wildcard' or 'regex'.
+      size (int): Number of routes.
+
+    Returns:
+      tuple: List of route patterns and list of request paths such
+      that the i-th path matches the i-th pattern.
+    """
+    if kind == 'literal':
+        pattern = '/r{}/items'
+    elif kind == 'wildcard':
+        pattern = '/r{}/<:int>/<name>'
+    else:
+        pattern = r'^/r{}/(\d+)/([a-z]+)$'
+    paths = ['/r{}/items'.format(i) if kind == 'literal' else
+             '/r{}/42/foo'.format(i) for i in range(size)]
+    return [pattern.format(i) for i in range(size)], paths
+
+
+def run(args):
+    """Run router benchmarks.
+
+    Arguments:
+      args (argparse.Namespace): Parsed command line arguments.
+
+    Returns:
+      list: List of results.
+    """
+    results = []
+    for kind in ('literal', 'wildcard', 'regex'):
+        engines = ice.Router._engines if kind == 'wildcard' else ('linear',)
+        for engine in engines:
+            for size in args.sizes or sizes:
+                router = ice.Router(engine)
+                route_patterns, paths = patterns(kind, size)
+                for pattern in route_patterns:
+                    router.add('GET', pattern, None)
+                scenarios = (('hit', paths[-1]), ('late', paths[0]),
+                             ('miss', '/missing/42/foo'))
+                for scenario, path in scenarios:
+                    # Warm up, so that lazily built indexes are in place.
+                    router.resolve('GET', path)
+                    stats = measure(
+                        lambda: router.resolve('GET', path),
+                        args.number, args.max_time)
+                    result = {
+                        'suite': 'router',
+                        'kind': kind,
+                        'engine': engine,
+                        'routes': size,
+                        'scenario': scenario,
+                    }
+                    result.update(stats)
+                    results.append(result)
+    return results
+
@@ -36,15 +36,25 @@ __credits__ = ('Marcel Hellkamp, for writing bottle, the inspiration '
                'behind ice.')
 
 
+import codecs
 import collections
-import itertools
+import collections.abc
+import json
 import re
-import cgi
+import types
+import tempfile
 import urllib.parse
+import uuid
+import zlib
 import http.server
 import http.cookies
+import io
 import os
 import mimetypes
+import email.utils
+import stat
+import time
+import wsgiref.simple_server
 
 
 def cube():
@@ -97,13 +107,44 @@ class Ice:
 
     Each instance of this class is a single, distinct callable object
     that functions as WSGI application.
+
+    Attributes:
+      frozen (bool): ``True`` iff the application has been frozen with
+        :meth:`freeze`.
+      request_options (dict): Keyword arguments passed to
+        :class:`Request` for every request, e.g. ``max_part_size``.
+      max_body_size (int): Maximum size in bytes of the request body
+        for routes that do not specify their own limit or ``None`` for
+        no limit.
     """
 
-    def __init__(self):
-        """Initialize the application."""
-        self._router = Router()
+    def __init__(self, engine='linear', cache_size=0, auto_freeze=False,
+                 max_body_size=None, static_cache=None):
+        """Initialize the application.
+
+        Arguments:
+          engine (str, optional): Router engine used to resolve wildcard
+            routes. See :class:`Router` for the available engines.
+          cache_size (int, optional): Maximum number of resolved routes
+            to cache, defaults to ``0``, i.e. no caching.
+          auto_freeze (bool, optional): Freeze the application when it
+            handles its first request, defaults to ``False``.
+          max_body_size (int, optional): Maximum size in bytes of the
+            request body, defaults to ``None``, i.e. no limit.
+          static_cache (StaticCache, optional): Cache of files returned
+            by :meth:`static`, defaults to ``None``, i.e. no caching.
+        """
+        self._router = Router(engine, cache_size)
         self._server = None
         self._error_handlers = {}
+        self._error_callbacks = None
+        self._cache_control = {}
+        self._mounts = {}
+        self._auto_freeze = auto_freeze
+        self.frozen = False
+        self.request_options = {}
+        self.max_body_size = max_body_size
+        self.static_cache = static_cache
 
     def run(self, host='127.0.0.1', port=8080):
         """Run the application using a simple WSGI server.
@@ -112,8 +153,8 @@ class Ice:
           host (str, optional): Host on which to listen.
           port (int, optional): Port number on which to listen.
         """
-        from wsgiref import simple_server
-        self._server = simple_server.make_server(host, port, self)
+        self._server = wsgiref.simple_server.make_server(
+            host, port, self, handler_class=_RequestHandler)
         self._server.serve_forever()
 
     def exit(self):
@@ -132,40 +173,67 @@ class Ice:
         """
         return self._server is not None
 
-    def get(self, pattern):
+    def get(self, pattern, max_body_size=None):
         """Decorator to add route for an HTTP GET request.
 
         Arguments:
           pattern (str): Routing pattern the path must match.
+          max_body_size (int, optional): Maximum size in bytes of the
+            request body for this route.
 
         Returns:
           function: Decorator to add route for HTTP GET request.
         """
-        return self.route('GET', pattern)
+        return self.route('GET', pattern, max_body_size)
 
-    def post(self, pattern):
+    def post(self, pattern, max_body_size=None):
         """Decorator to add route for an HTTP POST request.
 
         Arguments:
           pattern (str): Routing pattern the path must match.
+          max_body_size (int, optional): Maximum size in bytes of the
+            request body for this route.
 
         Returns:
           function: Decorator to add route for HTTP POST request.
         """
-        return self.route('POST', pattern)
+        return self.route('POST', pattern, max_body_size)
 
-    def route(self, method, pattern):
+    def route(self, method, pattern, max_body_size=None):
         """Decorator to add route for a request with any HTTP method.
 
+        If *max_body_size* is specified, it overrides the
+        :attr:`max_body_size` of the application for requests resolved
+        to this route. The limit belongs to the route, not to the
+        decorated callback, so it does not apply to other routes of the
+        same callback. A request whose ``CONTENT_LENGTH``
+        exceeds the limit is answered with 413 without invoking the
+        callback. A request body of unknown length is counted while it
+        is read and reading it raises :exc:`RequestError` with status
+        413 as soon as it exceeds the limit.
+
         Arguments:
           method (str): HTTP method name, e.g. GET, POST, etc.
           pattern (str): Routing pattern the path must match.
+          max_body_size (int, optional): Maximum size in bytes of the
+            request body, defaults to ``None``, i.e. the limit of the
+            application applies.
 
         Returns:
           function: Decorator function to add route.
+
+        Raises:
+          LogicError: When the application is frozen.
         """
+        if self.frozen:
+            raise LogicError('Cannot add route to frozen application')
+
         def decorator(callback):
-            self._router.add(method, pattern, callback)
+            if max_body_size is None:
+                self._router.add(method, pattern, callback)
+            else:
+                self._router.add(method, pattern,
+                                 _RouteHandler(callback, max_body_size))
             return callback
         return decorator
 
@@ -187,12 +255,74 @@ class Ice:
 
         Returns:
           function: Decorator function to add error handler.
+
+        Raises:
+          LogicError: When the application is frozen.
         """
+        if self.frozen:
+            raise LogicError('Cannot add error handler to frozen '
+                             'application')
+
         def decorator(callback):
             self._error_handlers[status] = callback
             return callback
         return decorator
 
+    def mount(self, prefix, app):
+        """Mount a WSGI application under a path prefix.
+
+        The *prefix* must be a single path segment, e.g. ``'/admin'``.
+        Requests for the prefix or for any path under the prefix are
+        passed to *app* with the prefix moved from ``PATH_INFO`` to
+        ``SCRIPT_NAME`` in the environ. Such requests are never
+        resolved to the routes of this application. The *app* may be
+        another :class:`Ice` application with its own mounted
+        applications, so that deeper prefixes can be dispatched one
+        segment at a time.
+
+        Arguments:
+          prefix (str): Path segment under which to mount *app*.
+          app (callable): WSGI application.
+
+        Raises:
+          RouteError: When *prefix* is not a single path segment.
+          LogicError: When the application is frozen.
+        """
+        if self.frozen:
+            raise LogicError('Cannot mount application on frozen '
+                             'application')
+        segment = prefix.strip('/')
+        if not segment or '/' in segment:
+            raise RouteError('Invalid mount prefix {!r}'.format(prefix))
+        self._mounts[segment] = app
+
+    def freeze(self):
+        """Compile routes and error handlers into immutable tables.
+
+        After the application is frozen, the route tables cannot change,
+        the wildcard route indexes are built in advance and the error
+        handler for every HTTP response status code is looked up in
+        advance, so that handling a request never modifies these
+        tables. Calling :meth:`route`, :meth:`error` or :meth:`mount`
+        on a frozen application raises :exc:`ice.LogicError`. Mounted
+        :class:`Ice` applications are frozen too. Calling this method
+        on a frozen application does nothing.
+        """
+        if self.frozen:
+            return
+        self._router.freeze()
+        for app in self._mounts.values():
+            if isinstance(app, Ice):
+                app.freeze()
+        self._mounts = types.MappingProxyType(self._mounts)
+        self._cache_control = types.MappingProxyType(self._cache_control)
+        self._error_handlers = types.MappingProxyType(self._error_handlers)
+        fallback = self._error_handlers.get(None)
+        self._error_callbacks = types.MappingProxyType(
+            {status: self._error_handlers.get(status, fallback)
+             for status in Response._responses})
+        self.frozen = True
+
     def static(self, root, path, media_type=None, charset='UTF-8'):
         """Send content of a static file as response.
 
@@ -211,6 +341,32 @@ class Ice:
         is not specified or specified as ``None`` (the default), then it
         is guessed from the filename of the file to be returned.
 
+        The file is not read into memory. It is returned as a
+        :class:`FileBody` that the response sends with the
+        ``wsgi.file_wrapper`` of the WSGI server if there is one.
+
+        The ETag and Last-Modified headers of the response are derived
+        from the inode number, size and modification time of the file.
+        If a GET request has an If-None-Match header that matches the
+        ETag or, in the absence of If-None-Match, an If-Modified-Since
+        header that is not older than the modification time, status
+        code 304 is returned without opening the file. The Cache-Control
+        header set for *root* with :meth:`set_cache_control` is sent
+        with every response for a file.
+
+        The response advertises support for byte ranges with the
+        Accept-Ranges header. If a GET request has a valid Range header,
+        only the requested ranges of the file are sent with status code
+        206: a single range as the body and multiple ranges as a
+        ``multipart/byteranges`` body. If none of the ranges can be
+        satisfied, status code 416 is returned. A Range header is
+        ignored if the request has an If-Range header that does not
+        match the ETag or Last-Modified header.
+
+        If the application has a :attr:`static_cache`, small files are
+        read into the cache and later responses for them are served from
+        memory.
+
         Arguments:
           root (str): Path to document root directory.
           path (str): Path to file relative to document root directory.
@@ -218,7 +374,8 @@ class Ice:
           charset (str, optional): Character set of file.
 
         Returns:
-          bytes: Content of file to be returned in the HTTP response.
+          FileBody, iterator or int: File or multipart/byteranges body
+          to be returned in the HTTP response, or HTTP status code.
         """
         root = os.path.abspath(os.path.join(root, ''))
         path = os.path.abspath(os.path.join(root, path.lstrip('/\\')))
@@ -230,17 +387,117 @@ class Ice:
 
         if not path.startswith(root):
             return 403
-        elif not os.path.isfile(path):
-            return 404
+
+        cache = self.static_cache
+        entry = None if cache is None else cache.lookup(path)
+        if entry is None:
+            try:
+                st = os.stat(path)
+            except (OSError, ValueError):
+                return 404
+            if not stat.S_ISREG(st.st_mode):
+                return 404
+            if cache is not None and cache.fits(st.st_size):
+                entry = cache.load(path)
+
+        if entry is not None:
+            guessed_type = entry.media_type
+            etag = entry.etag
+            last_modified = entry.last_modified
+            mtime = entry.mtime
+            size = len(entry.content)
+        else:
+            guessed_type = mimetypes.guess_type(path)[0]
+            etag, last_modified = _file_validators(st)
+            mtime = int(st.st_mtime)
+            size = st.st_size
 
         if media_type is not None:
             self.response.media_type = media_type
         else:
-            self.response.media_type = mimetypes.guess_type(path)[0]
+            self.response.media_type = guessed_type
         self.response.charset = charset
 
-        with open(path, 'rb') as f:
-            return f.read()
+        self.response.add_header('ETag', etag)
+        self.response.add_header('Last-Modified', last_modified)
+        self.response.add_header('Cache-Control',
+                                 self._cache_control.get(root))
+        headers = self.request.headers
+        if self.request.method == 'GET' and _not_modified(
+                headers.get('If-None-Match'),
+                headers.get('If-Modified-Since'), etag, mtime):
+            return 304 # Not Modified
+
+        self.response.add_header('Accept-Ranges', 'bytes')
+        ranges = None
+        if (self.request.method == 'GET' and 'Range' in headers and
+                headers.get('If-Range', etag) in (etag, last_modified)):
+            ranges = _parse_range(headers['Range'], size)
+        if ranges is None:
+            if entry is not None:
+                return entry.content
+            return FileBody(open(path, 'rb'), size)
+        if not ranges:
+            self.response.add_header('Content-Range',
+                                     'bytes */{}'.format(size))
+            return 416 # Range Not Satisfiable
+
+        self.response.status = 206 # Partial Content
+        if len(ranges) == 1:
+            start, end = ranges[0]
+            self.response.add_header('Content-Range', 'bytes {}-{}/{}'
+                                     .format(start, end, size))
+            if entry is not None:
+                return entry.content[start:end + 1]
+            f = open(path, 'rb')
+            f.seek(start)
+            return FileBody(f, end - start + 1)
+
+        boundary = uuid.uuid4().hex
+        parts = []
+        length = 0
+        for start, end in ranges:
+            head = ('--{}\r\nContent-Type: {}\r\n'
+                    'Content-Range: bytes {}-{}/{}\r\n\r\n'.format(
+                    boundary, self.response.content_type, start, end,
+                    size)).encode('latin-1')
+            parts.append((head, start, end))
+            length += len(head) + end - start + 1 + 2
+        tail = '--{}--\r\n'.format(boundary).encode('latin-1')
+        self.response.media_type = ('multipart/byteranges; boundary=' +
+                                    boundary)
+        # Let a following download() call keep this media type, which
+        # carries the boundary of the parts.
+        self.response.state['byteranges'] = True
+        self.response.add_header('Content-Length',
+                                 str(length + len(tail)))
+        if entry is not None:
+            f = io.BytesIO(entry.content)
+        else:
+            f = open(path, 'rb')
+        return _byteranges(f, parts, tail, FileBody.block_size)
+
+    def set_cache_control(self, root, value):
+        """Set the Cache-Control header for files in a document root.
+
+        Arguments:
+          root (str): Path to document root directory, as specified to
+            :meth:`static`.
+          value (str): Value of Cache-Control header, e.g.
+            ``'public, max-age=3600'``, or ``None`` to send no
+            Cache-Control header.
+
+        Raises:
+          LogicError: When the application is frozen.
+        """
+        if self.frozen:
+            raise LogicError('Cannot set cache control on frozen '
+                             'application')
+        root = os.path.abspath(os.path.join(root, ''))
+        if value is None:
+            self._cache_control.pop(root, None)
+        else:
+            self._cache_control[root] = value
 
     def download(self, content, filename=None,
                  media_type=None, charset='UTF-8'):
@@ -271,11 +528,16 @@ class Ice:
              turns out to be empty, then :exc:`ice.LogicError` is raised.
 
         The *media_type* and *charset* arguments are used in the same
-        manner as they are used in :meth:`static`.
+        manner as they are used in :meth:`static`. They are ignored if
+        the content is a ``multipart/byteranges`` body returned by a
+        previous :meth:`static` call for a request with several ranges,
+        since the Content-Type header of such a response carries the
+        boundary of the parts; the media type of the parts is set by
+        the :meth:`static` call.
 
         Arguments:
-          content (str, bytes or int): Content to be sent as download or
-            HTTP status code of the response to be returned.
+          content (str, bytes, FileBody or int): Content to be sent as
+            download or HTTP status code of the response to be returned.
           filename (str): Filename to use for saving the content
           media_type (str, optional): Media type of file.
           charset (str, optional): Character set of file.
@@ -298,11 +560,11 @@ class Ice:
         if filename == '':
             raise LogicError('Cannot determine filename for download')
 
-        if media_type is not None:
+        if not self.response.state.get('byteranges'):
+            if media_type is None:
+                media_type = mimetypes.guess_type(filename)[0]
             self.response.media_type = media_type
-        else:
-            self.response.media_type = mimetypes.guess_type(filename)[0]
-        self.response.charset = charset
+            self.response.charset = charset
         self.response.add_header('Content-Disposition', 'attachment; '
                                  'filename="{}"'.format(filename))
         return content
@@ -315,27 +577,65 @@ class Ice:
           start_response (callable): Callable to start HTTP response
 
         Returns:
-          list: List containing a single sequence of bytes.
+          iterable: List containing a single sequence of bytes or, if
+          the route callback returned an iterator, an iterator of
+          sequences of bytes.
         """
-        self.request = Request(environ)
-        self.response = Response(start_response)
+        if self._auto_freeze and not self.frozen:
+            self.freeze()
+
+        if self._mounts:
+            path = environ.get('PATH_INFO', '')
+            end = path.find('/', 1)
+            segment = path[1:] if end == -1 else path[1:end]
+            app = self._mounts.get(segment)
+            if app is not None and path.startswith('/'):
+                environ['SCRIPT_NAME'] = (environ.get('SCRIPT_NAME', '') +
+                                          '/' + segment)
+                environ['PATH_INFO'] = '' if end == -1 else path[end:]
+                return app(environ, start_response)
+
+        self.request = Request(environ, **self.request_options)
+        self.response = Response(start_response,
+                                 environ.get('wsgi.file_wrapper'))
 
         route = self._router.resolve(self.request.method,
                                      self.request.path)
         if route is not None:
             callback, args, kwargs = route
-            value = callback(*args, **kwargs)
-        elif self._router.contains_method(self.request.method):
-            value = 404 # Not found
-        else:
+            limit = self.max_body_size
+            if isinstance(callback, _RouteHandler):
+                limit = callback.max_body_size
+                callback = callback.callback
+            try:
+                if limit is not None:
+                    self.request.max_body_size = limit
+                    length = self.request.content_length
+                    if length is not None and length > limit:
+                        raise RequestError(413, 'Request body too large')
+                value = callback(*args, **kwargs)
+            except RequestError as e:
+                value = e.status
+        elif not self._router.contains_method(self.request.method):
             value = 501 # Not Implemented
+        else:
+            allowed = self._router.allowed_methods(self.request.path,
+                                                   self.request.method)
+            if allowed:
+                self.response.add_header('Allow', ', '.join(allowed))
+                value = 405 # Method Not Allowed
+            else:
+                value = 404 # Not found
 
         if isinstance(value, str) or isinstance(value, bytes):
             self.response.body = value
 
+        elif isinstance(value, (collections.abc.Iterator, FileBody)):
+            self.response.body = value
+
         elif isinstance(value, int) and value in Response._responses:
             self.response.status = value
-            if self.response.body is None:
+            if self.response.body is None and value != 304:
                 self.response.body = self._get_error_page_callback()()
 
         elif (isinstance(value, tuple) and
@@ -358,25 +658,169 @@ class Ice:
 
     def _get_error_page_callback(self):
         """Return an error page for the current response status."""
-        if self.response.status in self._error_handlers:
+        if self._error_callbacks is not None:
+            callback = self._error_callbacks[self.response.status]
+            if callback is not None:
+                return callback
+        elif self.response.status in self._error_handlers:
             return self._error_handlers[self.response.status]
         elif None in self._error_handlers:
             return self._error_handlers[None]
-        else:
-            # Rudimentary error handler if no error handler was found
-            self.response.media_type = 'text/plain'
-            return lambda: self.response.status_line
+        # Rudimentary error handler if no error handler was found
+        self.response.media_type = 'text/plain'
+        return lambda: self.response.status_line
+
+
+class _ServerHandler(wsgiref.simple_server.ServerHandler):
+
+    """Handler of the simple WSGI server that sends files with sendfile.
+
+    A response body returned by ``wsgi.file_wrapper`` is sent with
+    :func:`os.sendfile` where it is available, so that the file content
+    is copied to the socket by the kernel.
+    """
+
+    def sendfile(self):
+        """Send the wrapped file of the response with os.sendfile.
+
+        Returns:
+          bool: ``True`` if the file was sent, ``False`` if it must be
+          sent by iterating over the response body.
+        """
+        if not hasattr(os, 'sendfile'):
+            return False
+        try:
+            in_fd = self.result.filelike.fileno()
+            out_fd = self.stdout.fileno()
+        except (AttributeError, OSError, ValueError):
+            return False
+        length = self.headers.get('Content-Length')
+        if length is None:
+            return False
+        offset = self.result.filelike.tell()
+        remaining = int(length)
+        if not self.headers_sent:
+            self.send_headers()
+        self._flush()
+        while remaining > 0:
+            sent = os.sendfile(out_fd, in_fd, offset, remaining)
+            if not sent:
+                break
+            offset += sent
+            remaining -= sent
+            self.bytes_sent += sent
+        return True
+
+
+class _RequestHandler(wsgiref.simple_server.WSGIRequestHandler):
+
+    """Request handler of the simple WSGI server used by Ice.run()."""
+
+    def handle(self):
+        """Handle a single HTTP request with :class:`_ServerHandler`."""
+        self.raw_requestline = self.rfile.readline(65537)
+        if len(self.raw_requestline) > 65536:
+            self.requestline = ''
+            self.request_version = ''
+            self.command = ''
+            self.send_error(414)
+            return
+        if not self.parse_request():
+            return
+        handler = _ServerHandler(self.rfile, self.wfile, self.get_stderr(),
+                                 self.get_environ(), multithread=False)
+        handler.request_handler = self
+        handler.run(self.server.get_app())
+
+
+class _RouteHandler:
+
+    """Route callback with options that apply to a single route.
+
+    The same callback may be added to several routes, so the options of
+    a route are stored in the handler that the router resolves for that
+    route instead of being looked up by the callback.
+    """
+
+    __slots__ = ('callback', 'max_body_size')
+
+    def __init__(self, callback, max_body_size):
+        """Initialize the route handler.
+
+        Arguments:
+          callback (callable): Route callback.
+          max_body_size (int): Maximum size in bytes of the request body
+            for the route.
+        """
+        self.callback = callback
+        self.max_body_size = max_body_size
 
 
 class Router:
 
-    """Route management and resolution."""
+    """Route management and resolution.
+
+    The *engine* argument selects how wildcard routes are resolved:
+
+      - ``'linear'`` (the default) tries each wildcard route of the
+        request method one after another.
+      - ``'compiled'`` merges the wildcard routes of a method into
+        regular expressions of up to 1000 routes each, so that the
+        winning route is found with one search per regular expression;
+        the regular expression of the winning route is then matched
+        again to extract its wildcard values. See
+        :class:`WildcardDispatch`.
+      - ``'trie'`` arranges wildcard routes of a method in a tree of
+        path segments, so that the cost of resolution depends on the
+        depth of the request path instead of the number of routes.
+
+    If *cache_size* is greater than zero, the results of resolving
+    requests to wildcard and regex routes, including the absence of a
+    matching route, are saved in an :class:`LRUCache` of that size,
+    available as the :attr:`cache` attribute. The cache is cleared
+    whenever a route is added.
+
+    Once all routes have been added, :meth:`freeze` may be called to
+    turn the route tables into immutable structures and to build the
+    wildcard route indexes of all methods in advance. No routes can be
+    added to a frozen router.
+
+    Attributes:
+      engine (str): Wildcard route resolution engine.
+      cache (LRUCache): Cache of resolved routes or ``None`` if
+        caching is disabled.
+      frozen (bool): ``True`` iff the router has been frozen.
+    """
+
+    _engines = ('linear', 'compiled', 'trie')
+
+    # Marker for requests that have not been resolved before.
+    _uncached = object()
+
+    def __init__(self, engine='linear', cache_size=0):
+        """Initialize router.
 
-    def __init__(self):
-        """Initialize router."""
+        Arguments:
+          engine (str, optional): Wildcard route resolution engine.
+          cache_size (int, optional): Maximum number of resolved
+            requests to cache, defaults to ``0``, i.e. no caching.
+
+        Raises:
+          RouteError: When *engine* is not a known engine name.
+        """
+        if engine not in Router._engines:
+            raise RouteError('Invalid router engine {!r}'.format(engine))
+        self.engine = engine
+        self.cache = LRUCache(cache_size) if cache_size > 0 else None
+        self.frozen = False
         self._literal = collections.defaultdict(dict)
         self._wildcard = collections.defaultdict(list)
         self._regex = collections.defaultdict(list)
+        self._wildcard_index = {}
+        self._regex_index = {}
+        self._methods = set()
+        self._non_literal_methods = set()
+        self._literal_methods = collections.defaultdict(set)
 
     def add(self, method, pattern, callback):
         """Add a route.
@@ -386,14 +830,57 @@ class Router:
           pattern (str): Pattern that request paths must match.
           callback (str): Route handler that is invoked when a request
             path matches the *pattern*.
+
+        Raises:
+          LogicError: When the router is frozen.
         """
+        if self.frozen:
+            raise LogicError('Cannot add route to frozen router')
         pat_type, pat = self._normalize_pattern(pattern)
         if pat_type == 'literal':
             self._literal[method][pat] = callback
+            self._literal_methods[pat].add(method)
         elif pat_type == 'wildcard':
             self._wildcard[method].append(WildcardRoute(pat, callback))
+            self._wildcard_index.pop(method, None)
+            self._non_literal_methods.add(method)
         else:
             self._regex[method].append(RegexRoute(pat, callback))
+            self._regex_index.pop(method, None)
+            self._non_literal_methods.add(method)
+        self._methods.add(method)
+        if self.cache is not None:
+            self.cache.clear()
+
+    def freeze(self):
+        """Make the route tables immutable and build all route indexes.
+
+        Calling this method on a frozen router does nothing.
+        """
+        if self.frozen:
+            return
+        self._literal = types.MappingProxyType(
+            {method: types.MappingProxyType(dict(routes))
+             for method, routes in self._literal.items()})
+        self._wildcard = types.MappingProxyType(
+            {method: tuple(routes)
+             for method, routes in self._wildcard.items()})
+        self._regex = types.MappingProxyType(
+            {method: tuple(routes)
+             for method, routes in self._regex.items()})
+        self._literal_methods = types.MappingProxyType(
+            {path: frozenset(methods)
+             for path, methods in self._literal_methods.items()})
+        self._methods = frozenset(self._methods)
+        self._non_literal_methods = frozenset(self._non_literal_methods)
+        if self.engine != 'linear':
+            self._wildcard_index = types.MappingProxyType(
+                {method: self._build_wildcard_index(method)
+                 for method in self._wildcard})
+        self._regex_index = types.MappingProxyType(
+            {method: RegexIndex(routes)
+             for method, routes in self._regex.items()})
+        self.frozen = True
 
     def contains_method(self, method):
         """Check if there is at least one handler for *method*.
@@ -405,8 +892,35 @@ class Router:
           ``True`` if there is at least one route defined for *method*,
           ``False`` otherwise
         """
-        return method in itertools.chain(self._literal, self._wildcard,
-                                         self._regex)
+        return method in self._methods
+
+    def allowed_methods(self, path, exclude=None):
+        """Return HTTP methods for which a route matches *path*.
+
+        Methods with a literal route for *path* are looked up directly.
+        Only the methods that have wildcard or regex routes are resolved
+        further, except *exclude*, which the caller has already found
+        not to match. Resolving such a method costs a walk of its tree of
+        path segments with the ``'trie'`` engine, but may try each of its
+        wildcard routes with the other engines, and regex routes are
+        tried in turn with every engine.
+
+        Arguments:
+          path (str): Request path
+          exclude (str, optional): HTTP method that is known to have no
+            route for *path*, e.g. the method of a request that could
+            not be resolved.
+
+        Returns:
+          list: Sorted list of HTTP method names.
+        """
+        methods = set(self._literal_methods.get(path, ()))
+        for method in self._non_literal_methods - methods:
+            if method == exclude:
+                continue
+            if self.resolve(method, path) is not None:
+                methods.add(method)
+        return sorted(methods)
 
     def resolve(self, method, path):
         """Resolve a request to a route handler.
@@ -426,9 +940,22 @@ class Router:
         """
         if method in self._literal and path in self._literal[method]:
             return self._literal[method][path], [], {}
-        else:
+        elif self.cache is None:
             return self._resolve_non_literal_route(method, path)
 
+        key = method, path
+        cached = self.cache.get(key, Router._uncached)
+        if cached is Router._uncached:
+            cached = self._resolve_non_literal_route(method, path)
+            if cached is not None:
+                callback, args, kwargs = cached
+                cached = callback, tuple(args), kwargs
+            self.cache.put(key, cached)
+        if cached is None:
+            return None
+        # Hand out copies, so that the cached arguments stay intact.
+        callback, args, kwargs = cached
+        return callback, list(args), dict(kwargs)
 
     def _resolve_non_literal_route(self, method, path):
         """Resolve a request to a wildcard or regex route handler.
@@ -446,14 +973,65 @@ class Router:
 
           ``None`` if no route matches the request.
         """
-        for route_dict in (self._wildcard, self._regex):
-            if method in route_dict:
-                for route in reversed(route_dict[method]):
-                    callback_data = route.match(path)
-                    if callback_data is not None:
-                        return callback_data
+        if method in self._wildcard:
+            callback_data = self._resolve_wildcard_route(method, path)
+            if callback_data is not None:
+                return callback_data
+        if method in self._regex:
+            index = self._regex_index.get(method)
+            if index is None:
+                index = RegexIndex(self._regex[method])
+                self._regex_index[method] = index
+            return index.match(path)
         return None
 
+    def _resolve_wildcard_route(self, method, path):
+        """Resolve a request to a wildcard route handler.
+
+        The last added route that matches the request path wins
+        regardless of the engine used to find it.
+
+        Arguments:
+          method (str): HTTP method name, e.g. GET, POST, etc.
+          path (str): Request path
+
+        Returns:
+          tuple or None: A tuple of three items:
+
+            1. Route handler (callable)
+            2. Positional arguments (list)
+            3. Keyword arguments (dict)
+
+          ``None`` if no route matches the request.
+        """
+        if self.engine == 'linear':
+            for route in reversed(self._wildcard[method]):
+                callback_data = route.match(path)
+                if callback_data is not None:
+                    return callback_data
+            return None
+
+        index = self._wildcard_index.get(method)
+        if index is None:
+            index = self._build_wildcard_index(method)
+            self._wildcard_index[method] = index
+        return index.match(path)
+
+    def _build_wildcard_index(self, method):
+        """Build the wildcard route index of the router engine.
+
+        Arguments:
+          method (str): HTTP method name, e.g. GET, POST, etc.
+
+        Returns:
+          WildcardDispatch or WildcardTrie: Index of the wildcard routes
+          of *method*.
+        """
+        if self.engine == 'compiled':
+            return WildcardDispatch(self._wildcard[method])
+        else:
+            return WildcardTrie(self._wildcard[method])
+
     @staticmethod
     def _normalize_pattern(pattern):
         """Return a normalized form of the pattern.
@@ -500,18 +1078,31 @@ class WildcardRoute:
           pattern (str): Pattern associated with the route.
           callback (callable): Route handler.
         """
-        self._re = []
+        regex = []
+        plain_regex = []
         self._wildcards = []
         for token in WildcardRoute.tokens(pattern):
             if token and token.startswith('<') and token.endswith('>'):
                 w = Wildcard(token)
                 self._wildcards.append(w)
-                self._re.append(w.regex())
+                regex.append(w.regex())
+                plain_regex.append(w.regex(capture=False))
             else:
-                self._re.append(re.escape(token))
-        self._re = re.compile('^' + ''.join(self._re) + '$')
+                regex.append(re.escape(token))
+                plain_regex.append(re.escape(token))
+        self.pattern = pattern
+        self.regex = ''.join(regex)
+        self.plain_regex = ''.join(plain_regex)
+        self._re = re.compile('^' + self.regex + '$')
         self._callback = callback
 
+        # Plan of (group index, converter, name) for each wildcard whose
+        # value is passed to the route handler; '!' wildcards are left
+        # out of the plan since their values are thrown away.
+        self._plan = tuple((i, w.converter, w.name)
+                           for i, w in enumerate(self._wildcards)
+                           if w.name != '!')
+
     def match(self, path):
         """Return route handler with arguments if path matches this route.
 
@@ -530,16 +1121,35 @@ class WildcardRoute:
         match = self._re.search(path)
         if match is None:
             return None
+        return self.arguments(match.groups())
+
+    def arguments(self, values):
+        """Return route handler with arguments built from matched values.
+
+        The *values* sequence must contain one string per wildcard in
+        the route pattern in the order in which the wildcards occur in
+        the pattern.
+
+        Arguments:
+          values (tuple): Strings matched by the wildcards.
+
+        Returns:
+          tuple: A tuple of three items:
+
+            1. Route handler (callable)
+            2. Positional arguments (list)
+            3. Keyword arguments (dict)
+        """
         args = []
         kwargs = {}
-        for i, wildcard in enumerate(self._wildcards):
-            if wildcard.name == '!':
-                continue
-            value = wildcard.value(match.groups()[i])
-            if not wildcard.name:
-                args.append(value)
+        for i, convert, name in self._plan:
+            value = values[i]
+            if convert is not None:
+                value = convert(value)
+            if name:
+                kwargs[name] = value
             else:
-                kwargs[wildcard.name] = value
+                args.append(value)
         return self._callback, args, kwargs
 
     @staticmethod
@@ -561,6 +1171,285 @@ class WildcardRoute:
         return WildcardRoute._tokenize_re.findall(pattern)
 
 
+class WildcardDispatch:
+
+    """Wildcard routes merged into a few regular expressions.
+
+    The regular expressions of the routes are joined into alternations,
+    most recently added route first. Since the regular expression engine
+    tries alternatives from left to right, the first alternative that
+    matches belongs to the last added route that matches the path,
+    which preserves the precedence followed by :class:`Router`.
+
+    Each alternative is the route regex without capturing groups
+    followed by an empty group. The index of the empty group, which is
+    the only group that is set by a successful match, identifies the
+    winning route, whose own regex then extracts the wildcard values.
+    The matching engine does work proportional to the number of groups
+    in the regex on every search, so at most :attr:`chunk_size` routes
+    are merged into one regex.
+    """
+
+    chunk_size = 1000
+
+    def __init__(self, routes):
+        """Initialize wildcard dispatch.
+
+        Arguments:
+          routes (list): Wildcard routes in the order they were added.
+        """
+        routes = list(reversed(routes))
+        self._chunks = []
+        for i in range(0, len(routes), self.chunk_size):
+            chunk = routes[i:i + self.chunk_size]
+            regex = '|'.join(route.plain_regex + '()' for route in chunk)
+            self._chunks.append((re.compile('^(?:' + regex + ')$'),
+                                 chunk))
+
+    def match(self, path):
+        """Return route handler with arguments for the winning route.
+
+        Arguments:
+          path (str): Request path
+
+        Returns:
+          tuple or None: A tuple of three items:
+
+            1. Route handler (callable)
+            2. Positional arguments (list)
+            3. Keyword arguments (dict)
+
+          ``None`` if no route matches the path.
+        """
+        for regex, routes in self._chunks:
+            match = regex.search(path)
+            if match is not None:
+                return routes[match.lastindex - 1].match(path)
+        return None
+
+
+class WildcardTrie:
+
+    """Wildcard routes arranged in a tree of path segments.
+
+    A route pattern is split into segments at ``/`` and each segment
+    becomes an edge in the tree. A segment without wildcards is an edge
+    that is looked up in a dictionary. A segment that consists of a
+    single ``str`` or ``int`` wildcard, or of text mixed with such
+    wildcards, is an edge guarded by a regular expression that must
+    match the whole path segment. A segment that consists of a single
+    ``path`` wildcard is an edge that consumes one or more path
+    segments. Routes with a ``path`` wildcard mixed with text within a
+    segment cannot be represented in the tree and are matched with
+    their own regular expressions instead.
+
+    Every route is numbered in the order it was added and the highest
+    numbered route that matches the path wins, which preserves the
+    precedence followed by :class:`Router`. Branches that contain no
+    route numbered higher than the best match found so far are skipped.
+    The wildcard values are extracted by the regular expression of the
+    winning route, as in :class:`WildcardDispatch`.
+    """
+
+    class _Node:
+
+        """A node in the tree of path segments."""
+
+        __slots__ = ('static', 'dynamic', 'path', 'route', 'top')
+
+        def __init__(self):
+            """Initialize an empty node."""
+            self.static = {}
+            self.dynamic = {}
+            self.path = None
+            self.route = None
+            self.top = -1
+
+    def __init__(self, routes):
+        """Initialize wildcard trie.
+
+        Arguments:
+          routes (list): Wildcard routes in the order they were added.
+        """
+        self._root = WildcardTrie._Node()
+        self._fallback = []
+        for index, route in enumerate(routes):
+            self._add(index, route)
+
+    def _add(self, index, route):
+        """Add a route to the tree.
+
+        Arguments:
+          index (int): Number of the route in the order of addition.
+          route (WildcardRoute): Route to add.
+        """
+        segments = [[]]
+        for token in WildcardRoute.tokens(route.pattern):
+            if token == '/':
+                segments.append([])
+            elif token.startswith('<') and token.endswith('>'):
+                segments[-1].append(Wildcard(token))
+            else:
+                segments[-1].append(token)
+
+        edges = []
+        for segment in segments:
+            wildcards = [t for t in segment if isinstance(t, Wildcard)]
+            if not wildcards:
+                edges.append(('static', ''.join(segment)))
+            elif len(segment) == 1 and wildcards[0].type == 'path':
+                edges.append(('path', None))
+            elif any(w.type == 'path' for w in wildcards):
+                self._fallback.append((index, route))
+                return
+            else:
+                regex = ''.join(t.regex() if isinstance(t, Wildcard)
+                                else re.escape(t) for t in segment)
+                edges.append(('dynamic', regex))
+
+        node = self._root
+        node.top = index
+        for kind, key in edges:
+            if kind == 'static':
+                node = node.static.setdefault(key, WildcardTrie._Node())
+            elif kind == 'path':
+                if node.path is None:
+                    node.path = WildcardTrie._Node()
+                node = node.path
+            else:
+                if key not in node.dynamic:
+                    node.dynamic[key] = (re.compile(key + r'\Z'),
+                                         WildcardTrie._Node())
+                node = node.dynamic[key][1]
+            node.top = index
+        node.route = (index, route)
+
+    def match(self, path):
+        """Return route handler with arguments for the winning route.
+
+        Arguments:
+          path (str): Request path
+
+        Returns:
+          tuple or None: A tuple of three items:
+
+            1. Route handler (callable)
+            2. Positional arguments (list)
+            3. Keyword arguments (dict)
+
+          ``None`` if no route matches the path.
+        """
+        best = self._best(path, None)
+        if path.endswith('\n'):
+            # The route regex ends with '$', which also matches before
+            # a newline at the end of the path.
+            best = self._best(path[:-1], best)
+        best_index = -1 if best is None else best[0]
+        for index, route in reversed(self._fallback):
+            if index < best_index:
+                break
+            callback_data = route.match(path)
+            if callback_data is not None:
+                return callback_data
+        if best is None:
+            return None
+        return best[1].match(path)
+
+    def _best(self, path, best):
+        """Return the best route whose regex matches the whole path.
+
+        Arguments:
+          path (str): Request path
+          best (tuple or None): Best match found so far as a tuple of
+            route number and route.
+
+        Returns:
+          tuple or None: Best match found as a tuple of route number and
+          route.
+        """
+        segments = path.split('/')
+        # A path wildcard matches '.+', which does not match a newline,
+        # so its value ends before the first segment with a newline.
+        # ends[i] is the index of that segment at or after segment i.
+        ends = [len(segments)] * (len(segments) + 1)
+        for k in range(len(segments) - 1, -1, -1):
+            ends[k] = k if '\n' in segments[k] else ends[k + 1]
+        return self._search(self._root, segments, ends, 0, best, set(), {})
+
+    def _search(self, node, segments, ends, i, best, visited, tried):
+        """Search the subtree at *node* for the best matching route.
+
+        Only the winning route is looked for; its own regex extracts the
+        wildcard values afterwards. Since the best match found so far
+        only ever improves, a subtree that has been searched from a
+        path segment once cannot yield a better match when it is
+        reached again from the same segment, so such visits are
+        skipped. Likewise, each end of a ``path`` wildcard value is
+        tried once per ``path`` edge, which keeps the search linear in
+        the number of path segments for every ``path`` edge.
+
+        Arguments:
+          node (WildcardTrie._Node): Root of the subtree to search.
+          segments (list): Path segments.
+          ends (list): Index of the first segment with a newline at or
+            after each segment.
+          i (int): Index of the path segment to match against the
+            edges of *node*.
+          best (tuple or None): Best match found so far as a tuple of
+            route number and route.
+          visited (set): Pairs of node and segment index searched so
+            far.
+          tried (dict): Lowest segment index tried so far as the end of
+            the value of the ``path`` edge of each node, by the segment
+            that bounds the value.
+
+        Returns:
+          tuple or None: Best match found as a tuple of route number and
+          route.
+        """
+        if best is not None and node.top <= best[0]:
+            return best
+        if (node, i) in visited:
+            return best
+        visited.add((node, i))
+        n = len(segments)
+        if i == n:
+            if node.route is not None and (best is None or
+                                           node.route[0] > best[0]):
+                best = node.route
+            return best
+
+        segment = segments[i]
+        child = node.static.get(segment)
+        if child is not None:
+            best = self._search(child, segments, ends, i + 1, best,
+                                visited, tried)
+        for regex, child in node.dynamic.values():
+            if regex.match(segment) is not None:
+                best = self._search(child, segments, ends, i + 1, best,
+                                    visited, tried)
+        child = node.path
+        if child is not None:
+            # The value of a path wildcard must not be empty and must
+            # not contain a newline.
+            start = i + 1 if segment else i + 2
+            key = node, ends[i]
+            stop = tried.get(key, ends[i] + 1)
+            if start < stop:
+                tried[key] = start
+            for j in range(start, stop):
+                # Skip ends after which the subtree cannot match.
+                if j == n:
+                    if child.route is None:
+                        continue
+                elif (segments[j] not in child.static and
+                      not child.dynamic and child.path is None):
+                    continue
+                best = self._search(child, segments, ends, j, best,
+                                    visited, tried)
+        return best
+
+
 class Wildcard:
 
     """A single wildcard definition in a wildcard route pattern."""
@@ -594,14 +1483,28 @@ class Wildcard:
             raise RouteError('Invalid wildcard type {!r} in {!r}'
                              .format(self._type, spec))
 
-    def regex(self):
+        # Callable that converts a matched string to the wildcard type
+        # or None if the matched string is used as it is.
+        self.converter = None if self._type in ('str', 'path') else int
+
+    @property
+    def type(self):
+        """Return the type of the wildcard, e.g. ``'str'``, ``'int'``."""
+        return self._type
+
+    def regex(self, capture=True):
         """Convert the wildcard to a regular expression.
 
+        Arguments:
+          capture (bool, optional): Whether the regular expression is a
+            capturing group, defaults to ``True``.
+
         Returns:
           str: A regular expression that matches strings that the
           wildcard is meant to match.
           """
-        return Wildcard._types_re[self._type]
+        regex = Wildcard._types_re[self._type]
+        return regex if capture else '(?:' + regex[1:]
 
     def value(self, value):
         """Convert specified value to a value of wildcard type.
@@ -619,7 +1522,7 @@ class Wildcard:
         Returns:
           str or int: Converted value.
         """
-        return value if self._type in ['str', 'path'] else int(value)
+        return value if self.converter is None else self.converter(value)
 
 
 class RegexRoute:
@@ -627,6 +1530,7 @@ class RegexRoute:
     """A regular expression pattern."""
 
     _group_re = re.compile(r'\(.*\)')
+    _flags_re = re.compile(r'\(\?[aiLmsux]')
 
     def __init__(self, pattern, callback):
         """Initialize regular expression route.
@@ -637,6 +1541,21 @@ class RegexRoute:
         """
         self._re = re.compile(pattern)
         self._callback = callback
+        self.prefix = RegexRoute.literal_prefix(pattern)
+
+        # Work out once which groups are positional and which are
+        # named, so that a match only needs to pick their values.
+        kwargs_indexes = set(self._re.groupindex.values())
+        self._args_indexes = tuple(i for i in range(1, self._re.groups + 1)
+                                   if i not in kwargs_indexes)
+        if self._re.groups == 0:
+            self._arguments = self._no_arguments
+        elif not kwargs_indexes:
+            self._arguments = self._positional_arguments
+        elif not self._args_indexes:
+            self._arguments = self._named_arguments
+        else:
+            self._arguments = self._mixed_arguments
 
     def match(self, path):
         """Return route handler with arguments if path matches this route.
@@ -656,14 +1575,25 @@ class RegexRoute:
         match = self._re.search(path)
         if match is None:
             return None
-        kwargs_indexes = match.re.groupindex.values()
-        args_indexes = [i for i in range(1, match.re.groups + 1)
-                          if i not in kwargs_indexes]
-        args = [match.group(i) for i in args_indexes]
-        kwargs = {}
-        for name, index in match.re.groupindex.items():
-            kwargs[name] = match.group(index)
-        return self._callback, args, kwargs
+        return self._arguments(match)
+
+    def _no_arguments(self, match):
+        """Return route handler for a regex without groups."""
+        return self._callback, [], {}
+
+    def _positional_arguments(self, match):
+        """Return route handler for a regex with unnamed groups only."""
+        return self._callback, list(match.groups()), {}
+
+    def _named_arguments(self, match):
+        """Return route handler for a regex with named groups only."""
+        return self._callback, [], match.groupdict()
+
+    def _mixed_arguments(self, match):
+        """Return route handler for a regex with both kinds of groups."""
+        groups = match.groups()
+        args = [groups[i - 1] for i in self._args_indexes]
+        return self._callback, args, match.groupdict()
 
     @staticmethod
     def like(pattern):
@@ -678,70 +1608,1485 @@ class RegexRoute:
         """
         return RegexRoute._group_re.search(pattern) is not None
 
+    @staticmethod
+    def literal_prefix(pattern):
+        """Return the literal text that every match must begin with.
 
-class Request:
+        The prefix is determined only for patterns anchored with ``^``
+        and contains the characters that follow the anchor up to the
+        first special character. An empty string is returned when the
+        prefix cannot be determined, e.g. for patterns that are not
+        anchored or that contain alternation or flags.
 
-    """Current request.
+        Arguments:
+          pattern (str): Regular expression pattern.
 
-    Attributes:
-      environ (dict): Dictionary of request environment variables.
-      method (str): Request method.
-      path (str): Request path.
-      query (MultiDict): Key-value pairs from query string.
-      form (MultiDict): Key-value pairs from form data in POST request.
-      cookies (MultiDict): Key-value pairs from cookie string.
+        Returns:
+          str: Literal prefix of the paths that the pattern can match.
+        """
+        if (not pattern.startswith('^') or '|' in pattern or
+                RegexRoute._flags_re.search(pattern) is not None):
+            return ''
+        prefix = []
+        i = 1
+        while i < len(pattern):
+            c = pattern[i]
+            if c == '\\':
+                if i + 1 == len(pattern) or pattern[i + 1].isalnum():
+                    break
+                c = pattern[i + 1]
+                i += 2
+            elif c in '.^$*+?{}[]()':
+                break
+            else:
+                i += 1
+            # A character that may be repeated zero times is optional.
+            if i < len(pattern) and pattern[i] in '*?{':
+                break
+            prefix.append(c)
+        return ''.join(prefix)
+
+
+class RegexIndex:
+
+    """Regex routes grouped by the first segment of their literal prefix.
+
+    A regex route whose literal prefix (see
+    :meth:`RegexRoute.literal_prefix`) covers the whole first path
+    segment, e.g. ``^/reports/(\\d+)/csv$``, can match only the paths
+    that begin with that segment, so it is tried only for such paths.
+    Other routes are tried for every path. The routes that are tried
+    for a path are tried in the reverse order of their addition, so the
+    last added route that matches the path wins.
     """
 
-    def __init__(self, environ):
-        """Initialize the current request object.
+    def __init__(self, routes):
+        """Initialize regex route index.
 
         Arguments:
-          environ (dict): Dictionary of environment variables.
+          routes (list): Regex routes in the order they were added.
         """
-        self.environ = environ
-        self.method = environ.get('REQUEST_METHOD', 'GET')
-        self.path = environ.get('PATH_INFO', '/')
-        if not self.path:
-            self.path = '/'
-        self.query = MultiDict()
-        self.form = MultiDict()
-        self.cookies = MultiDict()
-
-        if 'QUERY_STRING' in environ:
-            for k, v in urllib.parse.parse_qsl(environ['QUERY_STRING']):
-                self.query[k] = v
-
-        if 'wsgi.input' in environ:
-            fs = cgi.FieldStorage(fp=environ['wsgi.input'],
-                                  environ=environ)
-            for k in fs:
-                for v in fs.getlist(k):
-                    self.form[k] = v
-
-        if 'HTTP_COOKIE' in environ:
-            cookies = http.cookies.SimpleCookie(environ['HTTP_COOKIE'])
-            for c in cookies.values():
-                self.cookies[c.key] = c.value
+        buckets = collections.defaultdict(list)
+        catch_all = []
+        for index, route in enumerate(routes):
+            segment = RegexIndex._first_segment(route.prefix)
+            if segment is None:
+                catch_all.append((index, route))
+            else:
+                buckets[segment].append((index, route))
 
-class Response:
+        # Route numbers are unique, so sorting never compares routes.
+        self._catch_all = tuple(route for index, route
+                                in sorted(catch_all, reverse=True))
+        self._buckets = {}
+        for segment, entries in buckets.items():
+            self._buckets[segment] = tuple(
+                route for index, route
+                in sorted(entries + catch_all, reverse=True))
 
-    """Current response.
+    def match(self, path):
+        """Return route handler with arguments for the winning route.
 
-    Attributes:
-      start (callable): Callable that starts response.
-      status (int): HTTP response status code, defaults to 200.
-      media_type (str): Media type of HTTP response, defaults to
-        'text/html'. This together with :attr:`charset` determines the
-        Content-Type response header.
-      charset (str): Character set of HTTP response, defaults to
-        'UTF-8'. This together with :attr:`media_type` determines the
-        Content-Type response header.
-      body (str or bytes): HTTP response body.
-    """
+        Arguments:
+          path (str): Request path
 
-    # Convert HTTP response status codes, phrases and detail in
-    # http.server module into a dictionary of objects
-    _Status = collections.namedtuple('_Status', ('phrase', 'detail'))
+        Returns:
+          tuple or None: A tuple of three items:
+
+            1. Route handler (callable)
+            2. Positional arguments (list)
+            3. Keyword arguments (dict)
+
+          ``None`` if no route matches the path.
+        """
+        segment = RegexIndex._first_segment(path)
+        routes = self._buckets.get(segment, self._catch_all)
+        for route in routes:
+            if path.startswith(route.prefix):
+                callback_data = route.match(path)
+                if callback_data is not None:
+                    return callback_data
+        return None
+
+    @staticmethod
+    def _first_segment(path):
+        """Return the first segment of *path* if it ends with a slash.
+
+        Arguments:
+          path (str): Request path or literal prefix of a route.
+
+        Returns:
+          str or None: First path segment, e.g. ``'foo'`` for
+          ``'/foo/bar'``, or ``None`` if *path* does not begin with a
+          complete segment.
+        """
+        if not path.startswith('/'):
+            return None
+        end = path.find('/', 1)
+        return None if end == -1 else path[1:end]
+
+
+class LRUCache:
+
+    """Mapping of limited size that discards least recently used items.
+
+    Attributes:
+      maxsize (int): Maximum number of items in the cache.
+      hits (int): Number of lookups that found an item.
+      misses (int): Number of lookups that did not find an item.
+      evictions (int): Number of items discarded to make room for newer
+        items.
+    """
+
+    def __init__(self, maxsize):
+        """Initialize an empty cache.
+
+        Arguments:
+          maxsize (int): Maximum number of items in the cache.
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = collections.OrderedDict()
+
+    def get(self, key, default=None):
+        """Return the item for *key* and mark it as recently used.
+
+        Arguments:
+          key (object): Key
+          default (object, optional): Value to return if the key does
+            not exist, defaults to ``None``.
+
+        Returns:
+          object: Cached item for *key* if the key exists, *default*
+          otherwise.
+        """
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """Add or replace the item for *key*.
+
+        If the cache is full, the least recently used items are
+        discarded to make room for the new item.
+
+        Arguments:
+          key (object): Key
+          value (object): Value
+        """
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """Remove all items from the cache."""
+        self._data.clear()
+
+    @property
+    def hit_rate(self):
+        """Return the fraction of lookups that found an item.
+
+        Returns:
+          float: Ratio of hits to lookups, ``0.0`` if there were no
+          lookups.
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __contains__(self, key):
+        """Return ``True`` iff *key* is in the cache."""
+        return key in self._data
+
+    def __len__(self):
+        """Return the number of items in the cache."""
+        return len(self._data)
+
+
+class QueryCache(LRUCache):
+
+    """Cache of parsed query strings.
+
+    Parsed query strings are cached by the raw query string as
+    :class:`FrozenMultiDict` objects, so that they can be shared by
+    all requests with the same query string.
+
+    Attributes:
+      max_length (int): Maximum length of a query string to cache.
+      skipped (int): Number of query strings that were not cached
+        because they are longer than :attr:`max_length`.
+    """
+
+    def __init__(self, maxsize, max_length=1024):
+        """Initialize an empty cache.
+
+        Arguments:
+          maxsize (int): Maximum number of query strings in the cache.
+          max_length (int, optional): Maximum length of a query string
+            to cache, defaults to ``1024``.
+        """
+        super().__init__(maxsize)
+        self.max_length = max_length
+        self.skipped = 0
+
+    def parse(self, query_string):
+        """Return key-value pairs from a query string.
+
+        Arguments:
+          query_string (str): Raw query string.
+
+        Returns:
+          FrozenMultiDict: Key-value pairs from query string.
+        """
+        if len(query_string) > self.max_length:
+            self.skipped += 1
+            return FrozenMultiDict.from_pairs(
+                _parse_urlencoded(query_string, 'UTF-8'))
+        query = self.get(query_string)
+        if query is None:
+            query = FrozenMultiDict.from_pairs(
+                _parse_urlencoded(query_string, 'UTF-8'))
+            self.put(query_string, query)
+        return query
+
+
+class StaticCache(LRUCache):
+
+    """Cache of files returned by :meth:`Ice.static`.
+
+    The content, media type and validators of small files are cached by
+    the absolute path of the file. The cache is limited by the total
+    size of the cached files rather than their number; the least
+    recently used files are discarded to make room for newer files.
+
+    A cached file is checked for changes with ``os.stat`` when it is
+    looked up at least :attr:`check_interval` seconds after it was last
+    checked. A file that has changed or no longer exists is discarded
+    and the lookup counts as a miss. If :attr:`check_interval` is
+    ``None``, cached files are never checked, which suits deployments
+    where the files do not change while the application runs.
+
+    Attributes:
+      maxsize (int): Maximum total size in bytes of the cached files.
+      max_file_size (int): Maximum size in bytes of a file to cache.
+      check_interval (float): Minimum number of seconds between checks
+        of a cached file for changes, or ``None`` to never check.
+      size (int): Total size in bytes of the cached files.
+    """
+
+    def __init__(self, maxsize, max_file_size=65536, check_interval=1.0):
+        """Initialize an empty cache.
+
+        Arguments:
+          maxsize (int): Maximum total size in bytes of the cached
+            files.
+          max_file_size (int, optional): Maximum size in bytes of a file
+            to cache, defaults to ``65536``.
+          check_interval (float, optional): Minimum number of seconds
+            between checks of a cached file for changes, defaults to
+            ``1.0``; ``None`` disables the checks.
+        """
+        super().__init__(maxsize)
+        self.max_file_size = max_file_size
+        self.check_interval = check_interval
+        self.size = 0
+
+    def lookup(self, path):
+        """Return the cached file at *path* if it has not changed.
+
+        Arguments:
+          path (str): Absolute path to file.
+
+        Returns:
+          _StaticEntry: Cached file if it is in the cache and has not
+          changed, ``None`` otherwise.
+        """
+        entry = self._data.get(path)
+        if entry is not None and self.check_interval is not None:
+            now = time.monotonic()
+            if now - entry.checked >= self.check_interval:
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    st = None
+                if st is None or entry.key != _StaticEntry.stat_key(st):
+                    self.discard(path)
+                    entry = None
+                else:
+                    entry.checked = now
+        if entry is None:
+            self.misses += 1
+            return None
+        self._data.move_to_end(path)
+        self.hits += 1
+        return entry
+
+    def load(self, path):
+        """Read the file at *path* into the cache.
+
+        Arguments:
+          path (str): Absolute path to file.
+
+        Returns:
+          _StaticEntry: File read into the cache, or ``None`` if the
+          file could not be read, is not a regular file, does not fit in
+          the cache (see :meth:`fits`) or changed while it was read.
+        """
+        try:
+            with open(path, 'rb') as f:
+                st = os.fstat(f.fileno())
+                if not stat.S_ISREG(st.st_mode) or not self.fits(st.st_size):
+                    return None
+                content = f.read(st.st_size + 1)
+        except OSError:
+            return None
+        if len(content) != st.st_size:
+            return None
+        entry = _StaticEntry(content, mimetypes.guess_type(path)[0], st)
+        self.put(path, entry)
+        return entry
+
+    def fits(self, size):
+        """Return ``True`` iff a file of *size* bytes may be cached.
+
+        A file is cached only if it is no larger than both
+        :attr:`max_file_size` and :attr:`maxsize`, so that a file that
+        would be discarded right away is never read.
+
+        Arguments:
+          size (int): Size of the file in bytes.
+
+        Returns:
+          bool: ``True`` if the file may be cached, ``False`` otherwise.
+        """
+        return size <= self.max_file_size and size <= self.maxsize
+
+    def put(self, key, value):
+        """Add or replace the cached file for *key*.
+
+        If the total size of the cached files exceeds :attr:`maxsize`,
+        the least recently used files are discarded. A file larger than
+        :attr:`maxsize` is not cached.
+
+        Arguments:
+          key (str): Absolute path to file.
+          value (_StaticEntry): Cached file.
+        """
+        self.discard(key)
+        size = len(value.content)
+        if size > self.maxsize:
+            return
+        self._data[key] = value
+        self.size += size
+        while self.size > self.maxsize:
+            old = self._data.popitem(last=False)[1]
+            self.size -= len(old.content)
+            self.evictions += 1
+
+    def discard(self, key):
+        """Remove the cached file for *key* if it is in the cache.
+
+        Arguments:
+          key (str): Absolute path to file.
+        """
+        old = self._data.pop(key, None)
+        if old is not None:
+            self.size -= len(old.content)
+
+    def clear(self):
+        """Remove all files from the cache."""
+        super().clear()
+        self.size = 0
+
+
+class _StaticEntry:
+
+    """File cached by :class:`StaticCache`."""
+
+    __slots__ = ('content', 'media_type', 'etag', 'last_modified',
+                 'mtime', 'key', 'checked')
+
+    def __init__(self, content, media_type, st):
+        """Initialize the cached file.
+
+        Arguments:
+          content (bytes): Content of file.
+          media_type (str): Media type guessed from the filename.
+          st (os.stat_result): Status of the file when it was read.
+        """
+        self.content = content
+        self.media_type = media_type
+        self.etag, self.last_modified = _file_validators(st)
+        self.mtime = int(st.st_mtime)
+        self.key = _StaticEntry.stat_key(st)
+        self.checked = time.monotonic()
+
+    @staticmethod
+    def stat_key(st):
+        """Return the fields of a file status that identify its version.
+
+        Arguments:
+          st (os.stat_result): Status of the file.
+
+        Returns:
+          tuple: Device, inode number, size and modification time.
+        """
+        return st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns
+
+
+class Request:
+
+    """Current request.
+
+    The request body is read only when form data, uploaded files, the
+    JSON document or the raw body are accessed. It is read from
+    ``wsgi.input`` in chunks of :attr:`chunk_size` bytes unless its
+    length is known and it is read whole. If the ``CONTENT_LENGTH``
+    environment variable is missing, the body is read only if the
+    server sets ``wsgi.input_terminated`` to indicate that
+    ``wsgi.input`` ends with the body.
+
+    A request body with gzip or deflate content encoding is
+    decompressed one chunk at a time as it is read, unless
+    :attr:`decompress` is ``False``. The size limits apply to both the
+    compressed and the decompressed body.
+
+    Attributes:
+      environ (dict): Dictionary of request environment variables.
+      method (str): Request method.
+      path (str): Request path.
+      query (MultiDict): Key-value pairs from query string.
+      form (MultiDict): Key-value pairs from form data in POST request.
+      files (MultiDict): Files uploaded in multipart/form-data request.
+      cookies (MultiDict): Key-value pairs from cookie string.
+      headers (Headers): Case-insensitive view of request headers.
+      chunk_size (int): Number of bytes to read from ``wsgi.input`` at
+        a time.
+      spool_size (int): Size in bytes above which an uploaded file is
+        moved from memory to a temporary file.
+      max_part_size (int): Maximum size in bytes of a single part of a
+        multipart/form-data body or ``None`` for no limit.
+      max_body_size (int): Maximum size in bytes of the request body or
+        ``None`` for no limit.
+      query_cache (QueryCache): Cache of parsed query strings or
+        ``None`` to parse the query string of every request.
+      max_json_size (int): Maximum size in bytes of a JSON request body
+        or ``None`` for no limit other than :attr:`max_body_size`.
+      json_decoder (callable): Function that decodes a JSON document
+        from a string.
+      decompress (bool): ``True`` iff request bodies with gzip or
+        deflate content encoding are decompressed as they are read.
+      max_decoded_size (int): Maximum size in bytes of a decompressed
+        request body or ``None`` for no limit other than
+        :attr:`max_body_size`.
+    """
+
+    # Value of an attribute that has not been computed yet.
+    _unparsed = object()
+
+    def __init__(self, environ, chunk_size=65536, spool_size=1048576,
+                 max_part_size=None, max_body_size=None, query_cache=None,
+                 max_json_size=1048576, json_decoder=json.loads,
+                 decompress=True, max_decoded_size=16777216):
+        """Initialize the current request object.
+
+        Arguments:
+          environ (dict): Dictionary of environment variables.
+          chunk_size (int, optional): Number of bytes to read from
+            ``wsgi.input`` at a time, defaults to 64 KiB.
+          spool_size (int, optional): Size in bytes above which an
+            uploaded file is moved to a temporary file, defaults to
+            1 MiB.
+          max_part_size (int, optional): Maximum size in bytes of a
+            single part of a multipart/form-data body, defaults to
+            ``None``, i.e. no limit.
+          max_body_size (int, optional): Maximum size in bytes of the
+            request body, defaults to ``None``, i.e. no limit.
+          query_cache (QueryCache, optional): Cache of parsed query
+            strings, defaults to ``None``, i.e. no caching.
+          max_json_size (int, optional): Maximum size in bytes of a
+            JSON request body, defaults to 1 MiB.
+          json_decoder (callable, optional): Function that decodes a
+            JSON document from a string, defaults to
+            :func:`json.loads`.
+          decompress (bool, optional): Decompress request bodies with
+            gzip or deflate content encoding, defaults to ``True``.
+          max_decoded_size (int, optional): Maximum size in bytes of a
+            decompressed request body, defaults to 16 MiB.
+        """
+        self.environ = environ
+        self.method = environ.get('REQUEST_METHOD', 'GET')
+        self.path = environ.get('PATH_INFO', '/')
+        if not self.path:
+            self.path = '/'
+        self.chunk_size = chunk_size
+        self.spool_size = spool_size
+        self.max_part_size = max_part_size
+        self.max_body_size = max_body_size
+        self.query_cache = query_cache
+        self.max_json_size = max_json_size
+        self.json_decoder = json_decoder
+        self.decompress = decompress
+        self.max_decoded_size = max_decoded_size
+        self._json = Request._unparsed
+        self._body = None
+        self._body_read = False
+        self._query = None
+        self._form = None
+        self._files = None
+        self._cookies = None
+        self._headers = None
+
+    @property
+    def headers(self):
+        """Return a case-insensitive view of request headers.
+
+        Returns:
+          Headers: Read-only view of the headers in :attr:`environ`.
+        """
+        if self._headers is None:
+            self._headers = Headers(self.environ)
+        return self._headers
+
+    @property
+    def content_length(self):
+        """Return the length of the request body.
+
+        Returns:
+          int or None: Value of the ``CONTENT_LENGTH`` environment
+          variable or ``None`` if it is missing or empty.
+
+        Raises:
+          RequestError: When ``CONTENT_LENGTH`` is not a valid length.
+        """
+        value = self.environ.get('CONTENT_LENGTH')
+        if not value:
+            return None
+        if not _digits_re.match(value):
+            raise RequestError(400, 'Invalid Content-Length: {!r}'
+                                    .format(value))
+        return int(value)
+
+    @property
+    def query(self):
+        """Return key-value pairs from query string.
+
+        The query string is parsed when this property is accessed for
+        the first time. If :attr:`query_cache` is set, the query string
+        is looked up in the cache first and the result is an immutable
+        :class:`FrozenMultiDict` shared with other requests.
+
+        Returns:
+          MultiDict: Key-value pairs from query string.
+        """
+        if self._query is None:
+            query_string = self.environ.get('QUERY_STRING', '')
+            if self.query_cache is not None:
+                self._query = self.query_cache.parse(query_string)
+            else:
+                self._query = MultiDict.from_pairs(
+                    _parse_urlencoded(query_string, 'UTF-8'))
+        return self._query
+
+    @property
+    def form(self):
+        """Return key-value pairs from form data in POST request.
+
+        The request body is read and parsed when this property is
+        accessed for the first time.
+
+        Returns:
+          MultiDict: Key-value pairs from form data.
+        """
+        if self._form is None:
+            self._parse_form()
+        return self._form
+
+    @property
+    def files(self):
+        """Return files uploaded in multipart/form-data request.
+
+        The request body is read and parsed when this property or
+        :attr:`form` is accessed for the first time.
+
+        Returns:
+          MultiDict: Field names mapped to :class:`FileUpload` objects.
+        """
+        if self._files is None:
+            self._parse_form()
+        return self._files
+
+    @property
+    def json(self):
+        """Return the JSON document in the request body.
+
+        The request body is read and decoded when this property is
+        accessed for the first time. Only requests with the media type
+        ``application/json`` or a media type with the ``+json`` suffix
+        are considered to have a JSON body.
+
+        Returns:
+          object: Decoded JSON document or ``None`` if the request does
+          not have a JSON body.
+
+        Raises:
+          RequestError: When the request body is not valid JSON or is
+          too large.
+        """
+        if self._json is not Request._unparsed:
+            return self._json
+        value = None
+        media_type, params = _parse_header(
+            self.environ.get('CONTENT_TYPE', ''))
+        if (media_type == 'application/json' or
+                media_type.startswith('application/') and
+                media_type.endswith('+json')):
+            limit = self.max_json_size
+            if self.max_body_size is not None and (
+                    limit is None or self.max_body_size < limit):
+                limit = self.max_body_size
+            body = self._read_body(limit)
+            try:
+                value = self.json_decoder(
+                    str(body, params.get('charset', 'UTF-8')))
+            except (ValueError, LookupError) as e:
+                raise RequestError(400, 'Invalid JSON: {}'.format(e))
+        self._json = value
+        return value
+
+    def _parse_form(self):
+        """Parse form data and uploaded files from the request body.
+
+        Raises:
+          RequestError: When the request body is malformed or too large.
+        """
+        self._form = MultiDict()
+        self._files = MultiDict()
+        if 'wsgi.input' not in self.environ:
+            return
+        media_type, params = _parse_header(
+            self.environ.get('CONTENT_TYPE', ''))
+        if media_type == 'multipart/form-data':
+            if not params.get('boundary'):
+                raise RequestError(400, 'Missing multipart boundary')
+            parser = MultipartParser(params['boundary'],
+                                     _check_charset(
+                                         params.get('charset', 'UTF-8')),
+                                     self.spool_size, self.max_part_size)
+            try:
+                for name, value in parser.parse(self._read_chunks()):
+                    if isinstance(value, FileUpload):
+                        self._files[name] = value
+                    else:
+                        self._form[name] = value
+            except BaseException:
+                for uploads in self._files.data.values():
+                    for upload in uploads:
+                        upload.close()
+                self._files = MultiDict()
+                raise
+        elif media_type in ('application/x-www-form-urlencoded', ''):
+            charset = _check_charset(params.get('charset', 'UTF-8'))
+            body = str(self._read_body(), charset, 'replace')
+            self._form = MultiDict.from_pairs(
+                _parse_urlencoded(body, charset))
+
+    def body_view(self):
+        """Return the whole request body.
+
+        If the length of the body is known and bounded by
+        :attr:`max_body_size`, the body is read with a single read into
+        a preallocated buffer. Otherwise the buffer starts at
+        :attr:`chunk_size` bytes and grows as the body arrives, so that
+        a large ``CONTENT_LENGTH`` alone does not allocate memory. The
+        body is kept after it is read, so
+        that this method returns the same object every time it is
+        called and the body remains available to :attr:`form` and
+        :attr:`json`.
+
+        Returns:
+          memoryview: Request body.
+
+        Raises:
+          RequestError: When the request body exceeds
+          :attr:`max_body_size`.
+          LogicError: When the request body has already been read with
+          :meth:`iter_body` or by parsing a multipart/form-data body.
+        """
+        return self._read_body()
+
+    def iter_body(self, chunk_size=None):
+        """Iterate over the request body in chunks.
+
+        The chunks are read into a single buffer that is allocated once
+        and reused for every chunk, using ``readinto`` if ``wsgi.input``
+        is a binary stream from the :mod:`io` module, so that no new
+        bytes object is created for each chunk. Hence, a chunk is valid
+        only until the next chunk is read; use ``bytes(chunk)`` to keep
+        a copy of it. If the body has already been read with
+        :meth:`body_view`, slices of that body are returned instead.
+
+        Arguments:
+          chunk_size (int, optional): Maximum size in bytes of a chunk,
+            defaults to ``None``, i.e. :attr:`chunk_size`.
+
+        Yields:
+          memoryview: Next chunk of the request body.
+
+        Raises:
+          RequestError: When the request body exceeds
+          :attr:`max_body_size`.
+          LogicError: When the request body has already been read.
+        """
+        if chunk_size is None:
+            chunk_size = self.chunk_size
+        if self._body is None:
+            yield from self._read_chunks(chunk_size=chunk_size)
+        else:
+            for i in range(0, len(self._body), chunk_size):
+                yield self._body[i:i + chunk_size]
+
+    def _read_body(self, limit=None):
+        """Read the whole request body.
+
+        Arguments:
+          limit (int, optional): Maximum size in bytes of the request
+            body, defaults to ``None``, i.e. :attr:`max_body_size`.
+
+        Returns:
+          memoryview: Request body.
+
+        Raises:
+          RequestError: When the request body exceeds the limit.
+          LogicError: When the request body has already been read in
+          chunks.
+        """
+        if limit is None:
+            limit = self.max_body_size
+        if self._body is not None:
+            if limit is not None and len(self._body) > limit:
+                raise RequestError(413, 'Request body too large')
+            return self._body
+        stream = self.environ.get('wsgi.input')
+        length = self.content_length
+        if stream is None or length is None or self._content_encoding():
+            body = bytearray()
+            for chunk in self._read_chunks(limit):
+                body += chunk
+            self._body = memoryview(body)
+            return self._body
+        if limit is not None and length > limit:
+            raise RequestError(413, 'Request body too large')
+        self._start_reading()
+        # CONTENT_LENGTH is sent by the client, so memory for the whole
+        # body is committed up front only if a limit bounds it.
+        # Otherwise, memory grows only as the body actually arrives.
+        size = length if limit is not None else min(length,
+                                                    self.chunk_size)
+        readinto = _readinto(stream)
+        if readinto is not None:
+            body = bytearray(size)
+            received = 0
+            while received < length:
+                if received == len(body):
+                    body += bytes(min(len(body), length - received))
+                view = memoryview(body)[received:]
+                try:
+                    n = readinto(view)
+                finally:
+                    view.release()
+                if not n:
+                    break
+                received += n
+            del body[received:]
+            self._body = memoryview(body)
+            return self._body
+        body = stream.read(size)
+        if len(body) < length:
+            chunks = [body]
+            received = len(body)
+            while received < length:
+                chunk = stream.read(min(length - received,
+                                        max(received, self.chunk_size)))
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                received += len(chunk)
+            body = b''.join(chunks)
+        self._body = memoryview(body)
+        return self._body
+
+    def _read_chunks(self, limit=None, chunk_size=None):
+        """Read the request body in chunks.
+
+        If the body has a content encoding, it is decompressed and the
+        decompressed chunks are returned.
+
+        Arguments:
+          limit (int, optional): Maximum size in bytes of the request
+            body, defaults to ``None``, i.e. :attr:`max_body_size`.
+          chunk_size (int, optional): Maximum size in bytes of a chunk,
+            defaults to ``None``, i.e. :attr:`chunk_size`.
+
+        Returns:
+          iterator: Chunks of the request body as memoryview objects.
+
+        Raises:
+          RequestError: When the content encoding is not supported.
+        """
+        encoding = self._content_encoding()
+        chunks = self._read_raw_chunks(limit, chunk_size)
+        if encoding is None:
+            return chunks
+        if limit is None:
+            limit = self.max_body_size
+        if self.max_decoded_size is not None and (
+                limit is None or self.max_decoded_size < limit):
+            limit = self.max_decoded_size
+        if chunk_size is None:
+            chunk_size = self.chunk_size
+        return _decompress(chunks, encoding, limit, chunk_size)
+
+    def _content_encoding(self):
+        """Return the content encoding to decode the request body with.
+
+        Returns:
+          str: ``'gzip'``, ``'deflate'`` or ``None`` if the body need not
+          be decoded.
+
+        Raises:
+          RequestError: When the content encoding is not supported.
+        """
+        if not self.decompress:
+            return None
+        encoding = self.environ.get('HTTP_CONTENT_ENCODING', '')
+        encoding = encoding.strip().lower()
+        if encoding in ('', 'identity'):
+            return None
+        if encoding in ('gzip', 'x-gzip'):
+            return 'gzip'
+        if encoding == 'deflate':
+            return 'deflate'
+        raise RequestError(415, 'Unsupported Content-Encoding: {!r}'
+                                .format(encoding))
+
+    def _read_raw_chunks(self, limit=None, chunk_size=None):
+        """Read the request body in chunks into a reusable buffer.
+
+        Arguments:
+          limit (int, optional): Maximum size in bytes of the request
+            body, defaults to ``None``, i.e. :attr:`max_body_size`.
+          chunk_size (int, optional): Maximum size in bytes of a chunk,
+            defaults to ``None``, i.e. :attr:`chunk_size`.
+
+        Yields:
+          memoryview: Next chunk, valid until the next chunk is read.
+
+        Raises:
+          RequestError: When the request body exceeds the limit.
+          LogicError: When the request body has already been read in
+          chunks.
+        """
+        stream = self.environ.get('wsgi.input')
+        length = self.content_length
+        if stream is None or (length is None and
+                              not self.environ.get('wsgi.input_terminated')):
+            return
+        if limit is None:
+            limit = self.max_body_size
+        if length is not None and limit is not None and length > limit:
+            raise RequestError(413, 'Request body too large')
+        if chunk_size is None:
+            chunk_size = self.chunk_size
+        self._start_reading()
+        readinto = _readinto(stream)
+        if readinto is not None:
+            buffer = memoryview(bytearray(chunk_size))
+        received = 0
+        while length is None or received < length:
+            size = chunk_size
+            if length is not None:
+                size = min(size, length - received)
+            if readinto is not None:
+                n = readinto(buffer[:size])
+                chunk = buffer[:n]
+            else:
+                chunk = memoryview(stream.read(size))
+                n = len(chunk)
+            if not n:
+                break
+            received += n
+            if limit is not None and received > limit:
+                raise RequestError(413, 'Request body too large')
+            yield chunk
+
+    def _start_reading(self):
+        """Mark the request body as being read from ``wsgi.input``.
+
+        Raises:
+          LogicError: When the request body has already been read in
+          chunks.
+        """
+        if self._body_read:
+            raise LogicError('Request body has already been read')
+        self._body_read = True
+
+    @property
+    def cookies(self):
+        """Return key-value pairs from cookie string.
+
+        The cookie string is parsed when this property is accessed for
+        the first time.
+
+        Returns:
+          MultiDict: Key-value pairs from cookie string.
+        """
+        if self._cookies is None:
+            cookies = http.cookies.SimpleCookie(
+                self.environ.get('HTTP_COOKIE', ''))
+            self._cookies = MultiDict.from_pairs(
+                (c.key, c.value) for c in cookies.values())
+        return self._cookies
+
+class Headers(collections.abc.Mapping):
+
+    """Read-only view of the request headers in a WSGI environ.
+
+    Header names are case-insensitive. Each lookup translates the
+    header name to the corresponding environ key, e.g.
+    ``'Accept-Encoding'`` to ``'HTTP_ACCEPT_ENCODING'``, and reads the
+    value from the environ, so that the environ is never copied. The
+    environ keys of common headers are looked up in a precomputed
+    table, so that looking them up allocates no new objects.
+
+    Attributes:
+      environ (dict): Dictionary of request environment variables.
+    """
+
+    __slots__ = ('environ',)
+
+    def __init__(self, environ):
+        """Initialize the view.
+
+        Arguments:
+          environ (dict): Dictionary of environment variables.
+        """
+        self.environ = environ
+
+    @staticmethod
+    def environ_key(name):
+        """Return the environ key for a header name.
+
+        Arguments:
+          name (str): Header name in any case.
+
+        Returns:
+          str: Environ key for the header, e.g. ``'HTTP_USER_AGENT'``
+          for ``'User-Agent'``.
+        """
+        key = _header_environ_keys.get(name)
+        if key is None:
+            key = _environ_key(name)
+        return key
+
+    def __getitem__(self, name):
+        """Return the value of the specified header.
+
+        Arguments:
+          name (str): Header name in any case.
+
+        Returns:
+          str: Header value.
+
+        Raises:
+          KeyError: When the header is missing.
+        """
+        if not isinstance(name, str):
+            raise KeyError(name)
+        key = self.environ_key(name)
+        value = self.environ.get(key)
+        # CGI servers may set CONTENT_TYPE and CONTENT_LENGTH to empty
+        # strings when the request has no such headers.
+        if value is None or value == '' and key in _content_keys:
+            raise KeyError(name)
+        return value
+
+    def __iter__(self):
+        """Iterate over the names of the headers in the request.
+
+        Yields:
+          str: Header name, e.g. ``'User-Agent'``.
+        """
+        for key, value in self.environ.items():
+            if key.startswith('HTTP_'):
+                if key[5:] in _content_keys:
+                    continue
+            elif key not in _content_keys or value == '':
+                continue
+            name = _header_names.get(key)
+            if name is None:
+                name = '-'.join(part.capitalize() for part in
+                                key[5:].split('_'))
+            yield name
+
+    def __len__(self):
+        """Return the number of headers in the request."""
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return '{}({!r})'.format(type(self).__name__, dict(self.items()))
+
+
+def _environ_key(name):
+    """Return the environ key for a header name."""
+    key = name.upper().replace('-', '_')
+    return key if key in _content_keys else 'HTTP_' + key
+
+
+# Environ keys of headers that do not begin with HTTP_.
+_content_keys = ('CONTENT_TYPE', 'CONTENT_LENGTH')
+
+# Header names for which environ keys are precomputed.
+_common_headers = (
+    'Accept', 'Accept-Charset', 'Accept-Encoding', 'Accept-Language',
+    'Authorization', 'Cache-Control', 'Connection', 'Content-Length',
+    'Content-Type', 'Cookie', 'Host', 'If-Match', 'If-Modified-Since',
+    'If-None-Match', 'If-Range', 'If-Unmodified-Since', 'Origin',
+    'Pragma', 'Range', 'Referer', 'User-Agent', 'X-Forwarded-For',
+    'X-Forwarded-Proto', 'X-Requested-With',
+)
+
+# Environ keys of common headers by name in title case, lowercase and
+# uppercase.
+_header_environ_keys = {spelling: _environ_key(name)
+                        for name in _common_headers
+                        for spelling in (name, name.lower(), name.upper())}
+
+# Names of common headers by environ key.
+_header_names = {_environ_key(name): name for name in _common_headers}
+
+
+class MultipartParser:
+
+    """Incremental parser of multipart/form-data request bodies.
+
+    The body is consumed one chunk at a time, so that no more than a
+    chunk and a delimiter are held in memory at once apart from the
+    contents of form fields. Uploaded files are written to
+    :class:`tempfile.SpooledTemporaryFile` objects that move their
+    content from memory to a temporary file when it grows beyond the
+    spool size.
+
+    Attributes:
+      max_header_size (int): Maximum size in bytes of the headers of a
+        single part.
+    """
+
+    max_header_size = 16384
+
+    def __init__(self, boundary, charset='UTF-8', spool_size=1048576,
+                 max_part_size=None):
+        """Initialize the parser.
+
+        Arguments:
+          boundary (str): Boundary from the Content-Type header.
+          charset (str, optional): Character set of form field names,
+            values and filenames.
+          spool_size (int, optional): Size in bytes above which an
+            uploaded file is moved to a temporary file.
+          max_part_size (int, optional): Maximum size in bytes of the
+            content of a single part or ``None`` for no limit.
+        """
+        self._delimiter = b'--' + boundary.encode('latin-1')
+        self._separator = b'\r\n' + self._delimiter
+        self._charset = charset
+        self._spool_size = spool_size
+        self._max_part_size = max_part_size
+
+    def parse(self, chunks):
+        """Parse a multipart/form-data body.
+
+        Arguments:
+          chunks (iterable): Chunks of the body as bytes-like objects.
+
+        The epilogue after the closing delimiter is read but not kept.
+        If parsing fails, the temporary file of the part being parsed is
+        closed; uploaded files that have already been yielded must be
+        closed by the caller.
+
+        Yields:
+          tuple: Field name and either the field value (str) or the
+          uploaded file (FileUpload) for each part of the body.
+
+        Raises:
+          RequestError: When the body is malformed or a part is too
+          large.
+        """
+        buf = bytearray()
+        state = 'preamble'
+        part = None
+        received = False
+        try:
+            for chunk in chunks:
+                received = True
+                if state == 'end':
+                    # Read the epilogue to the end, but do not keep it.
+                    continue
+                buf += chunk
+                while state != 'end':
+                    if state == 'preamble':
+                        i = buf.find(self._delimiter)
+                        if i == -1:
+                            del buf[:max(0, len(buf) -
+                                            len(self._delimiter))]
+                            break
+                        del buf[:i + len(self._delimiter)]
+                        state = 'delimiter'
+                    elif state == 'delimiter':
+                        # A delimiter is followed by '--' if it is the
+                        # last one and by optional whitespace and CRLF
+                        # otherwise.
+                        if buf.startswith(b'--'):
+                            state = 'end'
+                            del buf[:]
+                            break
+                        i = buf.find(b'\r\n')
+                        if i == -1:
+                            if len(buf) > self.max_header_size:
+                                raise RequestError(400, 'Invalid multipart '
+                                                        'delimiter')
+                            break
+                        del buf[:i + 2]
+                        state = 'headers'
+                    elif state == 'headers':
+                        if buf.startswith(b'\r\n'):
+                            headers, end = b'', 2
+                        else:
+                            i = buf.find(b'\r\n\r\n')
+                            if i == -1:
+                                if len(buf) > self.max_header_size:
+                                    raise RequestError(
+                                        400, 'Multipart headers too large')
+                                break
+                            headers, end = bytes(buf[:i]), i + 4
+                        del buf[:end]
+                        part = _MultipartPart(headers, self._charset,
+                                              self._spool_size,
+                                              self._max_part_size)
+                        state = 'body'
+                    else:
+                        i = buf.find(self._separator)
+                        if i == -1:
+                            # Keep enough bytes to find a separator that
+                            # straddles this chunk and the next one.
+                            n = len(buf) - len(self._separator) + 1
+                            if n > 0:
+                                part.write(buf[:n])
+                                del buf[:n]
+                            break
+                        part.write(buf[:i])
+                        del buf[:i + len(self._separator)]
+                        # The uploaded file, if any, belongs to the
+                        # caller once it is yielded.
+                        done, part = part, None
+                        if done.name is not None:
+                            yield done.name, done.value()
+                        else:
+                            done.close()
+                        state = 'delimiter'
+            if received and state != 'end':
+                raise RequestError(400, 'Incomplete multipart body')
+        except BaseException:
+            if part is not None:
+                part.close()
+            raise
+
+
+class _MultipartPart:
+
+    """A single part of a multipart/form-data body being parsed."""
+
+    def __init__(self, headers, charset, spool_size, max_size):
+        """Initialize a part from its headers.
+
+        Arguments:
+          headers (bytes): Header lines of the part.
+          charset (str): Character set of the part headers and value.
+          spool_size (int): Size in bytes above which file content is
+            moved to a temporary file.
+          max_size (int): Maximum size in bytes of the content or
+            ``None`` for no limit.
+        """
+        self.name = None
+        self.filename = None
+        self.content_type = 'text/plain'
+        for line in headers.decode(charset, 'replace').split('\r\n'):
+            name, _, value = line.partition(':')
+            name = name.strip().lower()
+            if name == 'content-disposition':
+                disposition, params = _parse_header(value)
+                self.name = params.get('name')
+                self.filename = params.get('filename')
+            elif name == 'content-type':
+                self.content_type = value.strip()
+        self._charset = charset
+        self._max_size = max_size
+        self._size = 0
+        if self.filename is None:
+            self._content = bytearray()
+        else:
+            self._content = tempfile.SpooledTemporaryFile(spool_size)
+
+    def write(self, data):
+        """Add data to the content of the part.
+
+        Arguments:
+          data (bytes): Data to add.
+
+        Raises:
+          RequestError: When the content exceeds the maximum size.
+        """
+        self._size += len(data)
+        if self._max_size is not None and self._size > self._max_size:
+            raise RequestError(413, 'Multipart part too large')
+        if self.filename is None:
+            self._content += data
+        else:
+            self._content.write(data)
+
+    def value(self):
+        """Return the value of a form field or the uploaded file.
+
+        Returns:
+          str or FileUpload: Field value if the part has no filename,
+          uploaded file otherwise.
+        """
+        if self.filename is None:
+            return self._content.decode(self._charset, 'replace')
+        self._content.seek(0)
+        return FileUpload(self.name, self.filename, self.content_type,
+                          self._content, self._size)
+
+    def close(self):
+        """Discard the content of the part."""
+        if self.filename is None:
+            del self._content[:]
+        else:
+            self._content.close()
+
+
+class FileUpload:
+
+    """File uploaded in a multipart/form-data request.
+
+    The *filename* is the filename sent by the client. It must not be
+    used as a path in the local filesystem without sanitizing it.
+
+    Attributes:
+      name (str): Name of the form field.
+      filename (str): Filename sent by the client.
+      content_type (str): Content-Type of the file sent by the client.
+      size (int): Size of the file in bytes.
+      file (file object): File object containing the uploaded content.
+    """
+
+    def __init__(self, name, filename, content_type, file, size):
+        """Initialize the uploaded file.
+
+        Arguments:
+          name (str): Name of the form field.
+          filename (str): Filename sent by the client.
+          content_type (str): Content-Type of the file.
+          file (file object): File object positioned at the beginning
+            of the uploaded content.
+          size (int): Size of the file in bytes.
+        """
+        self.name = name
+        self.filename = filename
+        self.content_type = content_type
+        self.file = file
+        self.size = size
+
+    def read(self, size=-1):
+        """Read and return at most *size* bytes from the file.
+
+        Arguments:
+          size (int, optional): Maximum number of bytes to read,
+            defaults to ``-1``, i.e. read until the end of the file.
+
+        Returns:
+          bytes: Bytes read from the file.
+        """
+        return self.file.read(size)
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        """Change the position in the file.
+
+        Arguments:
+          offset (int): Offset relative to the position indicated by
+            *whence*.
+          whence (int, optional): Reference position.
+
+        Returns:
+          int: New absolute position.
+        """
+        return self.file.seek(offset, whence)
+
+    def tell(self):
+        """Return the current position in the file."""
+        return self.file.tell()
+
+    def close(self):
+        """Close the file and remove it if it was spooled to disk."""
+        self.file.close()
+
+
+class FileBody:
+
+    """Open file to be sent as the response body.
+
+    Attributes:
+      file (file): File opened in binary mode.
+      size (int): Number of bytes to send from the current position of
+        the file.
+      block_size (int): Number of bytes to read from the file at a time
+        when the file is not sent by the WSGI server.
+    """
+
+    block_size = 65536
+
+    def __init__(self, file, size=None):
+        """Initialize the file body.
+
+        Arguments:
+          file (file): File opened in binary mode.
+          size (int, optional): Number of bytes to send, defaults to
+            ``None``, i.e. the rest of the file.
+        """
+        self.file = file
+        if size is None:
+            position = file.tell()
+            size = file.seek(0, os.SEEK_END) - position
+            file.seek(position)
+        self.size = size
+
+    def wsgi_body(self, file_wrapper=None):
+        """Return the file as a WSGI response body.
+
+        Arguments:
+          file_wrapper (callable, optional): The ``wsgi.file_wrapper``
+            of the WSGI server.
+
+        Returns:
+          iterable: Iterable of bytes that closes the file when it is
+          closed.
+        """
+        if file_wrapper is not None:
+            f = self.file
+            try:
+                partial = f.tell() + self.size < os.fstat(f.fileno()).st_size
+            except (AttributeError, OSError, ValueError):
+                partial = True
+            if partial:
+                f = _FileRange(f, self.size)
+            return file_wrapper(f, self.block_size)
+        if self.size <= self.block_size:
+            with self.file:
+                return [self.file.read(self.size)]
+        return self
+
+    def __iter__(self):
+        """Read the file one block at a time.
+
+        Yields:
+          bytes: Next block of the file.
+        """
+        remaining = self.size
+        while remaining > 0:
+            block = self.file.read(min(self.block_size, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            yield block
+
+    def close(self):
+        """Close the file."""
+        self.file.close()
+
+
+class _FileRange:
+
+    """File-like object that reads a limited number of bytes of a file.
+
+    A file wrapper of a WSGI server reads a file until its end. This
+    object stops it at the end of a range of the file, while exposing
+    the descriptor and position of the file for servers that send the
+    file with ``sendfile``.
+    """
+
+    def __init__(self, file, size):
+        """Initialize the range.
+
+        Arguments:
+          file (file): File opened in binary mode and positioned at the
+            beginning of the range.
+          size (int): Number of bytes in the range.
+        """
+        self._file = file
+        self._remaining = size
+
+    def read(self, size=-1):
+        """Read at most *size* bytes from the rest of the range."""
+        if size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._file.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def fileno(self):
+        """Return the file descriptor of the file."""
+        return self._file.fileno()
+
+    def tell(self):
+        """Return the current position in the file."""
+        return self._file.tell()
+
+    def close(self):
+        """Close the file."""
+        self._file.close()
+
+
+class Response:
+
+    """Current response.
+
+    Attributes:
+      start (callable): Callable that starts response.
+      status (int): HTTP response status code, defaults to 200.
+      media_type (str): Media type of HTTP response, defaults to
+        'text/html'. This together with :attr:`charset` determines the
+        Content-Type response header.
+      charset (str): Character set of HTTP response, defaults to
+        'UTF-8'. This together with :attr:`media_type` determines the
+        Content-Type response header.
+      body (str, bytes, iterator or FileBody): HTTP response body. An
+        iterator body, e.g. a generator, produces the body in chunks of
+        str or bytes that are sent as they are produced.
+      file_wrapper (callable): The ``wsgi.file_wrapper`` of the WSGI
+        server or ``None`` if the server does not provide one.
+    """
+
+    # Convert HTTP response status codes, phrases and detail in
+    # http.server module into a dictionary of objects
+    _Status = collections.namedtuple('_Status', ('phrase', 'detail'))
 
     _responses = {}
 
@@ -749,13 +3094,16 @@ class Response:
         _responses[k] = _Status(*v)
     del k, v
 
-    def __init__(self, start_response_callable):
+    def __init__(self, start_response_callable, file_wrapper=None):
         """Initialize the current response object.
 
         Arguments:
           start_response_callable (callable): Callable that starts response.
+          file_wrapper (callable, optional): The ``wsgi.file_wrapper`` of
+            the WSGI server.
         """
         self.start = start_response_callable
+        self.file_wrapper = file_wrapper
         self.status = 200
         self.media_type = 'text/html'
         self.charset = 'UTF-8'
@@ -766,9 +3114,36 @@ class Response:
     def response(self):
         """Return the HTTP response body.
 
+        If :attr:`body` is an iterator, the Content-Length header is
+        sent only if it has been added with :meth:`add_header`, and the
+        body is returned as an iterator that encodes each chunk when the
+        WSGI server asks for it.
+
+        A 304 Not Modified response has no body and no Content-Type and
+        Content-Length headers.
+
+        If :attr:`body` is a :class:`FileBody`, the file is returned
+        wrapped with :attr:`file_wrapper`, so that the server can send
+        it without reading it into memory. Without a file wrapper, a
+        file no larger than :attr:`FileBody.block_size` is read whole
+        and a larger file is returned as an iterator that reads it one
+        block at a time.
+
         Returns:
-          bytes: HTTP response body as a sequence of bytes
+          iterable: HTTP response body as an iterable of bytes
         """
+        if self.status == 304:
+            self.start(self.status_line, self._headers)
+            return []
+        if isinstance(self.body, FileBody):
+            self.add_header('Content-Type', self.content_type)
+            self.add_header('Content-Length', str(self.body.size))
+            self.start(self.status_line, self._headers)
+            return self.body.wsgi_body(self.file_wrapper)
+        if isinstance(self.body, collections.abc.Iterator):
+            self.add_header('Content-Type', self.content_type)
+            self.start(self.status_line, self._headers)
+            return self._stream(self.body)
         if isinstance(self.body, bytes):
             out = self.body
         elif isinstance(self.body, str):
@@ -781,6 +3156,34 @@ class Response:
         self.start(self.status_line, self._headers)
         return [out]
 
+    def _stream(self, body):
+        """Encode chunks of an iterator body.
+
+        Arguments:
+          body (iterator): Iterator of str or bytes chunks.
+
+        Yields:
+          bytes: Next non-empty chunk of the body.
+
+        Raises:
+          Error: When the iterator produces a chunk that is neither str
+          nor bytes.
+        """
+        try:
+            for chunk in body:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode(self.charset)
+                elif not isinstance(chunk, bytes):
+                    raise Error('Response body iterator produced invalid '
+                                'chunk: {}: {!r}'.format(
+                                type(chunk).__name__, chunk))
+                if chunk:
+                    yield chunk
+        finally:
+            close = getattr(body, 'close', None)
+            if close is not None:
+                close()
+
     def add_header(self, name, value):
         """Add an HTTP header to response object.
 
@@ -849,15 +3252,53 @@ class Response:
             return self.media_type
 
 
-class MultiDict(collections.UserDict):
+class MultiDict(collections.abc.MutableMapping):
 
     """Dictionary with multiple values for a key.
 
     Setting an existing key to a new value merely adds the value to the
     list of values for the key. Getting the value of an existing key
     returns the newest value set for the key.
+
+    Attributes:
+      data (dict): Dictionary that maps each key to the list of its
+        values.
     """
 
+    __slots__ = ('data',)
+
+    def __init__(self, *args, **kwargs):
+        """Initialize the dictionary.
+
+        The arguments are added to the dictionary in the same way as
+        the arguments of :meth:`update`.
+        """
+        self.data = {}
+        if args or kwargs:
+            self.update(*args, **kwargs)
+
+    @classmethod
+    def from_pairs(cls, pairs):
+        """Create a dictionary from key-value pairs.
+
+        Arguments:
+          pairs (iterable): Iterable of key-value pairs.
+
+        Returns:
+          MultiDict: Dictionary with the values of every key in the
+          order in which they occur in *pairs*.
+        """
+        data = {}
+        for key, value in pairs:
+            values = data.get(key)
+            if values is None:
+                data[key] = [value]
+            else:
+                values.append(value)
+        d = cls.__new__(cls)
+        d.data = data
+        return d
+
     def __setitem__(self, key, value):
         """Adds value to the list of values for the specified key.
 
@@ -865,10 +3306,11 @@ class MultiDict(collections.UserDict):
           key (object): Key
           value (object): Value
         """
-        if key not in self.data:
+        values = self.data.get(key)
+        if values is None:
             self.data[key] = [value]
         else:
-            self.data[key].append(value)
+            values.append(value)
 
     def __getitem__(self, key):
         """Return the newest value for the specified key.
@@ -881,9 +3323,47 @@ class MultiDict(collections.UserDict):
         """
         return self.data[key][-1]
 
+    def __delitem__(self, key):
+        """Remove all values for the specified key.
+
+        Arguments:
+          key (object): Key
+        """
+        del self.data[key]
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def __len__(self):
+        return len(self.data)
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def __repr__(self):
+        return '{}({!r})'.format(type(self).__name__, self.data)
+
+    def get(self, key, default=None):
+        """Return the newest value for the specified key.
+
+        Arguments:
+          key (object): Key
+          default (object): Default value to return if the key does not
+            exist, defaults to ``None``.
+
+        Returns:
+          object: Newest value for the specified key if the key exists,
+          ``default`` otherwise.
+        """
+        values = self.data.get(key)
+        return default if values is None else values[-1]
+
     def getall(self, key, default=[]):
         """Return the list of all values for the specified key.
 
+        The list returned for an existing key is the list in which the
+        values are stored, not a copy, so it must not be modified.
+
         Arguments:
           key (object): Key
           default (list): Default value to return if the key does not
@@ -893,7 +3373,343 @@ class MultiDict(collections.UserDict):
           list: List of all values for the specified key if the key
           exists, ``default`` otherwise.
         """
-        return self.data[key] if key in self.data else default
+        return self.data.get(key, default)
+
+    def copy(self):
+        """Return a copy of the dictionary.
+
+        Returns:
+          MultiDict: Dictionary with copies of the lists of values.
+        """
+        d = type(self)()
+        d.data = {key: list(values) for key, values in self.data.items()}
+        return d
+
+
+class FrozenMultiDict(MultiDict):
+
+    """Immutable dictionary with multiple values for a key.
+
+    The values of every key are stored in a tuple, so :meth:`getall`
+    returns a tuple for an existing key. Setting or deleting a key
+    raises :exc:`TypeError`.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, *args, **kwargs):
+        """Initialize the dictionary.
+
+        The arguments are interpreted in the same way as the arguments
+        of :class:`MultiDict`.
+        """
+        self.data = self._freeze(MultiDict(*args, **kwargs).data)
+
+    @classmethod
+    def from_pairs(cls, pairs):
+        """Create a dictionary from key-value pairs.
+
+        Arguments:
+          pairs (iterable): Iterable of key-value pairs.
+
+        Returns:
+          FrozenMultiDict: Dictionary with the values of every key in
+          the order in which they occur in *pairs*.
+        """
+        d = cls.__new__(cls)
+        d.data = cls._freeze(MultiDict.from_pairs(pairs).data)
+        return d
+
+    @staticmethod
+    def _freeze(data):
+        """Return a copy of *data* with lists of values as tuples."""
+        return {key: tuple(values) for key, values in data.items()}
+
+    def __setitem__(self, key, value):
+        raise TypeError('{} does not support item assignment'
+                        .format(type(self).__name__))
+
+    def __delitem__(self, key):
+        raise TypeError('{} does not support item deletion'
+                        .format(type(self).__name__))
+
+    def copy(self):
+        """Return a mutable copy of the dictionary.
+
+        Returns:
+          MultiDict: Dictionary with lists of values.
+        """
+        d = MultiDict()
+        d.data = {key: list(values) for key, values in self.data.items()}
+        return d
+
+
+def _decompress(chunks, encoding, limit, chunk_size):
+    """Decompress chunks of a request body.
+
+    No more than *chunk_size* bytes are decompressed at a time, so that
+    a small body that decompresses to a huge body is rejected before
+    the decompressed body is held in memory.
+
+    Arguments:
+      chunks (iterable): Chunks of the compressed body as bytes-like
+        objects.
+      encoding (str): ``'gzip'`` or ``'deflate'``.
+      limit (int): Maximum size in bytes of the decompressed body or
+        ``None`` for no limit.
+      chunk_size (int): Maximum size in bytes of a decompressed chunk.
+
+    Yields:
+      memoryview: Next chunk of the decompressed body.
+
+    Raises:
+      RequestError: When the body is not valid compressed data or the
+      decompressed body is too large.
+    """
+    wbits = 16 + zlib.MAX_WBITS if encoding == 'gzip' else zlib.MAX_WBITS
+    decompressor = zlib.decompressobj(wbits)
+    received = False
+    size = 0
+    for data in chunks:
+        received = True
+        while True:
+            if decompressor.eof:
+                if not data:
+                    break
+                # A gzip body may consist of several members.
+                if encoding != 'gzip':
+                    raise RequestError(400, 'Invalid compressed body')
+                decompressor = zlib.decompressobj(wbits)
+            try:
+                out = decompressor.decompress(data, chunk_size)
+            except zlib.error:
+                raise RequestError(400, 'Invalid compressed body')
+            if decompressor.eof:
+                data = decompressor.unused_data
+            else:
+                data = decompressor.unconsumed_tail
+            if out:
+                size += len(out)
+                if limit is not None and size > limit:
+                    raise RequestError(413, 'Request body too large')
+                yield memoryview(out)
+            if not data and len(out) < chunk_size:
+                break
+    if received and not decompressor.eof:
+        raise RequestError(400, 'Incomplete compressed body')
+
+
+def _not_modified(if_none_match, if_modified_since, etag, mtime):
+    """Evaluate the preconditions of a conditional GET request.
+
+    Arguments:
+      if_none_match (str): Value of If-None-Match header or ``None``.
+      if_modified_since (str): Value of If-Modified-Since header or
+        ``None``.
+      etag (str): Entity tag of the current representation.
+      mtime (int): Modification time of the current representation in
+        seconds since the epoch.
+
+    Returns:
+      bool: ``True`` iff the client's copy is current and 304 Not
+      Modified should be returned.
+    """
+    if if_none_match is not None:
+        # Weak comparison as required for If-None-Match.
+        for tag in if_none_match.split(','):
+            tag = tag.strip()
+            if tag == '*' or tag.startswith('W/') and tag[2:] == etag:
+                return True
+            if tag == etag:
+                return True
+        return False
+    if if_modified_since is not None:
+        date = email.utils.parsedate_tz(if_modified_since)
+        if date is None:
+            return False
+        try:
+            return mtime <= email.utils.mktime_tz(date)
+        except (OverflowError, ValueError):
+            return False
+    return False
+
+
+def _parse_range(value, size, max_ranges=16):
+    """Parse the value of a Range header for a file.
+
+    Arguments:
+      value (str): Value of Range header, e.g. ``'bytes=0-99,200-'``.
+      size (int): Size of the file in bytes.
+      max_ranges (int, optional): Maximum number of ranges to accept.
+
+    Returns:
+      list or None: List of tuples of first and last byte positions of
+      the satisfiable ranges, which is empty if no range can be
+      satisfied, or ``None`` if the header is invalid or has more than
+      *max_ranges* ranges and must be ignored.
+    """
+    unit, _, specs = value.partition('=')
+    if unit.strip().lower() != 'bytes':
+        return None
+    specs = [spec.strip() for spec in specs.split(',') if spec.strip()]
+    if not specs or len(specs) > max_ranges:
+        return None
+    ranges = []
+    for spec in specs:
+        first, dash, last = spec.partition('-')
+        first, last = first.strip(), last.strip()
+        if (not dash or first and not _digits_re.match(first) or
+                last and not _digits_re.match(last) or
+                not first and not last):
+            return None
+        if not first:
+            suffix = int(last)
+            if suffix > 0 and size > 0:
+                ranges.append((max(0, size - suffix), size - 1))
+            continue
+        start = int(first)
+        if last and int(last) < start:
+            return None
+        if start < size:
+            end = size - 1 if not last else min(int(last), size - 1)
+            ranges.append((start, end))
+    return ranges
+
+
+def _file_validators(st):
+    """Return the ETag and Last-Modified header values of a file.
+
+    Arguments:
+      st (os.stat_result): Status of the file.
+
+    Returns:
+      tuple: Strong entity tag derived from the inode number, size and
+      modification time of the file, and its modification time as an
+      HTTP date.
+    """
+    etag = '"{:x}-{:x}-{:x}"'.format(st.st_ino, st.st_size, st.st_mtime_ns)
+    return etag, email.utils.formatdate(st.st_mtime, usegmt=True)
+
+
+def _byteranges(f, parts, tail, block_size):
+    """Read ranges of a file as a multipart/byteranges body.
+
+    Arguments:
+      f (file): File opened in binary mode.
+      parts (list): List of tuples of headers (bytes) and first and
+        last byte positions of each part.
+      tail (bytes): Closing delimiter of the body.
+      block_size (int): Number of bytes to read at a time.
+
+    Yields:
+      bytes: Next chunk of the body.
+    """
+    with f:
+        for head, start, end in parts:
+            yield head
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                block = f.read(min(block_size, remaining))
+                if not block:
+                    break
+                remaining -= len(block)
+                yield block
+            yield b'\r\n'
+        yield tail
+
+
+def _readinto(stream):
+    """Return the readinto method of a binary stream.
+
+    Arguments:
+      stream (object): Input stream.
+
+    Returns:
+      callable: Bound ``readinto`` method if *stream* is a binary
+      stream from the :mod:`io` module, ``None`` otherwise.
+    """
+    if isinstance(stream, (io.RawIOBase, io.BufferedIOBase)):
+        return stream.readinto
+    return None
+
+
+def _parse_urlencoded(body, charset):
+    """Parse an application/x-www-form-urlencoded string.
+
+    Fields with empty values are skipped.
+
+    Arguments:
+      body (str): Form data.
+      charset (str): Character set of the percent-encoded bytes.
+
+    Yields:
+      tuple: Name and value of the next field.
+    """
+    for field in body.split('&'):
+        name, _, value = field.partition('=')
+        if not value:
+            continue
+        if '%' in name or '+' in name:
+            name = urllib.parse.unquote_plus(name, charset, 'replace')
+        if '%' in value or '+' in value:
+            value = urllib.parse.unquote_plus(value, charset, 'replace')
+        yield name, value
+
+
+def _check_charset(charset):
+    """Return *charset* if it names a known text encoding.
+
+    Arguments:
+      charset (str): Character set from a request header.
+
+    Returns:
+      str: The character set.
+
+    Raises:
+      RequestError: When *charset* is not a known text encoding.
+    """
+    try:
+        info = codecs.lookup(charset)
+    except LookupError:
+        info = None
+    # Bytes-to-bytes codecs, e.g. base64, are found by lookup() but
+    # cannot decode bytes to str.
+    if info is None or not getattr(info, '_is_text_encoding', True):
+        raise RequestError(400, 'Unknown charset {!r}'.format(charset))
+    return charset
+
+
+def _parse_header(value):
+    """Parse a header value with parameters.
+
+    For example, ``'form-data; name="foo"'`` is parsed into
+    ``('form-data', {'name': 'foo'})``.
+
+    Arguments:
+      value (str): Header value.
+
+    Returns:
+      tuple: Main value in lowercase (str) and parameters (dict) with
+      parameter names in lowercase.
+    """
+    main, _, rest = value.partition(';')
+    params = {}
+    for name, param in _header_param_re.findall(';' + rest):
+        param = param.strip()
+        if len(param) >= 2 and param[0] == param[-1] == '"':
+            param = param[1:-1].replace('\\\\', '\\').replace('\\"', '"')
+        params[name.lower()] = param
+    return main.strip().lower(), params
+
+
+# Parameter name and value, which is either a quoted string or a token.
+_header_param_re = re.compile(r';\s*([^\s=;]+)\s*=\s*'
+                              r'("(?:[^"\\]|\\.)*"|[^;]*)')
+
+# ASCII digits only; str.isdigit() also accepts e.g. superscript digits,
+# which int() rejects.
+_digits_re = re.compile(r'[0-9]+\Z')
 
 
 class Error(Exception):
@@ -906,3 +3722,22 @@ class RouteError(Error):
 
 class LogicError(Error):
     """Logical error that can be avoided by careful coding."""
+
+
+class RequestError(Error):
+
+    """Request that cannot be processed due to a client error.
+
+    Attributes:
+      status (int): HTTP response status code for the error.
+    """
+
+    def __init__(self, status, message):
+        """Initialize the exception.
+
+        Arguments:
+          status (int): HTTP response status code for the error.
+          message (str): Description of the error.
+        """
+        super().__init__(message)
+        self.status = status
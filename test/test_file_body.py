@@ -0,0 +1,95 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2014-2017 Susam Pal
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Tests for class FileBody."""
+
+
+import io
+import unittest
+import wsgiref.util
+import ice
+from test import data
+
+
+class FileBodyTest(unittest.TestCase):
+
+    def test_size(self):
+        with open(data.filepath('foo.txt'), 'rb') as f:
+            self.assertEqual(ice.FileBody(f).size, 4)
+
+    def test_size_from_current_position(self):
+        f = io.BytesIO(b'hello, world')
+        f.seek(7)
+        b = ice.FileBody(f)
+        self.assertEqual(b.size, 5)
+        self.assertEqual(f.tell(), 7)
+
+    def test_explicit_size(self):
+        self.assertEqual(ice.FileBody(io.BytesIO(b'hello'), 3).size, 3)
+
+    def test_small_file_is_read_whole(self):
+        f = io.BytesIO(b'hello')
+        self.assertEqual(ice.FileBody(f).wsgi_body(), [b'hello'])
+        self.assertTrue(f.closed)
+
+    def test_large_file_is_read_in_blocks(self):
+        f = io.BytesIO(b'hello, world')
+        b = ice.FileBody(f)
+        b.block_size = 5
+        body = b.wsgi_body()
+        self.assertEqual(list(body), [b'hello', b', wor', b'ld'])
+        self.assertFalse(f.closed)
+        body.close()
+        self.assertTrue(f.closed)
+
+    def test_blocks_stop_at_size(self):
+        f = io.BytesIO(b'hello, world')
+        b = ice.FileBody(f, 7)
+        b.block_size = 5
+        self.assertEqual(list(b.wsgi_body()), [b'hello', b', '])
+
+    def test_file_wrapper(self):
+        f = open(data.filepath('foo.txt'), 'rb')
+        body = ice.FileBody(f).wsgi_body(wsgiref.util.FileWrapper)
+        self.assertIsInstance(body, wsgiref.util.FileWrapper)
+        self.assertIs(body.filelike, f)
+        self.assertEqual(b''.join(body), b'foo\n')
+        body.close()
+        self.assertTrue(f.closed)
+
+    def test_file_wrapper_with_range(self):
+        f = open(data.filepath('foo.txt'), 'rb')
+        f.seek(1)
+        body = ice.FileBody(f, 2).wsgi_body(wsgiref.util.FileWrapper)
+        self.assertIsNot(body.filelike, f)
+        self.assertEqual(body.filelike.fileno(), f.fileno())
+        self.assertEqual(body.filelike.tell(), 1)
+        self.assertEqual(b''.join(body), b'oo')
+        body.close()
+        self.assertTrue(f.closed)
+
+    def test_file_wrapper_without_fileno(self):
+        f = io.BytesIO(b'hello, world')
+        body = ice.FileBody(f, 5).wsgi_body(wsgiref.util.FileWrapper)
+        self.assertEqual(b''.join(body), b'hello')
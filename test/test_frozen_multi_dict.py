@@ -0,0 +1,83 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2014-2017 Susam Pal
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Tests for class FrozenMultiDict."""
+
+
+import unittest
+import ice
+
+
+class FrozenMultiDictTest(unittest.TestCase):
+
+    def test_from_pairs(self):
+        d = ice.FrozenMultiDict.from_pairs([('a', 'foo'), ('b', 'bar'),
+                                            ('a', 'baz')])
+        self.assertEqual(d.data, {'a': ('foo', 'baz'), 'b': ('bar',)})
+        self.assertEqual(d['a'], 'baz')
+        self.assertEqual(d.get('b'), 'bar')
+        self.assertEqual(len(d), 2)
+
+    def test_init(self):
+        d = ice.FrozenMultiDict({'a': 'foo'}, b='bar')
+        self.assertEqual(d.data, {'a': ('foo',), 'b': ('bar',)})
+
+    def test_is_multi_dict(self):
+        self.assertIsInstance(ice.FrozenMultiDict(), ice.MultiDict)
+
+    def test_getall(self):
+        d = ice.FrozenMultiDict.from_pairs([('a', 'foo'), ('a', 'bar')])
+        self.assertEqual(d.getall('a'), ('foo', 'bar'))
+        self.assertIs(d.getall('a'), d.data['a'])
+        self.assertEqual(d.getall('b'), [])
+
+    def test_setitem(self):
+        d = ice.FrozenMultiDict()
+        with self.assertRaises(TypeError):
+            d['a'] = 'foo'
+        self.assertEqual(d.data, {})
+
+    def test_delitem(self):
+        d = ice.FrozenMultiDict.from_pairs([('a', 'foo')])
+        with self.assertRaises(TypeError):
+            del d['a']
+        self.assertEqual(d['a'], 'foo')
+
+    def test_update(self):
+        d = ice.FrozenMultiDict()
+        with self.assertRaises(TypeError):
+            d.update({'a': 'foo'})
+
+    def test_pop(self):
+        d = ice.FrozenMultiDict.from_pairs([('a', 'foo')])
+        with self.assertRaises(TypeError):
+            d.pop('a')
+
+    def test_copy(self):
+        d = ice.FrozenMultiDict.from_pairs([('a', 'foo')])
+        c = d.copy()
+        c['a'] = 'bar'
+        self.assertIs(type(c), ice.MultiDict)
+        self.assertEqual(c.getall('a'), ['foo', 'bar'])
+        self.assertEqual(d.getall('a'), ('foo',))
@@ -0,0 +1,131 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2014-2017 Susam Pal
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Tests for class Headers."""
+
+
+import unittest
+import ice
+
+
+class HeadersTest(unittest.TestCase):
+
+    def setUp(self):
+        self.environ = {
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': '/',
+            'CONTENT_TYPE': 'text/plain',
+            'CONTENT_LENGTH': '3',
+            'HTTP_ACCEPT_ENCODING': 'gzip',
+            'HTTP_IF_NONE_MATCH': '"foo"',
+            'HTTP_X_CUSTOM_HEADER': 'bar',
+        }
+        self.headers = ice.Headers(self.environ)
+
+    def test_getitem(self):
+        self.assertEqual(self.headers['Content-Type'], 'text/plain')
+        self.assertEqual(self.headers['Content-Length'], '3')
+        self.assertEqual(self.headers['Accept-Encoding'], 'gzip')
+        self.assertEqual(self.headers['If-None-Match'], '"foo"')
+        self.assertEqual(self.headers['X-Custom-Header'], 'bar')
+
+    def test_getitem_is_case_insensitive(self):
+        for name in ('accept-encoding', 'ACCEPT-ENCODING',
+                     'Accept-encoding', 'aCCEPT-eNCODING'):
+            self.assertEqual(self.headers[name], 'gzip')
+        self.assertEqual(self.headers['x-custom-header'], 'bar')
+        self.assertEqual(self.headers['content-type'], 'text/plain')
+
+    def test_missing_header(self):
+        with self.assertRaises(KeyError) as cm:
+            self.headers['User-Agent']
+        self.assertEqual(str(cm.exception), "'User-Agent'")
+        self.assertIsNone(self.headers.get('X-Missing'))
+        self.assertEqual(self.headers.get('X-Missing', 'foo'), 'foo')
+
+    def test_non_string_key(self):
+        self.assertNotIn(1, self.headers)
+        self.assertIsNone(self.headers.get(None))
+
+    def test_contains(self):
+        self.assertIn('content-length', self.headers)
+        self.assertIn('X-Custom-Header', self.headers)
+        self.assertNotIn('Host', self.headers)
+
+    def test_empty_content_headers(self):
+        headers = ice.Headers({'CONTENT_TYPE': '', 'CONTENT_LENGTH': '',
+                               'HTTP_X_EMPTY': ''})
+        self.assertNotIn('Content-Type', headers)
+        self.assertNotIn('Content-Length', headers)
+        self.assertEqual(headers['X-Empty'], '')
+        self.assertEqual(list(headers), ['X-Empty'])
+
+    def test_content_headers_from_cgi_keys_only(self):
+        headers = ice.Headers({'HTTP_CONTENT_TYPE': 'text/html',
+                               'HTTP_CONTENT_LENGTH': '5'})
+        self.assertNotIn('Content-Type', headers)
+        self.assertEqual(list(headers), [])
+
+    def test_iter(self):
+        self.assertEqual(sorted(self.headers), [
+            'Accept-Encoding', 'Content-Length', 'Content-Type',
+            'If-None-Match', 'X-Custom-Header',
+        ])
+
+    def test_len(self):
+        self.assertEqual(len(self.headers), 5)
+        self.assertEqual(len(ice.Headers({})), 0)
+
+    def test_items(self):
+        self.assertEqual(dict(self.headers.items())['X-Custom-Header'],
+                         'bar')
+
+    def test_view_reflects_environ(self):
+        self.environ['HTTP_HOST'] = 'example.com'
+        self.assertEqual(self.headers['Host'], 'example.com')
+        del self.environ['HTTP_ACCEPT_ENCODING']
+        self.assertNotIn('Accept-Encoding', self.headers)
+
+    def test_read_only(self):
+        with self.assertRaises(TypeError):
+            self.headers['Host'] = 'example.com'
+        with self.assertRaises(AttributeError):
+            self.headers.foo = 'bar'
+
+    def test_environ_key(self):
+        self.assertEqual(ice.Headers.environ_key('Content-Type'),
+                         'CONTENT_TYPE')
+        self.assertEqual(ice.Headers.environ_key('content-length'),
+                         'CONTENT_LENGTH')
+        self.assertEqual(ice.Headers.environ_key('User-Agent'),
+                         'HTTP_USER_AGENT')
+        self.assertEqual(ice.Headers.environ_key('x-foo'), 'HTTP_X_FOO')
+        self.assertEqual(ice.Headers.environ_key('Content-type'),
+                         'CONTENT_TYPE')
+
+    def test_environ_key_precomputed(self):
+        for name in ('Content-Type', 'Content-Length', 'Accept-Encoding',
+                     'If-None-Match', 'if-none-match', 'IF-NONE-MATCH'):
+            self.assertIs(ice.Headers.environ_key(name),
+                          ice.Headers.environ_key(name))
@@ -25,6 +25,7 @@
 """Tests for class Ice."""
 
 
+import io
 import unittest
 import unittest.mock
 import ice
@@ -32,6 +33,10 @@ import threading
 import urllib.request
 import textwrap
 import time
+import os
+import tempfile
+import wsgiref.util
+import email.utils
 
 from test import data
 
@@ -57,6 +62,149 @@ class IceTest(unittest.TestCase):
         ])
         self.assertEqual(r, [expected.encode()])
 
+    def test_method_not_allowed(self):
+        app = ice.Ice()
+        app.get('/')(unittest.mock.Mock())
+        app.post('/foo')(unittest.mock.Mock())
+        app.route('PUT', '/<>')(unittest.mock.Mock())
+        m = unittest.mock.Mock()
+        r = app({'REQUEST_METHOD': 'POST', 'PATH_INFO': '/'}, m)
+        expected = '405 Method Not Allowed'
+        m.assert_called_with(expected, [
+            ('Allow', 'GET'),
+            ('Content-Type', 'text/plain; charset=UTF-8'),
+            ('Content-Length', str(len(expected)))
+        ])
+        self.assertEqual(r, [expected.encode()])
+
+        r = app({'REQUEST_METHOD': 'GET', 'PATH_INFO': '/foo'}, m)
+        m.assert_called_with(expected, [
+            ('Allow', 'POST, PUT'),
+            ('Content-Type', 'text/plain; charset=UTF-8'),
+            ('Content-Length', str(len(expected)))
+        ])
+
+    def test_not_found_resolves_method_once(self):
+        app = ice.Ice()
+        app.get('/<:int>')(unittest.mock.Mock())
+        app.post('/<:int>')(unittest.mock.Mock())
+        router = app._router
+        with unittest.mock.patch.object(
+                router, '_resolve_non_literal_route',
+                wraps=router._resolve_non_literal_route) as resolve:
+            app({'REQUEST_METHOD': 'GET', 'PATH_INFO': '/foo'},
+                unittest.mock.Mock())
+        self.assertEqual(app.response.status, 404)
+        self.assertEqual(resolve.call_args_list,
+                         [unittest.mock.call('GET', '/foo'),
+                          unittest.mock.call('POST', '/foo')])
+
+    def test_freeze(self):
+        app = ice.Ice()
+        app.get('/')(lambda: 'foo')
+
+        @app.error(404)
+        def error():
+            return 'bar'
+
+        app.freeze()
+        self.assertTrue(app.frozen)
+        with self.assertRaises(ice.LogicError) as cm:
+            app.get('/foo')
+        self.assertEqual(str(cm.exception),
+                         'Cannot add route to frozen application')
+        with self.assertRaises(ice.LogicError) as cm:
+            app.error()
+        self.assertEqual(str(cm.exception),
+                         'Cannot add error handler to frozen application')
+
+        m = unittest.mock.Mock()
+        r = app({'REQUEST_METHOD': 'GET', 'PATH_INFO': '/'}, m)
+        self.assertEqual(r, [b'foo'])
+        r = app({'REQUEST_METHOD': 'GET', 'PATH_INFO': '/foo'}, m)
+        self.assertEqual(r, [b'bar'])
+        r = app({'REQUEST_METHOD': 'POST', 'PATH_INFO': '/'}, m)
+        self.assertEqual(r, [b'501 Not Implemented'])
+
+    def test_freeze_with_fallback_error_handler(self):
+        app = ice.Ice()
+
+        @app.error()
+        def error():
+            return app.response.status_line.lower()
+
+        app.freeze()
+        r = app({'REQUEST_METHOD': 'GET', 'PATH_INFO': '/'},
+                unittest.mock.Mock())
+        self.assertEqual(r, [b'501 not implemented'])
+
+    def test_auto_freeze(self):
+        app = ice.Ice(auto_freeze=True)
+        app.get('/')(lambda: 'foo')
+        self.assertFalse(app.frozen)
+        r = app({'REQUEST_METHOD': 'GET', 'PATH_INFO': '/'},
+                unittest.mock.Mock())
+        self.assertEqual(r, [b'foo'])
+        self.assertTrue(app.frozen)
+
+    def test_mount(self):
+        app = ice.Ice()
+        admin = ice.Ice()
+        api = ice.Ice()
+        v1 = ice.Ice()
+        app.get('/')(lambda: 'home')
+        app.get('/admin/foo')(lambda: 'shadowed')
+        admin.get('/')(lambda: 'admin ' + admin.request.path)
+        admin.get('/<>')(lambda a: 'admin ' + a)
+        v1.get('/<:int>')(lambda a: 'v1 {}'.format(a))
+        api.mount('v1', v1)
+        app.mount('/admin/', admin)
+        app.mount('/api', api)
+
+        m = unittest.mock.Mock()
+        def get(path):
+            environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': path}
+            return environ, app(environ, m)
+
+        self.assertEqual(get('/')[1], [b'home'])
+        self.assertEqual(get('/admin')[1], [b'admin /'])
+        self.assertEqual(get('/admin/')[1], [b'admin /'])
+        self.assertEqual(get('/admin/foo')[1], [b'admin foo'])
+        self.assertEqual(get('/adminx')[1], [b'404 Not Found'])
+        environ, r = get('/api/v1/10')
+        self.assertEqual(r, [b'v1 10'])
+        self.assertEqual(environ['SCRIPT_NAME'], '/api/v1')
+        self.assertEqual(environ['PATH_INFO'], '/10')
+        self.assertEqual(get('/api/v2/10')[1], [b'501 Not Implemented'])
+
+    def test_mount_wsgi_callable(self):
+        app = ice.Ice()
+        child = unittest.mock.Mock(return_value=[b'foo'])
+        app.mount('static', child)
+        environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': '/static/a/b',
+                   'SCRIPT_NAME': '/app'}
+        m = unittest.mock.Mock()
+        self.assertEqual(app(environ, m), [b'foo'])
+        child.assert_called_with({'REQUEST_METHOD': 'GET',
+                                  'PATH_INFO': '/a/b',
+                                  'SCRIPT_NAME': '/app/static'}, m)
+
+    def test_mount_errors(self):
+        app = ice.Ice()
+        for prefix in ('', '/', '/foo/bar'):
+            with self.assertRaises(ice.RouteError) as cm:
+                app.mount(prefix, unittest.mock.Mock())
+            self.assertEqual(str(cm.exception),
+                             'Invalid mount prefix {!r}'.format(prefix))
+        child = ice.Ice()
+        app.mount('/foo', child)
+        app.freeze()
+        self.assertTrue(child.frozen)
+        with self.assertRaises(ice.LogicError) as cm:
+            app.mount('/bar', unittest.mock.Mock())
+        self.assertEqual(str(cm.exception),
+                         'Cannot mount application on frozen application')
+
     def test_get_route(self):
         expected = '<p>Foo</p>'
         app = ice.Ice()
@@ -113,6 +261,264 @@ class IceTest(unittest.TestCase):
             app({'REQUEST_METHOD': 'GET', 'PATH_INFO': '/'},
                 unittest.mock.Mock())
 
+    def test_request_error_in_callback(self):
+        app = ice.Ice()
+        @app.post('/')
+        def foo():
+            return app.request.form['a']
+
+        environ = {
+            'REQUEST_METHOD': 'POST',
+            'PATH_INFO': '/',
+            'wsgi.input': unittest.mock.Mock(),
+            'CONTENT_TYPE': 'multipart/form-data',
+        }
+        m = unittest.mock.Mock()
+        r = app(environ, m)
+        self.assertEqual(r, [b'400 Bad Request'])
+
+    def test_request_options(self):
+        app = ice.Ice()
+        app.request_options['max_body_size'] = 2
+        @app.post('/')
+        def foo():
+            return app.request.files['a']
+
+        environ = {
+            'REQUEST_METHOD': 'POST',
+            'PATH_INFO': '/',
+            'wsgi.input': unittest.mock.Mock(),
+            'CONTENT_TYPE': 'multipart/form-data; boundary=xyz',
+            'CONTENT_LENGTH': '3',
+        }
+        r = app(environ, unittest.mock.Mock())
+        self.assertEqual(app.response.status, 413)
+        self.assertEqual(r, [app.response.status_line.encode()])
+        self.assertEqual(app.request.max_body_size, 2)
+
+    def test_request_options_query_cache(self):
+        app = ice.Ice()
+        app.request_options['query_cache'] = ice.QueryCache(8)
+        @app.get('/')
+        def foo():
+            return app.request.query['a']
+
+        for _ in range(3):
+            r = app({'PATH_INFO': '/', 'QUERY_STRING': 'a=foo'},
+                    unittest.mock.Mock())
+            self.assertEqual(r, [b'foo'])
+        cache = app.request_options['query_cache']
+        self.assertEqual(cache.hits, 2)
+        self.assertEqual(cache.misses, 1)
+
+    def test_json(self):
+        app = ice.Ice()
+        @app.post('/')
+        def foo():
+            return str(app.request.json['a'])
+
+        def environ(body):
+            return {
+                'REQUEST_METHOD': 'POST',
+                'PATH_INFO': '/',
+                'CONTENT_TYPE': 'application/json',
+                'CONTENT_LENGTH': str(len(body)),
+                'wsgi.input': io.BytesIO(body),
+            }
+
+        r = app(environ(b'{"a": 42}'), unittest.mock.Mock())
+        self.assertEqual(r, [b'42'])
+        app(environ(b'{"a": '), unittest.mock.Mock())
+        self.assertEqual(app.response.status, 400)
+        app.request_options['max_json_size'] = 4
+        app(environ(b'{"a": 42}'), unittest.mock.Mock())
+        self.assertEqual(app.response.status, 413)
+
+    def test_unsupported_content_encoding(self):
+        app = ice.Ice()
+        @app.post('/')
+        def foo():
+            return app.request.form['a']
+
+        environ = {
+            'REQUEST_METHOD': 'POST',
+            'PATH_INFO': '/',
+            'HTTP_CONTENT_ENCODING': 'br',
+            'CONTENT_LENGTH': '5',
+            'wsgi.input': io.BytesIO(b'a=foo'),
+        }
+        app(environ, unittest.mock.Mock())
+        self.assertEqual(app.response.status, 415)
+
+    def test_max_body_size_rejects_content_length(self):
+        app = ice.Ice(max_body_size=4)
+        callback = unittest.mock.Mock(return_value='foo')
+        app.post('/')(callback)
+        @app.error(413)
+        def error():
+            return 'too large'
+
+        environ = {
+            'REQUEST_METHOD': 'POST',
+            'PATH_INFO': '/',
+            'wsgi.input': unittest.mock.Mock(),
+            'CONTENT_LENGTH': '5',
+        }
+        r = app(environ, unittest.mock.Mock())
+        self.assertEqual(app.response.status, 413)
+        self.assertEqual(r, [b'too large'])
+        callback.assert_not_called()
+        environ['wsgi.input'].read.assert_not_called()
+
+    def test_max_body_size_allows_content_length(self):
+        app = ice.Ice(max_body_size=4)
+        @app.post('/')
+        def foo():
+            return app.request.form['a']
+
+        environ = {
+            'REQUEST_METHOD': 'POST',
+            'PATH_INFO': '/',
+            'wsgi.input': io.BytesIO(b'a=xy'),
+            'CONTENT_LENGTH': '4',
+        }
+        r = app(environ, unittest.mock.Mock())
+        self.assertEqual(app.response.status, 200)
+        self.assertEqual(r, [b'xy'])
+
+    def test_route_max_body_size(self):
+        app = ice.Ice(max_body_size=4)
+        @app.post('/small', max_body_size=2)
+        def small():
+            return 'small'
+
+        @app.post('/large', max_body_size=8)
+        def large():
+            return app.request.form['a']
+
+        @app.post('/default')
+        def default():
+            return 'default'
+
+        def environ(path, body):
+            return {
+                'REQUEST_METHOD': 'POST',
+                'PATH_INFO': path,
+                'wsgi.input': io.BytesIO(body),
+                'CONTENT_LENGTH': str(len(body)),
+            }
+
+        app(environ('/small', b'a=x'), unittest.mock.Mock())
+        self.assertEqual(app.response.status, 413)
+        r = app(environ('/large', b'a=xyzw'), unittest.mock.Mock())
+        self.assertEqual(app.response.status, 200)
+        self.assertEqual(r, [b'xyzw'])
+        app(environ('/default', b'a=xyz'), unittest.mock.Mock())
+        self.assertEqual(app.response.status, 413)
+
+    def test_route_max_body_size_overrides_request_options(self):
+        app = ice.Ice()
+        app.request_options['max_body_size'] = 2
+        @app.post('/', max_body_size=8)
+        def foo():
+            return app.request.form['a']
+
+        environ = {
+            'REQUEST_METHOD': 'POST',
+            'PATH_INFO': '/',
+            'wsgi.input': io.BytesIO(b'a=xyzw'),
+            'CONTENT_LENGTH': '6',
+        }
+        r = app(environ, unittest.mock.Mock())
+        self.assertEqual(r, [b'xyzw'])
+
+    def test_max_body_size_counts_streamed_body(self):
+        app = ice.Ice()
+        callback = unittest.mock.Mock(
+            side_effect=lambda: app.request.form['a'])
+        app.route('POST', '/', max_body_size=4)(callback)
+        environ = {
+            'REQUEST_METHOD': 'POST',
+            'PATH_INFO': '/',
+            'wsgi.input': io.BytesIO(b'a=xyzw'),
+            'wsgi.input_terminated': True,
+        }
+        app.request_options['chunk_size'] = 2
+        r = app(environ, unittest.mock.Mock())
+        self.assertEqual(app.response.status, 413)
+        self.assertEqual(r, [app.response.status_line.encode()])
+        callback.assert_called_once_with()
+        self.assertEqual(environ['wsgi.input'].tell(), 6)
+
+    def test_max_body_size_invalid_content_length(self):
+        app = ice.Ice(max_body_size=4)
+        @app.post('/')
+        def foo():
+            return 'foo'
+
+        environ = {
+            'REQUEST_METHOD': 'POST',
+            'PATH_INFO': '/',
+            'wsgi.input': io.BytesIO(b''),
+            'CONTENT_LENGTH': 'abc',
+        }
+        app(environ, unittest.mock.Mock())
+        self.assertEqual(app.response.status, 400)
+
+    def test_max_body_size_shared_callback(self):
+        app = ice.Ice()
+        @app.post('/a', max_body_size=3)
+        @app.post('/b')
+        def foo():
+            return app.request.body_view().tobytes()
+
+        for path, status, body in (('/a', 413, None),
+                                   ('/b', 200, b'abcde')):
+            environ = {
+                'REQUEST_METHOD': 'POST',
+                'PATH_INFO': path,
+                'wsgi.input': io.BytesIO(b'abcde'),
+                'CONTENT_LENGTH': '5',
+            }
+            r = app(environ, unittest.mock.Mock())
+            self.assertEqual(app.response.status, status)
+            if body is not None:
+                self.assertEqual(r, [body])
+
+    def test_max_body_size_shared_callback_wildcard(self):
+        app = ice.Ice(engine='trie', cache_size=8)
+        @app.post('/<a>/x')
+        @app.post('/<a>/y', max_body_size=3)
+        def foo(a):
+            return a
+
+        for path, status in (('/a/x', 200), ('/a/y', 413),
+                             ('/a/x', 200), ('/a/y', 413)):
+            environ = {
+                'REQUEST_METHOD': 'POST',
+                'PATH_INFO': path,
+                'wsgi.input': io.BytesIO(b'abcde'),
+                'CONTENT_LENGTH': '5',
+            }
+            app(environ, unittest.mock.Mock())
+            self.assertEqual(app.response.status, status)
+
+    def test_max_body_size_frozen(self):
+        app = ice.Ice()
+        @app.post('/', max_body_size=1)
+        def foo():
+            return 'foo'
+
+        app.freeze()
+        environ = {
+            'REQUEST_METHOD': 'POST',
+            'PATH_INFO': '/',
+            'wsgi.input': io.BytesIO(b'ab'),
+            'CONTENT_LENGTH': '2',
+        }
+        app(environ, unittest.mock.Mock())
+        self.assertEqual(app.response.status, 413)
+
     def test_error_callback(self):
         expected = '<p>HTTP method not implemented</p>'
         app = ice.Ice()
@@ -169,6 +575,52 @@ class IceTest(unittest.TestCase):
         ])
         self.assertEqual(r, [expected2.encode()])
 
+    def test_generator_from_callback(self):
+        app = ice.Ice()
+        @app.get('/')
+        def foo():
+            app.response.media_type = 'text/csv'
+            yield 'a,b\r\n'
+            for i in range(3):
+                yield '{},{}\r\n'.format(i, i * i).encode()
+
+        m = unittest.mock.Mock()
+        r = app({'REQUEST_METHOD': 'GET', 'PATH_INFO': '/'}, m)
+        self.assertEqual(b''.join(r), b'a,b\r\n0,0\r\n1,1\r\n2,4\r\n')
+        m.assert_called_with('200 OK', [
+            ('Content-Type', 'text/html; charset=UTF-8'),
+        ])
+
+    def test_iterator_from_callback(self):
+        app = ice.Ice()
+        @app.get('/')
+        def foo():
+            app.response.media_type = 'application/x-ndjson'
+            return map('{}\n'.format, range(3))
+
+        m = unittest.mock.Mock()
+        r = app({'REQUEST_METHOD': 'GET', 'PATH_INFO': '/'}, m)
+        self.assertEqual(list(r), [b'0\n', b'1\n', b'2\n'])
+        m.assert_called_with('200 OK', [
+            ('Content-Type', 'application/x-ndjson'),
+        ])
+
+    def test_streamed_response_with_simple_server(self):
+        app = self.app = ice.Ice()
+        @app.get('/')
+        def foo():
+            return ('line {}\n'.format(i) for i in range(1000))
+
+        threading.Thread(target=app.run).start()
+        while not app.running():
+            time.sleep(0.1)
+
+        expected = ''.join('line {}\n'.format(i) for i in range(1000))
+        r = urllib.request.urlopen('http://127.0.0.1:8080/')
+        self.assertEqual(r.status, 200)
+        self.assertIsNone(r.getheader('Content-Length'))
+        self.assertEqual(r.read().decode(), expected)
+
     def test_invalid_return_type_from_callback(self):
         app = ice.Ice()
         @app.get('/')
@@ -305,11 +757,16 @@ class IceTest(unittest.TestCase):
         def bar():
             return app.static(data.dirpath, 'bar', 'text/html')
 
+        foo_etag, foo_modified = self.validators(data.filepath('foo.txt'))
+        bar_etag, bar_modified = self.validators(data.filepath('bar'))
         m = unittest.mock.Mock()
 
         expected = 'foo\n'
         r = app({'REQUEST_METHOD': 'GET', 'PATH_INFO': '/foo'}, m)
         m.assert_called_with('200 OK', [
+            ('ETag', foo_etag),
+            ('Last-Modified', foo_modified),
+            ('Accept-Ranges', 'bytes'),
             ('Content-Type', 'text/plain; charset=UTF-8'),
             ('Content-Length', str(len(expected)))
         ])
@@ -318,11 +775,460 @@ class IceTest(unittest.TestCase):
         expected = '<p>bar</p>\n'
         r = app({'REQUEST_METHOD': 'GET', 'PATH_INFO': '/bar'}, m)
         m.assert_called_with('200 OK', [
+            ('ETag', bar_etag),
+            ('Last-Modified', bar_modified),
+            ('Accept-Ranges', 'bytes'),
             ('Content-Type', 'text/html; charset=UTF-8'),
             ('Content-Length', str(len(expected)))
         ])
         self.assertEqual(r, [expected.encode()])
 
+    def test_static_with_file_wrapper(self):
+        app = ice.Ice()
+
+        @app.get('/')
+        def foo():
+            return app.static(data.dirpath, 'foo.txt')
+
+        etag, modified = self.validators(data.filepath('foo.txt'))
+        m = unittest.mock.Mock()
+        environ = {
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': '/',
+            'wsgi.file_wrapper': wsgiref.util.FileWrapper,
+        }
+        r = app(environ, m)
+        m.assert_called_with('200 OK', [
+            ('ETag', etag),
+            ('Last-Modified', modified),
+            ('Accept-Ranges', 'bytes'),
+            ('Content-Type', 'text/plain; charset=UTF-8'),
+            ('Content-Length', '4')
+        ])
+        self.assertIsInstance(r, wsgiref.util.FileWrapper)
+        self.assertEqual(b''.join(r), b'foo\n')
+        r.close()
+
+    def test_static_large_file(self):
+        app = ice.Ice()
+        content = bytes(range(256)) * 1024
+
+        with tempfile.TemporaryDirectory() as root:
+            with open(os.path.join(root, 'large.bin'), 'wb') as f:
+                f.write(content)
+
+            @app.get('/')
+            def foo():
+                return app.static(root, 'large.bin')
+
+            etag, modified = self.validators(
+                os.path.join(root, 'large.bin'))
+            m = unittest.mock.Mock()
+            r = app({'REQUEST_METHOD': 'GET', 'PATH_INFO': '/'}, m)
+            m.assert_called_with('200 OK', [
+                ('ETag', etag),
+                ('Last-Modified', modified),
+                ('Accept-Ranges', 'bytes'),
+                ('Content-Type', 'application/octet-stream'),
+                ('Content-Length', str(len(content)))
+            ])
+            self.assertNotIsInstance(r, list)
+            self.assertEqual(b''.join(r), content)
+            r.close()
+
+    @unittest.skipUnless(hasattr(os, 'sendfile'), 'requires os.sendfile')
+    def test_static_with_simple_server(self):
+        app = self.app = ice.Ice()
+        content = bytes(range(256)) * 1024
+
+        with tempfile.TemporaryDirectory() as root:
+            with open(os.path.join(root, 'large.bin'), 'wb') as f:
+                f.write(content)
+
+            @app.get('/<path:path>')
+            def foo(path):
+                return app.static(root, path)
+
+            threading.Thread(target=app.run).start()
+            while not app.running():
+                time.sleep(0.1)
+
+            with unittest.mock.patch('os.sendfile',
+                                     wraps=os.sendfile) as sendfile:
+                r = urllib.request.urlopen(
+                    'http://127.0.0.1:8080/large.bin')
+                self.assertEqual(r.getheader('Content-Length'),
+                                 str(len(content)))
+                self.assertEqual(r.read(), content)
+                self.assertTrue(sendfile.called)
+
+                request = urllib.request.Request(
+                    'http://127.0.0.1:8080/large.bin',
+                    headers={'Range': 'bytes=1000-99999'})
+                r = urllib.request.urlopen(request)
+                self.assertEqual(r.status, 206)
+                self.assertEqual(r.getheader('Content-Range'),
+                                 'bytes 1000-99999/{}'.format(len(content)))
+                self.assertEqual(r.read(), content[1000:100000])
+
+    def validators(self, path):
+        st = os.stat(path)
+        etag = '"{:x}-{:x}-{:x}"'.format(st.st_ino, st.st_size,
+                                         st.st_mtime_ns)
+        return etag, email.utils.formatdate(st.st_mtime, usegmt=True)
+
+    def range_app(self):
+        app = ice.Ice()
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.range_path = os.path.join(root.name, 'data.txt')
+        with open(self.range_path, 'wb') as f:
+            f.write(b'0123456789abcdef')
+
+        @app.route('GET', '/')
+        @app.route('POST', '/')
+        def foo():
+            return app.static(root.name, 'data.txt')
+        return app
+
+    def get_range(self, app, value, method='GET', **environ):
+        environ.update({'REQUEST_METHOD': method, 'PATH_INFO': '/',
+                        'HTTP_RANGE': value})
+        m = unittest.mock.Mock()
+        r = app(environ, m)
+        body = b''.join(r)
+        if hasattr(r, 'close'):
+            r.close()
+        return m.call_args[0], body
+
+    def test_static_single_range(self):
+        app = self.range_app()
+        etag, modified = self.validators(self.range_path)
+        cases = [
+            ('bytes=2-5', 'bytes 2-5/16', b'2345'),
+            ('bytes=10-', 'bytes 10-15/16', b'abcdef'),
+            ('bytes=-3', 'bytes 13-15/16', b'def'),
+            ('bytes=-100', 'bytes 0-15/16', b'0123456789abcdef'),
+            ('bytes=14-100', 'bytes 14-15/16', b'ef'),
+            ('Bytes = 0-0', 'bytes 0-0/16', b'0'),
+            ('bytes=100-,3-3', 'bytes 3-3/16', b'3'),
+        ]
+        for value, content_range, expected in cases:
+            (status, headers), body = self.get_range(app, value)
+            self.assertEqual(status, '206 Partial Content')
+            self.assertEqual(headers, [
+                ('ETag', etag),
+                ('Last-Modified', modified),
+                ('Accept-Ranges', 'bytes'),
+                ('Content-Range', content_range),
+                ('Content-Type', 'text/plain; charset=UTF-8'),
+                ('Content-Length', str(len(expected))),
+            ])
+            self.assertEqual(body, expected)
+
+    def test_static_single_range_with_file_wrapper(self):
+        app = self.range_app()
+        (status, headers), body = self.get_range(
+            app, 'bytes=2-5', **{'wsgi.file_wrapper':
+                                 wsgiref.util.FileWrapper})
+        self.assertEqual(status, '206 Partial Content')
+        self.assertEqual(body, b'2345')
+
+    def test_static_multiple_ranges(self):
+        app = self.range_app()
+        (status, headers), body = self.get_range(app, 'bytes=0-1, -2')
+        self.assertEqual(status, '206 Partial Content')
+        headers = dict(headers)
+        media_type, _, boundary = headers['Content-Type'].partition(
+            '; boundary=')
+        self.assertEqual(media_type, 'multipart/byteranges')
+        self.assertEqual(headers['Content-Length'], str(len(body)))
+        expected = (
+            '--{0}\r\n'
+            'Content-Type: text/plain; charset=UTF-8\r\n'
+            'Content-Range: bytes 0-1/16\r\n'
+            '\r\n'
+            '01\r\n'
+            '--{0}\r\n'
+            'Content-Type: text/plain; charset=UTF-8\r\n'
+            'Content-Range: bytes 14-15/16\r\n'
+            '\r\n'
+            'ef\r\n'
+            '--{0}--\r\n'
+        ).format(boundary).encode()
+        self.assertEqual(body, expected)
+
+    def test_static_unsatisfiable_range(self):
+        app = self.range_app()
+        for value in ('bytes=16-', 'bytes=100-200', 'bytes=-0'):
+            (status, headers), body = self.get_range(app, value)
+            self.assertEqual(status, '416 ' + ice.Response._responses[
+                416].phrase)
+            self.assertIn(('Content-Range', 'bytes */16'), headers)
+
+    def test_static_invalid_range(self):
+        app = self.range_app()
+        for value in ('bytes=5-2', 'items=0-1', 'bytes=abc', 'bytes=',
+                      'bytes=1', 'bytes=-', '0-1', 'bytes=\xb2-',
+                      'bytes=-\xb9', 'bytes=0-\xb3', 'bytes=\u0661-',
+                      'bytes=' + ','.join(['0-0'] * 17)):
+            (status, headers), body = self.get_range(app, value)
+            self.assertEqual(status, '200 OK')
+            self.assertEqual(body, b'0123456789abcdef')
+
+    def test_static_range_ignored_for_post(self):
+        app = self.range_app()
+        (status, headers), body = self.get_range(app, 'bytes=0-1', 'POST')
+        self.assertEqual(status, '200 OK')
+        self.assertEqual(body, b'0123456789abcdef')
+
+    def test_download_static_range(self):
+        app = ice.Ice()
+
+        @app.get('/')
+        def foo():
+            return app.download(app.static(data.dirpath, 'foo.txt'))
+
+        etag, modified = self.validators(data.filepath('foo.txt'))
+        m = unittest.mock.Mock()
+        r = app({'REQUEST_METHOD': 'GET', 'PATH_INFO': '/',
+                 'HTTP_RANGE': 'bytes=1-'}, m)
+        m.assert_called_with('206 Partial Content', [
+            ('ETag', etag),
+            ('Last-Modified', modified),
+            ('Accept-Ranges', 'bytes'),
+            ('Content-Range', 'bytes 1-3/4'),
+            ('Content-Disposition', 'attachment; filename="foo.txt"'),
+            ('Content-Type', 'text/plain; charset=UTF-8'),
+            ('Content-Length', '3')
+        ])
+        self.assertEqual(r, [b'oo\n'])
+
+        r = app({'REQUEST_METHOD': 'GET', 'PATH_INFO': '/',
+                 'HTTP_RANGE': 'bytes=0-1,3-'}, m)
+        status, headers = m.call_args[0]
+        body = b''.join(r)
+        self.assertEqual(status, '206 Partial Content')
+        headers = dict(headers)
+        media_type, _, boundary = headers['Content-Type'].partition(
+            '; boundary=')
+        self.assertEqual(media_type, 'multipart/byteranges')
+        self.assertEqual(headers['Content-Disposition'],
+                         'attachment; filename="foo.txt"')
+        self.assertEqual(headers['Content-Length'], str(len(body)))
+        expected = (
+            '--{0}\r\n'
+            'Content-Type: text/plain; charset=UTF-8\r\n'
+            'Content-Range: bytes 0-1/4\r\n'
+            '\r\n'
+            'fo\r\n'
+            '--{0}\r\n'
+            'Content-Type: text/plain; charset=UTF-8\r\n'
+            'Content-Range: bytes 3-3/4\r\n'
+            '\r\n'
+            '\n\r\n'
+            '--{0}--\r\n'
+        ).format(boundary).encode()
+        self.assertEqual(body, expected)
+
+    def get_static(self, app, method='GET', **headers):
+        environ = {'REQUEST_METHOD': method, 'PATH_INFO': '/'}
+        for name, value in headers.items():
+            environ['HTTP_' + name.upper()] = value
+        m = unittest.mock.Mock()
+        r = app(environ, m)
+        body = b''.join(r)
+        if hasattr(r, 'close'):
+            r.close()
+        return m.call_args[0], body
+
+    def test_static_if_none_match(self):
+        app = self.range_app()
+        etag, modified = self.validators(self.range_path)
+        for value in (etag, 'W/' + etag, '"foo", ' + etag, '*'):
+            (status, headers), body = self.get_static(
+                app, if_none_match=value)
+            self.assertEqual(status, '304 Not Modified')
+            self.assertEqual(headers, [
+                ('ETag', etag),
+                ('Last-Modified', modified),
+            ])
+            self.assertEqual(body, b'')
+
+    def test_static_if_none_match_mismatch(self):
+        app = self.range_app()
+        etag, modified = self.validators(self.range_path)
+        (status, headers), body = self.get_static(
+            app, if_none_match='"foo"', if_modified_since=modified)
+        self.assertEqual(status, '200 OK')
+        self.assertEqual(body, b'0123456789abcdef')
+
+    def test_static_if_modified_since(self):
+        app = self.range_app()
+        os.utime(self.range_path, (1500000000, 1500000000))
+        etag, modified = self.validators(self.range_path)
+        for value in (modified, 'Sat, 15 Jul 2017 00:00:00 GMT',
+                      'Friday, 14-Jul-17 02:40:00 GMT'):
+            (status, headers), body = self.get_static(
+                app, if_modified_since=value)
+            self.assertEqual(status, '304 Not Modified')
+            self.assertEqual(body, b'')
+        for value in ('Fri, 14 Jul 2017 02:39:59 GMT', 'foo', ''):
+            (status, headers), body = self.get_static(
+                app, if_modified_since=value)
+            self.assertEqual(status, '200 OK')
+            self.assertEqual(body, b'0123456789abcdef')
+
+    def test_static_not_modified_reads_nothing(self):
+        app = self.range_app()
+        etag, modified = self.validators(self.range_path)
+        with unittest.mock.patch('os.stat', wraps=os.stat) as stat, \
+                unittest.mock.patch('builtins.open') as open_:
+            (status, headers), body = self.get_static(
+                app, if_none_match=etag)
+        self.assertEqual(status, '304 Not Modified')
+        self.assertEqual(stat.call_count, 1)
+        self.assertFalse(open_.called)
+
+    def test_static_conditional_post(self):
+        app = self.range_app()
+        etag, modified = self.validators(self.range_path)
+        (status, headers), body = self.get_static(
+            app, 'POST', if_none_match=etag)
+        self.assertEqual(status, '200 OK')
+
+    def test_static_if_range(self):
+        app = self.range_app()
+        etag, modified = self.validators(self.range_path)
+        for value in (etag, modified):
+            (status, headers), body = self.get_static(
+                app, range='bytes=0-1', if_range=value)
+            self.assertEqual(status, '206 Partial Content')
+            self.assertEqual(body, b'01')
+        for value in ('"foo"', 'W/' + etag,
+                      'Fri, 14 Jul 2017 02:40:00 GMT'):
+            (status, headers), body = self.get_static(
+                app, range='bytes=0-1', if_range=value)
+            self.assertEqual(status, '200 OK')
+            self.assertEqual(body, b'0123456789abcdef')
+
+    def test_static_cache(self):
+        app = self.range_app()
+        app.static_cache = ice.StaticCache(1024)
+        etag, modified = self.validators(self.range_path)
+        (status, headers), body = self.get_static(app)
+        with unittest.mock.patch('builtins.open') as open_:
+            (status2, headers2), body2 = self.get_static(app)
+        self.assertFalse(open_.called)
+        self.assertEqual(status2, '200 OK')
+        self.assertEqual(headers2, headers)
+        self.assertEqual(headers2, [
+            ('ETag', etag),
+            ('Last-Modified', modified),
+            ('Accept-Ranges', 'bytes'),
+            ('Content-Type', 'text/plain; charset=UTF-8'),
+            ('Content-Length', '16'),
+        ])
+        self.assertEqual(body2, b'0123456789abcdef')
+        self.assertEqual(app.static_cache.hits, 1)
+        self.assertEqual(app.static_cache.misses, 1)
+        self.assertEqual(app.static_cache.size, 16)
+
+    def test_static_cache_conditional_and_ranges(self):
+        app = self.range_app()
+        app.static_cache = ice.StaticCache(1024)
+        etag, modified = self.validators(self.range_path)
+        self.get_static(app)
+        (status, headers), body = self.get_static(app, if_none_match=etag)
+        self.assertEqual(status, '304 Not Modified')
+        self.assertEqual(body, b'')
+        (status, headers), body = self.get_static(app, range='bytes=2-4')
+        self.assertEqual(status, '206 Partial Content')
+        self.assertIn(('Content-Range', 'bytes 2-4/16'), headers)
+        self.assertEqual(body, b'234')
+        (status, headers), body = self.get_static(app, range='bytes=0-1,-2')
+        self.assertEqual(status, '206 Partial Content')
+        self.assertIn(b'\r\n\r\n01\r\n', body)
+        self.assertIn(b'\r\n\r\nef\r\n', body)
+        (status, headers), body = self.get_static(app, range='bytes=20-')
+        self.assertEqual(status, '416 Requested Range Not Satisfiable')
+        self.assertEqual(app.static_cache.hits, 4)
+
+    def test_static_cache_invalidation(self):
+        app = self.range_app()
+        app.static_cache = ice.StaticCache(1024, check_interval=0)
+        self.get_static(app)
+        with open(self.range_path, 'wb') as f:
+            f.write(b'foo')
+        os.utime(self.range_path, (1500000000, 1500000000))
+        (status, headers), body = self.get_static(app)
+        self.assertEqual(body, b'foo')
+        self.assertIn(('Last-Modified', 'Fri, 14 Jul 2017 02:40:00 GMT'),
+                      headers)
+        os.remove(self.range_path)
+        (status, headers), body = self.get_static(app)
+        self.assertEqual(status, '404 Not Found')
+        self.assertEqual(len(app.static_cache), 0)
+
+    def test_static_cache_skips_large_file(self):
+        for cache in (ice.StaticCache(1024, max_file_size=8),
+                      ice.StaticCache(8)):
+            app = self.range_app()
+            app.static_cache = cache
+            self.get_static(app)
+            with unittest.mock.patch('builtins.open',
+                                     wraps=open) as open_:
+                (status, headers), body = self.get_static(app)
+            self.assertEqual(body, b'0123456789abcdef')
+            self.assertEqual(open_.call_count, 1)
+            self.assertEqual(len(app.static_cache), 0)
+
+    def test_set_cache_control(self):
+        app = self.range_app()
+        root = os.path.dirname(self.range_path)
+        app.set_cache_control(root, 'public, max-age=60')
+        etag, modified = self.validators(self.range_path)
+        (status, headers), body = self.get_static(app)
+        self.assertEqual(headers[:4], [
+            ('ETag', etag),
+            ('Last-Modified', modified),
+            ('Cache-Control', 'public, max-age=60'),
+            ('Accept-Ranges', 'bytes'),
+        ])
+        (status, headers), body = self.get_static(app, if_none_match=etag)
+        self.assertEqual(status, '304 Not Modified')
+        self.assertIn(('Cache-Control', 'public, max-age=60'), headers)
+
+        app.set_cache_control(root + '/', None)
+        (status, headers), body = self.get_static(app)
+        self.assertNotIn('Cache-Control', dict(headers))
+
+    def test_set_cache_control_other_root(self):
+        app = self.range_app()
+        app.set_cache_control(data.dirpath, 'no-cache')
+        (status, headers), body = self.get_static(app)
+        self.assertNotIn('Cache-Control', dict(headers))
+
+    def test_set_cache_control_frozen(self):
+        app = ice.Ice()
+        app.freeze()
+        with self.assertRaises(ice.LogicError) as cm:
+            app.set_cache_control(data.dirpath, 'no-cache')
+        self.assertEqual(str(cm.exception),
+                         'Cannot set cache control on frozen application')
+
+    def test_not_modified_from_callback(self):
+        app = ice.Ice()
+
+        @app.get('/')
+        def foo():
+            return 304
+
+        m = unittest.mock.Mock()
+        r = app({'REQUEST_METHOD': 'GET', 'PATH_INFO': '/'}, m)
+        m.assert_called_with('304 Not Modified', [])
+        self.assertEqual(r, [])
+
     def test_static_403_error(self):
         app = ice.Ice()
 
@@ -347,11 +1253,15 @@ class IceTest(unittest.TestCase):
         def foo():
             return app.static('/', data.filepath('foo.txt'))
 
+        etag, modified = self.validators(data.filepath('foo.txt'))
         m = unittest.mock.Mock()
 
         expected = 'foo\n'
         r = app({'REQUEST_METHOD': 'GET', 'PATH_INFO': '/'}, m)
         m.assert_called_with('200 OK', [
+            ('ETag', etag),
+            ('Last-Modified', modified),
+            ('Accept-Ranges', 'bytes'),
             ('Content-Type', 'text/plain; charset=UTF-8'),
             ('Content-Length', str(len(expected)))
         ])
@@ -374,6 +1284,19 @@ class IceTest(unittest.TestCase):
         ])
         self.assertEqual(r, [expected.encode()])
 
+    def test_static_path_with_null_byte(self):
+        app = ice.Ice()
+
+        @app.get('/<:path>')
+        def foo(path):
+            return app.static(data.dirpath, path)
+
+        for cache in (None, ice.StaticCache(1024)):
+            app.static_cache = cache
+            m = unittest.mock.Mock()
+            app({'REQUEST_METHOD': 'GET', 'PATH_INFO': '/foo\x00.txt'}, m)
+            self.assertEqual(m.call_args[0][0], '404 Not Found')
+
     def test_download_with_filename_argument(self):
         app = ice.Ice()
 
@@ -453,10 +1376,14 @@ class IceTest(unittest.TestCase):
         def foo():
             return app.download(app.static(data.dirpath, 'foo.txt'))
 
+        etag, modified = self.validators(data.filepath('foo.txt'))
         m = unittest.mock.Mock()
         expected = 'foo\n'
         r = app({'REQUEST_METHOD': 'GET', 'PATH_INFO': '/'}, m)
         m.assert_called_with('200 OK', [
+            ('ETag', etag),
+            ('Last-Modified', modified),
+            ('Accept-Ranges', 'bytes'),
             ('Content-Disposition', 'attachment; filename="foo.txt"'),
             ('Content-Type', 'text/plain; charset=UTF-8'),
             ('Content-Length', str(len(expected)))
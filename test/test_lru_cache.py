@@ -0,0 +1,72 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2014-2017 Susam Pal
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+
+"""Tests for class LRUCache."""
+
+
+import unittest
+import ice
+
+
+class LRUCacheTest(unittest.TestCase):
+
+    def test_get_and_put(self):
+        c = ice.LRUCache(2)
+        c.put('a', 'foo')
+        self.assertEqual(c.get('a'), 'foo')
+        self.assertIsNone(c.get('b'))
+        self.assertEqual(c.get('b', 'bar'), 'bar')
+        self.assertEqual((c.hits, c.misses), (1, 2))
+        self.assertAlmostEqual(c.hit_rate, 1 / 3)
+
+    def test_hit_rate_without_lookups(self):
+        self.assertEqual(ice.LRUCache(1).hit_rate, 0.0)
+
+    def test_eviction(self):
+        c = ice.LRUCache(2)
+        c.put('a', 'foo')
+        c.put('b', 'bar')
+        c.get('a')
+        c.put('c', 'baz')
+        self.assertIn('a', c)
+        self.assertNotIn('b', c)
+        self.assertIn('c', c)
+        self.assertEqual(len(c), 2)
+        self.assertEqual(c.evictions, 1)
+
+    def test_replace(self):
+        c = ice.LRUCache(2)
+        c.put('a', 'foo')
+        c.put('a', 'bar')
+        self.assertEqual(c.get('a'), 'bar')
+        self.assertEqual(len(c), 1)
+        self.assertEqual(c.evictions, 0)
+
+    def test_clear(self):
+        c = ice.LRUCache(2)
+        c.put('a', 'foo')
+        c.clear()
+        self.assertEqual(len(c), 0)
+        self.assertIsNone(c.get('a'))
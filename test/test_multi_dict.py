@@ -86,3 +86,67 @@ class MultiDictTest(unittest.TestCase):
     def test_getall_default_value_for_missing_key(self):
         d = ice.MultiDict()
         self.assertEqual(d.getall('a', 'foo'), 'foo')
+
+    def test_from_pairs(self):
+        d = ice.MultiDict.from_pairs([('a', 'foo'), ('b', 'bar'),
+                                      ('a', 'baz')])
+        self.assertEqual(d.data, {'a': ['foo', 'baz'], 'b': ['bar']})
+        self.assertEqual(d['a'], 'baz')
+        self.assertEqual(list(d), ['a', 'b'])
+
+    def test_from_pairs_iterator(self):
+        d = ice.MultiDict.from_pairs((k, 'foo') for k in 'aba')
+        self.assertEqual(d.data, {'a': ['foo', 'foo'], 'b': ['foo']})
+
+    def test_from_pairs_empty(self):
+        d = ice.MultiDict.from_pairs([])
+        self.assertEqual(d.data, {})
+
+    def test_init(self):
+        d = ice.MultiDict({'a': 'foo'}, b='bar')
+        self.assertEqual(d.data, {'a': ['foo'], 'b': ['bar']})
+
+    def test_getall_returns_stored_list(self):
+        d = ice.MultiDict()
+        d['a'] = 'foo'
+        self.assertIs(d.getall('a'), d.data['a'])
+
+    def test_delitem(self):
+        d = ice.MultiDict()
+        d['a'] = 'foo'
+        d['a'] = 'bar'
+        del d['a']
+        self.assertNotIn('a', d)
+        self.assertEqual(d.getall('a'), [])
+
+    def test_contains(self):
+        d = ice.MultiDict()
+        d['a'] = 'foo'
+        self.assertIn('a', d)
+        self.assertNotIn('b', d)
+
+    def test_items(self):
+        d = ice.MultiDict()
+        d['a'] = 'foo'
+        d['a'] = 'bar'
+        d['b'] = 'baz'
+        self.assertEqual(list(d.items()), [('a', 'bar'), ('b', 'baz')])
+
+    def test_copy(self):
+        d = ice.MultiDict()
+        d['a'] = 'foo'
+        c = d.copy()
+        c['a'] = 'bar'
+        self.assertIsInstance(c, ice.MultiDict)
+        self.assertEqual(d.getall('a'), ['foo'])
+        self.assertEqual(c.getall('a'), ['foo', 'bar'])
+
+    def test_repr(self):
+        d = ice.MultiDict()
+        d['a'] = 'foo'
+        self.assertEqual(repr(d), "MultiDict({'a': ['foo']})")
+
+    def test_slots(self):
+        d = ice.MultiDict()
+        with self.assertRaises(AttributeError):
+            d.foo = 'bar'
@@ -0,0 +1,204 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2014-2017 Susam Pal
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Tests for class MultipartParser."""
+
+
+import tempfile
+import unittest
+import unittest.mock
+import tracemalloc
+import ice
+
+
+BODY = (
+    b'preamble\r\n'
+    b'--xyz\r\n'
+    b'Content-Disposition: form-data; name="a"\r\n'
+    b'\r\n'
+    b'foo\r\n'
+    b'--xyz\r\n'
+    b'Content-Disposition: form-data; name="b"; filename="b.txt"\r\n'
+    b'Content-Type: text/csv\r\n'
+    b'\r\n'
+    b'bar\r\n--xy\r\nbaz\r\n'
+    b'--xyz\r\n'
+    b'Content-Disposition: form-data; name="a"\r\n'
+    b'\r\n'
+    b'\xc3\xa9\r\n'
+    b'--xyz--\r\n'
+    b'epilogue'
+)
+
+
+def chunks(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class MultipartParserTest(unittest.TestCase):
+
+    def assert_parts(self, parts):
+        self.assertEqual([p[0] for p in parts], ['a', 'b', 'a'])
+        self.assertEqual(parts[0][1], 'foo')
+        self.assertEqual(parts[2][1], 'é')
+        f = parts[1][1]
+        self.assertIsInstance(f, ice.FileUpload)
+        self.assertEqual(f.name, 'b')
+        self.assertEqual(f.filename, 'b.txt')
+        self.assertEqual(f.content_type, 'text/csv')
+        self.assertEqual(f.size, 14)
+        self.assertEqual(f.read(), b'bar\r\n--xy\r\nbaz')
+        f.seek(0)
+        self.assertEqual(f.read(3), b'bar')
+        self.assertEqual(f.tell(), 3)
+        f.close()
+
+    def test_parse(self):
+        p = ice.MultipartParser('xyz')
+        self.assert_parts(list(p.parse([BODY])))
+
+    def test_parse_in_small_chunks(self):
+        for size in (1, 2, 3, 5, 7, 11):
+            p = ice.MultipartParser('xyz')
+            self.assert_parts(list(p.parse(chunks(BODY, size))))
+
+    def test_spool_to_disk(self):
+        p = ice.MultipartParser('xyz', spool_size=4)
+        parts = list(p.parse(chunks(BODY, 4)))
+        self.assertTrue(parts[1][1].file._rolled)
+        self.assert_parts(parts)
+
+    def test_empty_body(self):
+        self.assertEqual(list(ice.MultipartParser('xyz').parse([])), [])
+
+    def test_part_without_name(self):
+        body = (b'--xyz\r\n\r\nfoo\r\n'
+                b'--xyz\r\nContent-Disposition: form-data; name=a\r\n\r\n'
+                b'bar\r\n--xyz--')
+        parts = list(ice.MultipartParser('xyz').parse([body]))
+        self.assertEqual(parts, [('a', 'bar')])
+
+    def test_incomplete_body(self):
+        p = ice.MultipartParser('xyz')
+        with self.assertRaises(ice.RequestError) as cm:
+            list(p.parse([BODY[:60]]))
+        self.assertEqual(cm.exception.status, 400)
+        self.assertEqual(str(cm.exception), 'Incomplete multipart body')
+
+    def test_headers_too_large(self):
+        p = ice.MultipartParser('xyz')
+        p.max_header_size = 16
+        with self.assertRaises(ice.RequestError) as cm:
+            list(p.parse(chunks(BODY, 8)))
+        self.assertEqual(cm.exception.status, 400)
+        self.assertEqual(str(cm.exception), 'Multipart headers too large')
+
+    def test_part_too_large(self):
+        p = ice.MultipartParser('xyz', max_part_size=13)
+        with self.assertRaises(ice.RequestError) as cm:
+            list(p.parse(chunks(BODY, 4)))
+        self.assertEqual(cm.exception.status, 413)
+        self.assertEqual(str(cm.exception), 'Multipart part too large')
+        p = ice.MultipartParser('xyz', max_part_size=14)
+        self.assert_parts(list(p.parse(chunks(BODY, 4))))
+
+    def test_memory_is_bounded_by_chunk_size(self):
+        def body():
+            yield (b'--xyz\r\nContent-Disposition: form-data; name="f"; '
+                   b'filename="f"\r\n\r\n')
+            chunk = b'x' * 65536
+            for i in range(128):
+                yield chunk
+            yield b'\r\n--xyz--\r\n'
+
+        if tracemalloc.is_tracing():
+            self.skipTest('tracemalloc is already tracing')
+        p = ice.MultipartParser('xyz', spool_size=65536)
+        tracemalloc.start()
+        try:
+            parts = list(p.parse(body()))
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(parts[0][1].size, 128 * 65536)
+        self.assertLess(peak, 1024 * 1024)
+        parts[0][1].close()
+
+    def test_epilogue_is_not_kept(self):
+        def body():
+            yield b'--xyz\r\nContent-Disposition: form-data; name=a\r\n\r\n'
+            yield b'foo\r\n--xyz--\r\n'
+            chunk = b'x' * 65536
+            for i in range(128):
+                yield chunk
+
+        if tracemalloc.is_tracing():
+            self.skipTest('tracemalloc is already tracing')
+        p = ice.MultipartParser('xyz')
+        chunks = body()
+        tracemalloc.start()
+        try:
+            parts = list(p.parse(chunks))
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(parts, [('a', 'foo')])
+        self.assertEqual(list(chunks), [])
+        self.assertLess(peak, 1024 * 1024)
+
+    def test_error_closes_current_part(self):
+        spooled = []
+
+        def spool(*args, **kwargs):
+            f = SpooledTemporaryFile(*args, **kwargs)
+            spooled.append(f)
+            return f
+
+        SpooledTemporaryFile = tempfile.SpooledTemporaryFile
+        p = ice.MultipartParser('xyz', max_part_size=13)
+        with unittest.mock.patch('tempfile.SpooledTemporaryFile',
+                                 side_effect=spool):
+            with self.assertRaises(ice.RequestError):
+                list(p.parse(chunks(BODY, 4)))
+            with self.assertRaises(ice.RequestError):
+                list(p.parse([BODY[:165]]))
+        self.assertEqual(len(spooled), 2)
+        self.assertTrue(all(f.closed for f in spooled))
+
+    def test_part_without_name_is_closed(self):
+        spooled = []
+
+        def spool(*args, **kwargs):
+            f = SpooledTemporaryFile(*args, **kwargs)
+            spooled.append(f)
+            return f
+
+        SpooledTemporaryFile = tempfile.SpooledTemporaryFile
+        body = (b'--xyz\r\nContent-Disposition: form-data; '
+                b'filename=f\r\n\r\nfoo\r\n--xyz--')
+        with unittest.mock.patch('tempfile.SpooledTemporaryFile',
+                                 side_effect=spool):
+            parts = list(ice.MultipartParser('xyz').parse([body]))
+        self.assertEqual(parts, [])
+        self.assertTrue(spooled[0].closed)
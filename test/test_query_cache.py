@@ -0,0 +1,77 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2014-2017 Susam Pal
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Tests for class QueryCache."""
+
+
+import unittest
+import ice
+
+
+class QueryCacheTest(unittest.TestCase):
+
+    def test_parse(self):
+        c = ice.QueryCache(2)
+        q = c.parse('a=foo&b=bar&a=baz')
+        self.assertIsInstance(q, ice.FrozenMultiDict)
+        self.assertEqual(q.data, {'a': ('foo', 'baz'), 'b': ('bar',)})
+
+    def test_parse_returns_cached_object(self):
+        c = ice.QueryCache(2)
+        q = c.parse('a=foo')
+        self.assertIs(c.parse('a=foo'), q)
+        self.assertEqual(c.hits, 1)
+        self.assertEqual(c.misses, 1)
+        self.assertEqual(c.hit_rate, 0.5)
+
+    def test_parse_evicts_least_recently_used(self):
+        c = ice.QueryCache(2)
+        c.parse('a=1')
+        c.parse('a=2')
+        c.parse('a=1')
+        c.parse('a=3')
+        self.assertIn('a=1', c)
+        self.assertNotIn('a=2', c)
+        self.assertIn('a=3', c)
+        self.assertEqual(c.evictions, 1)
+
+    def test_parse_skips_long_query_string(self):
+        c = ice.QueryCache(2, max_length=5)
+        self.assertEqual(c.parse('a=foo').data, {'a': ('foo',)})
+        q = c.parse('a=foobar')
+        self.assertIsInstance(q, ice.FrozenMultiDict)
+        self.assertEqual(q.data, {'a': ('foobar',)})
+        self.assertNotIn('a=foobar', c)
+        self.assertEqual(c.skipped, 1)
+        self.assertEqual(c.misses, 1)
+        self.assertEqual(len(c), 1)
+
+    def test_parse_empty_query_string(self):
+        c = ice.QueryCache(2)
+        self.assertEqual(c.parse('').data, {})
+        self.assertEqual(c.parse('').data, {})
+        self.assertEqual(c.hits, 1)
+
+    def test_default_max_length(self):
+        self.assertEqual(ice.QueryCache(2).max_length, 1024)
@@ -110,6 +110,31 @@ class RegexRouteTest(unittest.TestCase):
                          (m, ['foo'], {'a': 'bar', 'b': '456'}))
         self.assertIsNone(r.match('/foo123/bar456/'))
 
+    def test_regex_with_interleaved_and_unmatched_groups(self):
+        m = mock.Mock()
+        r = ice.RegexRoute(r'^/(?P<a>[a-z]+)/(\d+)/(?P<b>[a-z]+)'
+                           r'(?:/(\d+))?$', m)
+        self.assertEqual(r.match('/foo/1/bar/2'),
+                         (m, ['1', '2'], {'a': 'foo', 'b': 'bar'}))
+        self.assertEqual(r.match('/foo/1/bar'),
+                         (m, ['1', None], {'a': 'foo', 'b': 'bar'}))
+
+    def test_literal_prefix(self):
+        prefix = ice.RegexRoute.literal_prefix
+        self.assertEqual(prefix(r'^/reports/(\d+)/csv$'), '/reports/')
+        self.assertEqual(prefix(r'^/foo\.bar/(.*)'), '/foo.bar/')
+        self.assertEqual(prefix(r'^/foo\d'), '/foo')
+        self.assertEqual(prefix('^/foos?/'), '/foo')
+        self.assertEqual(prefix('^/foo*/'), '/fo')
+        self.assertEqual(prefix('^/fo{2}/'), '/f')
+        self.assertEqual(prefix('^/foo+/'), '/foo')
+        self.assertEqual(prefix('^/[fb]oo/'), '/')
+        self.assertEqual(prefix('/foo/(.*)'), '')
+        self.assertEqual(prefix('^/foo/|^/bar/'), '')
+        self.assertEqual(prefix('^(?i)/foo/'), '')
+        self.assertEqual(prefix('^/foo'), '/foo')
+        self.assertEqual(ice.RegexRoute('^/foo/(.*)', None).prefix, '/foo/')
+
     def test_like(self):
         self.assertTrue(ice.RegexRoute.like('^/(?P<a>(?:foo|bar))$'))
         self.assertFalse(ice.RegexRoute.like('^/.*'))
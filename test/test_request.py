@@ -26,7 +26,12 @@
 
 
 import unittest
+import unittest.mock
 import io
+import tempfile
+import gzip
+import tracemalloc
+import zlib
 import ice
 
 
@@ -85,9 +90,44 @@ class RequestTest(unittest.TestCase):
         r = ice.Request({'QUERY_STRING': 'a=f%6f%6f&b=bar'})
         self.assertEqual(r.query.data, {'a': ['foo'], 'b': ['bar']})
 
-    # environ['REQUEST_METHOD'] = 'POST' is required by cgi.FieldStorage
-    # to read bytes from environ['wsgi.input']. Hence, it is defined in
-    # every form test.
+    def test_query_with_encoded_names(self):
+        r = ice.Request({'QUERY_STRING': 'a%20b=foo&c+d=bar&%C3%A9=baz'})
+        self.assertEqual(r.query.data, {'a b': ['foo'], 'c d': ['bar'],
+                                        '\u00e9': ['baz']})
+
+    def test_query_with_missing_equals_sign(self):
+        r = ice.Request({'QUERY_STRING': 'a&b=foo&&'})
+        self.assertEqual(r.query.data, {'b': ['foo']})
+
+    def test_query_with_invalid_utf8(self):
+        r = ice.Request({'QUERY_STRING': 'a=%FF'})
+        self.assertEqual(r.query.data, {'a': ['\ufffd']})
+
+    def test_headers(self):
+        r = ice.Request({'HTTP_USER_AGENT': 'foo', 'CONTENT_TYPE': 'bar'})
+        self.assertIsInstance(r.headers, ice.Headers)
+        self.assertIs(r.headers, r.headers)
+        self.assertIs(r.headers.environ, r.environ)
+        self.assertEqual(r.headers['user-agent'], 'foo')
+        self.assertEqual(r.headers['Content-Type'], 'bar')
+
+    def test_query_with_query_cache(self):
+        cache = ice.QueryCache(2)
+        r1 = ice.Request({'QUERY_STRING': 'a=foo'}, query_cache=cache)
+        r2 = ice.Request({'QUERY_STRING': 'a=foo'}, query_cache=cache)
+        self.assertIsInstance(r1.query, ice.FrozenMultiDict)
+        self.assertEqual(r1.query.data, {'a': ('foo',)})
+        self.assertIs(r2.query, r1.query)
+        self.assertEqual(cache.hits, 1)
+
+    def test_query_with_query_cache_and_no_query_string(self):
+        cache = ice.QueryCache(2)
+        r = ice.Request({}, query_cache=cache)
+        self.assertEqual(r.query.data, {})
+        self.assertIn('', cache)
+
+    # Form data is sent in POST requests. Hence, environ['REQUEST_METHOD']
+    # is defined as 'POST' in every form test.
 
     def test_form_with_two_names(self):
         environ = {
@@ -172,3 +212,734 @@ class RequestTest(unittest.TestCase):
         }
         r = ice.Request(environ)
         self.assertEqual(r.cookies, {'a': 'foo', 'b': 'bar', 'c': 'baz qux'})
+
+    def test_lazy_parsing(self):
+        environ = {
+            'QUERY_STRING': 'a=foo',
+            'wsgi.input': io.BytesIO(b'b=bar'),
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_LENGTH': '5',
+            'HTTP_COOKIE': 'c=baz',
+        }
+        r = ice.Request(environ)
+        # Nothing is read from the request body until form is accessed.
+        self.assertEqual(environ['wsgi.input'].tell(), 0)
+        self.assertIs(r.query, r.query)
+        self.assertIs(r.cookies, r.cookies)
+        self.assertEqual(environ['wsgi.input'].tell(), 0)
+        self.assertEqual(r.form['b'], 'bar')
+        self.assertIs(r.form, r.form)
+        self.assertEqual(r.query.data, {'a': ['foo']})
+        self.assertEqual(r.cookies.data, {'c': ['baz']})
+
+    def test_multipart_form(self):
+        body = (b'--xyz\r\n'
+                b'Content-Disposition: form-data; name="a"\r\n\r\n'
+                b'foo\r\n'
+                b'--xyz\r\n'
+                b'Content-Disposition: form-data; name="b"; '
+                b'filename="b.txt"\r\n\r\n'
+                b'bar\r\n'
+                b'--xyz--\r\n')
+        environ = {
+            'wsgi.input': io.BytesIO(body),
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_TYPE': 'multipart/form-data; boundary=xyz',
+            'CONTENT_LENGTH': str(len(body)),
+        }
+        r = ice.Request(environ, chunk_size=4)
+        self.assertEqual(r.form.data, {'a': ['foo']})
+        self.assertEqual(list(r.files), ['b'])
+        self.assertEqual(r.files['b'].filename, 'b.txt')
+        self.assertEqual(r.files['b'].read(), b'bar')
+        r.files['b'].close()
+
+    def test_multipart_form_error_closes_files(self):
+        body = (b'--xyz\r\n'
+                b'Content-Disposition: form-data; name="a"; '
+                b'filename="a.txt"\r\n\r\n'
+                b'foo\r\n'
+                b'--xyz\r\n'
+                b'Content-Disposition: form-data; name="b"; '
+                b'filename="b.txt"\r\n\r\n'
+                b'barbaz\r\n'
+                b'--xyz--\r\n')
+        environ = {
+            'wsgi.input': io.BytesIO(body),
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_TYPE': 'multipart/form-data; boundary=xyz',
+            'CONTENT_LENGTH': str(len(body)),
+        }
+        spooled = []
+
+        def spool(*args, **kwargs):
+            f = SpooledTemporaryFile(*args, **kwargs)
+            spooled.append(f)
+            return f
+
+        SpooledTemporaryFile = tempfile.SpooledTemporaryFile
+        r = ice.Request(environ, chunk_size=4, max_part_size=4)
+        with unittest.mock.patch('tempfile.SpooledTemporaryFile',
+                                 side_effect=spool):
+            with self.assertRaises(ice.RequestError) as cm:
+                r.files
+        self.assertEqual(cm.exception.status, 413)
+        self.assertEqual(len(spooled), 2)
+        self.assertTrue(all(f.closed for f in spooled))
+        self.assertEqual(r.files.data, {})
+
+    def test_multipart_form_without_boundary(self):
+        environ = {
+            'wsgi.input': io.BytesIO(b''),
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_TYPE': 'multipart/form-data',
+            'CONTENT_LENGTH': '0',
+        }
+        with self.assertRaises(ice.RequestError) as cm:
+            ice.Request(environ).form
+        self.assertEqual(cm.exception.status, 400)
+
+    def test_multipart_form_with_unknown_charset(self):
+        body = (b'--xyz\r\n'
+                b'Content-Disposition: form-data; name="a"\r\n\r\n'
+                b'foo\r\n'
+                b'--xyz--\r\n')
+        environ = {
+            'wsgi.input': io.BytesIO(body),
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_TYPE': 'multipart/form-data; boundary=xyz; '
+                            'charset=bogus',
+            'CONTENT_LENGTH': str(len(body)),
+        }
+        with self.assertRaises(ice.RequestError) as cm:
+            ice.Request(environ).form
+        self.assertEqual(cm.exception.status, 400)
+        self.assertEqual(environ['wsgi.input'].tell(), 0)
+
+    def test_multipart_form_too_large(self):
+        environ = {
+            'wsgi.input': io.BytesIO(b'--xyz--'),
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_TYPE': 'multipart/form-data; boundary=xyz',
+            'CONTENT_LENGTH': '7',
+        }
+        with self.assertRaises(ice.RequestError) as cm:
+            ice.Request(environ, max_body_size=6).files
+        self.assertEqual(cm.exception.status, 413)
+        environ['wsgi.input'].seek(0)
+        self.assertEqual(ice.Request(environ, max_body_size=7).files.data,
+                         {})
+
+    def test_multipart_form_without_content_length(self):
+        environ = {
+            'wsgi.input': io.BytesIO(b'--xyz\r\n'
+                                     b'Content-Disposition: form-data; '
+                                     b'name=a\r\n\r\nfoo\r\n--xyz--'),
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_TYPE': 'multipart/form-data; boundary=xyz',
+        }
+        self.assertEqual(ice.Request(environ).form.data, {})
+        environ['wsgi.input_terminated'] = True
+        self.assertEqual(ice.Request(environ).form.data, {'a': ['foo']})
+
+    def test_invalid_content_length(self):
+        for value in ('-1', 'foo', '1.0', '\xb2', '1\xb9', '\u0661', '1\n'):
+            r = ice.Request({'CONTENT_LENGTH': value})
+            with self.assertRaises(ice.RequestError) as cm:
+                r.content_length
+            self.assertEqual(cm.exception.status, 400)
+        self.assertIsNone(ice.Request({}).content_length)
+        self.assertIsNone(ice.Request({'CONTENT_LENGTH': ''}).content_length)
+        self.assertEqual(ice.Request({'CONTENT_LENGTH': '10'}).content_length,
+                         10)
+
+    def test_form_with_content_type(self):
+        environ = {
+            'wsgi.input': io.BytesIO(b'a=f%E9%E9&b=%C3%A9'),
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_TYPE': 'application/x-www-form-urlencoded; '
+                            'charset=latin-1',
+            'CONTENT_LENGTH': '18',
+        }
+        r = ice.Request(environ)
+        self.assertEqual(r.form.data, {'a': ['f\xe9\xe9'],
+                                       'b': ['\xc3\xa9']})
+
+    def test_form_with_unknown_charset(self):
+        for charset in ('bogus', 'base64'):
+            environ = {
+                'wsgi.input': io.BytesIO(b'a=foo'),
+                'REQUEST_METHOD': 'POST',
+                'CONTENT_TYPE': 'application/x-www-form-urlencoded; '
+                                'charset=' + charset,
+                'CONTENT_LENGTH': '5',
+            }
+            with self.assertRaises(ice.RequestError) as cm:
+                ice.Request(environ).form
+            self.assertEqual(cm.exception.status, 400)
+            self.assertEqual(str(cm.exception),
+                             'Unknown charset {!r}'.format(charset))
+
+    def test_form_with_other_content_type(self):
+        environ = {
+            'wsgi.input': io.BytesIO(b'a=foo'),
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_TYPE': 'text/plain',
+            'CONTENT_LENGTH': '5',
+        }
+        r = ice.Request(environ)
+        self.assertEqual(r.form.data, {})
+        self.assertEqual(environ['wsgi.input'].tell(), 0)
+
+    def test_form_excludes_query(self):
+        environ = {
+            'wsgi.input': io.BytesIO(b'a=foo'),
+            'QUERY_STRING': 'b=bar',
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_LENGTH': '5',
+        }
+        self.assertEqual(ice.Request(environ).form.data, {'a': ['foo']})
+
+    def test_form_too_large(self):
+        environ = {
+            'wsgi.input': unittest.mock.Mock(),
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_LENGTH': '11',
+        }
+        with self.assertRaises(ice.RequestError) as cm:
+            ice.Request(environ, max_body_size=10).form
+        self.assertEqual(cm.exception.status, 413)
+        self.assertFalse(environ['wsgi.input'].read.called)
+
+    def test_form_with_short_reads(self):
+        stream = unittest.mock.Mock()
+        stream.read.side_effect = [b'a=f', b'oo&b', b'=bar', b'']
+        environ = {
+            'wsgi.input': stream,
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_LENGTH': '11',
+        }
+        r = ice.Request(environ)
+        self.assertEqual(r.form.data, {'a': ['foo'], 'b': ['bar']})
+
+    def test_json(self):
+        body = b'{"a": [1, 2], "b": "\\u00e9"}'
+        environ = {
+            'wsgi.input': io.BytesIO(body),
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': str(len(body)),
+        }
+        r = ice.Request(environ)
+        self.assertEqual(r.json, {'a': [1, 2], 'b': 'é'})
+        self.assertIs(r.json, r.json)
+
+    def test_json_skips_form(self):
+        environ = {
+            'wsgi.input': io.BytesIO(b'{"a": 1}'),
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': '8',
+        }
+        r = ice.Request(environ)
+        self.assertEqual(r.form.data, {})
+        self.assertEqual(environ['wsgi.input'].tell(), 0)
+        self.assertEqual(r.json, {'a': 1})
+
+    def test_json_with_suffix_and_charset(self):
+        body = '{"a": "é"}'.encode('latin-1')
+        environ = {
+            'wsgi.input': io.BytesIO(body),
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_TYPE': 'application/problem+json; charset=latin-1',
+            'CONTENT_LENGTH': str(len(body)),
+        }
+        self.assertEqual(ice.Request(environ).json, {'a': 'é'})
+
+    def test_json_null(self):
+        environ = {
+            'wsgi.input': io.BytesIO(b'null'),
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': '4',
+        }
+        r = ice.Request(environ)
+        self.assertIsNone(r.json)
+        self.assertIsNone(r.json)
+        self.assertEqual(environ['wsgi.input'].tell(), 4)
+
+    def test_json_with_other_content_type(self):
+        environ = {
+            'wsgi.input': io.BytesIO(b'{"a": 1}'),
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_TYPE': 'text/plain',
+            'CONTENT_LENGTH': '8',
+        }
+        self.assertIsNone(ice.Request(environ).json)
+        self.assertEqual(environ['wsgi.input'].tell(), 0)
+
+    def test_json_malformed(self):
+        environ = {
+            'wsgi.input': io.BytesIO(b'{"a": '),
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': '6',
+        }
+        with self.assertRaises(ice.RequestError) as cm:
+            ice.Request(environ).json
+        self.assertEqual(cm.exception.status, 400)
+
+    def test_json_invalid_encoding(self):
+        environ = {
+            'wsgi.input': io.BytesIO(b'"\xff"'),
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': '3',
+        }
+        with self.assertRaises(ice.RequestError) as cm:
+            ice.Request(environ).json
+        self.assertEqual(cm.exception.status, 400)
+
+    def test_json_too_large(self):
+        environ = {
+            'wsgi.input': unittest.mock.Mock(),
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': '11',
+        }
+        with self.assertRaises(ice.RequestError) as cm:
+            ice.Request(environ, max_json_size=10).json
+        self.assertEqual(cm.exception.status, 413)
+        self.assertFalse(environ['wsgi.input'].read.called)
+
+    def test_json_too_large_for_max_body_size(self):
+        environ = {
+            'wsgi.input': io.BytesIO(b'[1, 2, 3]'),
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': '9',
+        }
+        with self.assertRaises(ice.RequestError) as cm:
+            ice.Request(environ, max_json_size=None, max_body_size=8).json
+        self.assertEqual(cm.exception.status, 413)
+
+    def test_json_streamed_body_too_large(self):
+        environ = {
+            'wsgi.input': io.BytesIO(b'[1, 2, 3, 4, 5]'),
+            'wsgi.input_terminated': True,
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_TYPE': 'application/json',
+        }
+        r = ice.Request(environ, chunk_size=4, max_json_size=8)
+        with self.assertRaises(ice.RequestError) as cm:
+            r.json
+        self.assertEqual(cm.exception.status, 413)
+        self.assertEqual(environ['wsgi.input'].tell(), 12)
+
+    def test_json_streamed_body(self):
+        environ = {
+            'wsgi.input': io.BytesIO(b'[1, 2, 3, 4, 5]'),
+            'wsgi.input_terminated': True,
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_TYPE': 'application/json',
+        }
+        r = ice.Request(environ, chunk_size=4)
+        self.assertEqual(r.json, [1, 2, 3, 4, 5])
+
+    def test_json_decoder(self):
+        decoder = unittest.mock.Mock(return_value='foo')
+        environ = {
+            'wsgi.input': io.BytesIO(b'{}'),
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': '2',
+        }
+        r = ice.Request(environ, json_decoder=decoder)
+        self.assertEqual(r.json, 'foo')
+        decoder.assert_called_once_with('{}')
+
+    def test_body_view(self):
+        environ = {
+            'wsgi.input': io.BytesIO(b'a=foo&b=bar'),
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_LENGTH': '11',
+        }
+        r = ice.Request(environ)
+        body = r.body_view()
+        self.assertIsInstance(body, memoryview)
+        self.assertEqual(body, b'a=foo&b=bar')
+        self.assertIs(r.body_view(), body)
+        self.assertEqual(r.form.data, {'a': ['foo'], 'b': ['bar']})
+
+    def test_body_view_after_form(self):
+        environ = {
+            'wsgi.input': io.BytesIO(b'a=foo'),
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_LENGTH': '5',
+        }
+        r = ice.Request(environ)
+        self.assertEqual(r.form.data, {'a': ['foo']})
+        self.assertEqual(r.body_view(), b'a=foo')
+
+    def test_body_view_with_short_readinto(self):
+        class Stream(io.RawIOBase):
+            def __init__(self, data):
+                self.data = data
+            def readable(self):
+                return True
+            def readinto(self, b):
+                n = min(3, len(b), len(self.data))
+                b[:n] = self.data[:n]
+                self.data = self.data[n:]
+                return n
+
+        environ = {
+            'wsgi.input': Stream(b'hello, world'),
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_LENGTH': '12',
+        }
+        self.assertEqual(ice.Request(environ).body_view(), b'hello, world')
+
+    def test_body_view_with_truncated_body(self):
+        environ = {
+            'wsgi.input': io.BytesIO(b'abc'),
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_LENGTH': '5',
+        }
+        self.assertEqual(ice.Request(environ).body_view(), b'abc')
+
+    def test_body_view_grows_with_body(self):
+        environ = {
+            'wsgi.input': io.BytesIO(b'hello, world'),
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_LENGTH': '12',
+        }
+        r = ice.Request(environ, chunk_size=5)
+        self.assertEqual(r.body_view(), b'hello, world')
+        self.assertEqual(r.body_view().obj, b'hello, world')
+
+    def test_body_view_with_large_declared_length(self):
+        if tracemalloc.is_tracing():
+            self.skipTest('tracemalloc is already tracing')
+        for length in (300 * 1024 * 1024, 10 ** 13):
+            environ = {
+                'wsgi.input': io.BytesIO(b'a=b'),
+                'REQUEST_METHOD': 'POST',
+                'CONTENT_LENGTH': str(length),
+            }
+            r = ice.Request(environ)
+            tracemalloc.start()
+            try:
+                form = r.form
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+            self.assertEqual(form.data, {'a': ['b']})
+            self.assertEqual(len(r.body_view().obj), 3)
+            self.assertLess(peak, 1024 * 1024)
+
+    def test_body_view_with_large_declared_length_without_readinto(self):
+        stream = unittest.mock.Mock()
+        stream.read.side_effect = [b'ab', b'c', b'']
+        environ = {
+            'wsgi.input': stream,
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_LENGTH': str(10 ** 13),
+        }
+        self.assertEqual(ice.Request(environ, chunk_size=4).body_view(),
+                         b'abc')
+        self.assertEqual(stream.read.call_args_list,
+                         [unittest.mock.call(4), unittest.mock.call(4),
+                          unittest.mock.call(4)])
+
+    def test_body_view_without_readinto(self):
+        stream = unittest.mock.Mock()
+        stream.read.side_effect = [b'ab', b'c', b'']
+        environ = {
+            'wsgi.input': stream,
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_LENGTH': '3',
+        }
+        body = ice.Request(environ).body_view()
+        self.assertIsInstance(body, memoryview)
+        self.assertEqual(body, b'abc')
+
+    def test_body_view_with_unknown_length(self):
+        environ = {
+            'wsgi.input': io.BytesIO(b'hello, world'),
+            'wsgi.input_terminated': True,
+            'REQUEST_METHOD': 'POST',
+        }
+        r = ice.Request(environ, chunk_size=5)
+        self.assertEqual(r.body_view(), b'hello, world')
+
+    def test_body_view_without_body(self):
+        r = ice.Request({'REQUEST_METHOD': 'POST'})
+        self.assertEqual(r.body_view(), b'')
+
+    def test_body_view_too_large(self):
+        environ = {
+            'wsgi.input': io.BytesIO(b'hello'),
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_LENGTH': '5',
+        }
+        with self.assertRaises(ice.RequestError) as cm:
+            ice.Request(environ, max_body_size=4).body_view()
+        self.assertEqual(cm.exception.status, 413)
+        self.assertEqual(environ['wsgi.input'].tell(), 0)
+
+    def test_iter_body(self):
+        environ = {
+            'wsgi.input': io.BytesIO(b'hello, world'),
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_LENGTH': '12',
+        }
+        r = ice.Request(environ)
+        chunks = []
+        buffers = set()
+        for chunk in r.iter_body(5):
+            self.assertIsInstance(chunk, memoryview)
+            chunks.append(bytes(chunk))
+            buffers.add(id(chunk.obj))
+        self.assertEqual(chunks, [b'hello', b', wor', b'ld'])
+        self.assertEqual(len(buffers), 1)
+
+    def test_iter_body_default_chunk_size(self):
+        environ = {
+            'wsgi.input': io.BytesIO(b'hello, world'),
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_LENGTH': '12',
+        }
+        r = ice.Request(environ, chunk_size=8)
+        self.assertEqual([bytes(c) for c in r.iter_body()],
+                         [b'hello, w', b'orld'])
+
+    def test_iter_body_stops_at_content_length(self):
+        environ = {
+            'wsgi.input': io.BytesIO(b'hello, world'),
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_LENGTH': '7',
+        }
+        r = ice.Request(environ)
+        self.assertEqual([bytes(c) for c in r.iter_body(5)],
+                         [b'hello', b', '])
+        self.assertEqual(environ['wsgi.input'].tell(), 7)
+
+    def test_iter_body_without_readinto(self):
+        stream = unittest.mock.Mock()
+        stream.read.side_effect = [b'ab', b'cd', b'']
+        environ = {
+            'wsgi.input': stream,
+            'REQUEST_METHOD': 'POST',
+            'wsgi.input_terminated': True,
+        }
+        r = ice.Request(environ)
+        self.assertEqual([bytes(c) for c in r.iter_body(2)],
+                         [b'ab', b'cd'])
+
+    def test_iter_body_too_large(self):
+        environ = {
+            'wsgi.input': io.BytesIO(b'hello, world'),
+            'wsgi.input_terminated': True,
+            'REQUEST_METHOD': 'POST',
+        }
+        r = ice.Request(environ, max_body_size=8)
+        chunks = r.iter_body(5)
+        self.assertEqual(next(chunks), b'hello')
+        with self.assertRaises(ice.RequestError) as cm:
+            next(chunks)
+        self.assertEqual(cm.exception.status, 413)
+
+    def test_iter_body_after_body_view(self):
+        environ = {
+            'wsgi.input': io.BytesIO(b'hello, world'),
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_LENGTH': '12',
+        }
+        r = ice.Request(environ)
+        r.body_view()
+        self.assertEqual([bytes(c) for c in r.iter_body(5)],
+                         [b'hello', b', wor', b'ld'])
+        self.assertEqual([bytes(c) for c in r.iter_body(12)],
+                         [b'hello, world'])
+
+    def test_iter_body_twice(self):
+        environ = {
+            'wsgi.input': io.BytesIO(b'hello'),
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_LENGTH': '5',
+        }
+        r = ice.Request(environ)
+        list(r.iter_body())
+        with self.assertRaises(ice.LogicError):
+            list(r.iter_body())
+        with self.assertRaises(ice.LogicError):
+            r.body_view()
+
+    def test_form_with_gzip_encoding(self):
+        body = gzip.compress(b'a=foo&b=bar')
+        environ = {
+            'wsgi.input': io.BytesIO(body),
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_LENGTH': str(len(body)),
+            'HTTP_CONTENT_ENCODING': 'gzip',
+        }
+        r = ice.Request(environ)
+        self.assertEqual(r.form.data, {'a': ['foo'], 'b': ['bar']})
+        self.assertEqual(r.body_view(), b'a=foo&b=bar')
+
+    def test_json_with_deflate_encoding(self):
+        body = zlib.compress(b'{"a": [1, 2]}')
+        environ = {
+            'wsgi.input': io.BytesIO(body),
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': str(len(body)),
+            'HTTP_CONTENT_ENCODING': 'Deflate',
+        }
+        self.assertEqual(ice.Request(environ).json, {'a': [1, 2]})
+
+    def test_files_with_gzip_encoding(self):
+        body = gzip.compress(
+            b'--xyz\r\n'
+            b'Content-Disposition: form-data; name="a"; filename="a.txt"'
+            b'\r\n\r\n' + b'foo' * 1000 + b'\r\n--xyz--\r\n')
+        environ = {
+            'wsgi.input': io.BytesIO(body),
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_TYPE': 'multipart/form-data; boundary=xyz',
+            'CONTENT_LENGTH': str(len(body)),
+            'HTTP_CONTENT_ENCODING': 'x-gzip',
+        }
+        r = ice.Request(environ, chunk_size=64)
+        self.assertEqual(r.files['a'].read(), b'foo' * 1000)
+        r.files['a'].close()
+
+    def test_iter_body_with_gzip_encoding(self):
+        data = bytes(range(256)) * 100
+        body = gzip.compress(data)
+        environ = {
+            'wsgi.input': io.BytesIO(body),
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_LENGTH': str(len(body)),
+            'HTTP_CONTENT_ENCODING': 'gzip',
+        }
+        chunks = [bytes(c) for c in ice.Request(environ).iter_body(1000)]
+        self.assertTrue(all(len(c) <= 1000 for c in chunks))
+        self.assertEqual(b''.join(chunks), data)
+
+    def test_body_with_gzip_members(self):
+        body = gzip.compress(b'foo') + gzip.compress(b'bar')
+        environ = {
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.input_terminated': True,
+            'REQUEST_METHOD': 'POST',
+            'HTTP_CONTENT_ENCODING': 'gzip',
+        }
+        r = ice.Request(environ, chunk_size=7)
+        self.assertEqual(r.body_view(), b'foobar')
+
+    def test_body_with_identity_encoding(self):
+        environ = {
+            'wsgi.input': io.BytesIO(b'foo'),
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_LENGTH': '3',
+            'HTTP_CONTENT_ENCODING': 'identity',
+        }
+        self.assertEqual(ice.Request(environ).body_view(), b'foo')
+
+    def test_body_without_decompression(self):
+        body = gzip.compress(b'foo')
+        environ = {
+            'wsgi.input': io.BytesIO(body),
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_LENGTH': str(len(body)),
+            'HTTP_CONTENT_ENCODING': 'gzip',
+        }
+        r = ice.Request(environ, decompress=False)
+        self.assertEqual(r.body_view(), body)
+
+    def test_body_with_unsupported_encoding(self):
+        environ = {
+            'wsgi.input': io.BytesIO(b'foo'),
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_LENGTH': '3',
+            'HTTP_CONTENT_ENCODING': 'br',
+        }
+        with self.assertRaises(ice.RequestError) as cm:
+            ice.Request(environ).body_view()
+        self.assertEqual(cm.exception.status, 415)
+
+    def test_body_with_invalid_compressed_data(self):
+        environ = {
+            'wsgi.input': io.BytesIO(b'foo'),
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_LENGTH': '3',
+            'HTTP_CONTENT_ENCODING': 'gzip',
+        }
+        with self.assertRaises(ice.RequestError) as cm:
+            ice.Request(environ).body_view()
+        self.assertEqual(cm.exception.status, 400)
+
+    def test_body_with_truncated_compressed_data(self):
+        body = gzip.compress(b'foo' * 100)[:-10]
+        environ = {
+            'wsgi.input': io.BytesIO(body),
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_LENGTH': str(len(body)),
+            'HTTP_CONTENT_ENCODING': 'gzip',
+        }
+        with self.assertRaises(ice.RequestError) as cm:
+            ice.Request(environ).body_view()
+        self.assertEqual(cm.exception.status, 400)
+
+    def test_body_with_trailing_data_after_deflate(self):
+        body = zlib.compress(b'foo') + b'bar'
+        environ = {
+            'wsgi.input': io.BytesIO(body),
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_LENGTH': str(len(body)),
+            'HTTP_CONTENT_ENCODING': 'deflate',
+        }
+        with self.assertRaises(ice.RequestError) as cm:
+            ice.Request(environ).body_view()
+        self.assertEqual(cm.exception.status, 400)
+
+    def test_compressed_body_too_large(self):
+        body = gzip.compress(b'0' * 10000)
+        environ = {
+            'wsgi.input': io.BytesIO(body),
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_LENGTH': str(len(body)),
+            'HTTP_CONTENT_ENCODING': 'gzip',
+        }
+        r = ice.Request(environ, max_body_size=9999)
+        with self.assertRaises(ice.RequestError) as cm:
+            r.body_view()
+        self.assertEqual(cm.exception.status, 413)
+
+    def test_compressed_body_bomb(self):
+        if tracemalloc.is_tracing():
+            self.skipTest('tracemalloc is already tracing')
+        # Compress 64 MiB of zeros without holding them in memory.
+        compressor = zlib.compressobj(wbits=31)
+        zeros = bytes(1024 * 1024)
+        body = b''.join([compressor.compress(zeros) for i in range(64)] +
+                        [compressor.flush()])
+        environ = {
+            'wsgi.input': io.BytesIO(body),
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_LENGTH': str(len(body)),
+            'HTTP_CONTENT_ENCODING': 'gzip',
+        }
+        r = ice.Request(environ, max_decoded_size=1024 * 1024)
+        tracemalloc.start()
+        try:
+            with self.assertRaises(ice.RequestError) as cm:
+                for chunk in r.iter_body():
+                    pass
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(cm.exception.status, 413)
+        self.assertLess(peak, 1024 * 1024)
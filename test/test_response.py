@@ -63,6 +63,75 @@ class ResponseTest(unittest.TestCase):
         r.body = b'foo'
         self.assertEqual(r.response(), [b'foo'])
 
+    def test_response_return_value_with_iterator_body(self):
+        r = ice.Response(mock.Mock())
+        r.body = iter(['foo', b'bar', '', 'b\u00e9'])
+        self.assertEqual(list(r.response()), [b'foo', b'bar', b'b\xc3\xa9'])
+
+    def test_start_with_iterator_body(self):
+        m = mock.Mock()
+        r = ice.Response(m)
+        r.body = iter([b'foo'])
+        r.response()
+        m.assert_called_with('200 OK', [
+            ('Content-Type', 'text/html; charset=UTF-8'),
+        ])
+
+    def test_start_with_iterator_body_and_content_length(self):
+        m = mock.Mock()
+        r = ice.Response(m)
+        r.add_header('Content-Length', '3')
+        r.body = iter([b'foo'])
+        r.response()
+        m.assert_called_with('200 OK', [
+            ('Content-Length', '3'),
+            ('Content-Type', 'text/html; charset=UTF-8'),
+        ])
+
+    def test_iterator_body_is_consumed_lazily(self):
+        consumed = []
+        def body():
+            for chunk in ('foo', 'bar'):
+                consumed.append(chunk)
+                yield chunk
+        r = ice.Response(mock.Mock())
+        r.body = body()
+        out = r.response()
+        self.assertEqual(consumed, [])
+        self.assertEqual(next(out), b'foo')
+        self.assertEqual(consumed, ['foo'])
+
+    def test_iterator_body_with_charset(self):
+        r = ice.Response(mock.Mock())
+        r.charset = 'latin-1'
+        r.body = iter(['\u00e9'])
+        self.assertEqual(list(r.response()), [b'\xe9'])
+
+    def test_iterator_body_closed(self):
+        closed = []
+        def body():
+            try:
+                yield b'foo'
+                yield b'bar'
+            finally:
+                closed.append(True)
+        r = ice.Response(mock.Mock())
+        r.body = body()
+        out = r.response()
+        self.assertEqual(next(out), b'foo')
+        out.close()
+        self.assertEqual(closed, [True])
+
+    def test_iterator_body_with_invalid_chunk(self):
+        r = ice.Response(mock.Mock())
+        r.body = iter(['foo', 1])
+        out = r.response()
+        self.assertEqual(next(out), b'foo')
+        with self.assertRaises(ice.Error) as cm:
+            next(out)
+        self.assertEqual(str(cm.exception), 'Response body iterator '
+                         'produced invalid chunk: int: 1')
+
     def test_status_line(self):
         r = ice.Response(mock.Mock())
         r.status = 400
@@ -230,3 +230,262 @@ class RouterTest(unittest.TestCase):
         r.add('GET', 'regex:/foo/(.*)', m.g)
         self.assertEqual(r.resolve('GET', '/foo/bar/baz'),
                          (m.g, ['bar/baz'], {}))
+
+    # Router engine tests
+
+    def test_invalid_engine(self):
+        with self.assertRaises(ice.RouteError) as cm:
+            ice.Router('foo')
+        self.assertEqual(str(cm.exception), "Invalid router engine 'foo'")
+
+    def test_compiled_wildcard_route(self):
+        r = ice.Router('compiled')
+        m = mock.Mock()
+        r.add('GET', '/foo/<:int>', m.f)
+        r.add('GET', '/foo/<!>/<b>', m.g)
+        r.add('GET', '/<>-<:int>/<:path>', m.h)
+        self.assertEqual(r.resolve('GET', '/foo/10'), (m.f, [10], {}))
+        self.assertEqual(r.resolve('GET', '/foo/bar/baz'),
+                         (m.g, [], {'b': 'baz'}))
+        self.assertEqual(r.resolve('GET', '/foo-1/bar/baz'),
+                         (m.h, ['foo', 1, 'bar/baz'], {}))
+        self.assertIsNone(r.resolve('GET', '/foo'))
+        self.assertIsNone(r.resolve('POST', '/foo/10'))
+
+    def test_compiled_wildcard_route_precedence(self):
+        r = ice.Router('compiled')
+        m = mock.Mock()
+        r.add('GET', '/<>/<>', m.f)
+        r.add('GET', '/<:int>/<>', m.g)
+        self.assertEqual(r.resolve('GET', '/1/foo'), (m.g, [1, 'foo'], {}))
+        self.assertEqual(r.resolve('GET', '/x/foo'), (m.f, ['x', 'foo'], {}))
+
+        # A route added after resolution takes precedence.
+        r.add('GET', '/<>/<b>', m.h)
+        self.assertEqual(r.resolve('GET', '/1/foo'),
+                         (m.h, ['1'], {'b': 'foo'}))
+
+    def test_compiled_wildcard_route_chunks(self):
+        r = ice.Router('compiled')
+        for i in range(ice.WildcardDispatch.chunk_size * 2 + 1):
+            r.add('GET', '/<>/{}/<:int>'.format(i), i)
+        self.assertEqual(r.resolve('GET', '/foo/0/1'), (0, ['foo', 1], {}))
+        self.assertEqual(r.resolve('GET', '/foo/1000/1'),
+                         (1000, ['foo', 1], {}))
+        self.assertEqual(r.resolve('GET', '/foo/2000/1'),
+                         (2000, ['foo', 1], {}))
+        self.assertIsNone(r.resolve('GET', '/foo/2001/1'))
+
+    def test_compiled_regex_fallback(self):
+        r = ice.Router('compiled')
+        m = mock.Mock()
+        r.add('GET', '/foo/(.*)', m.f)
+        r.add('GET', '/<:int>', m.g)
+        self.assertEqual(r.resolve('GET', '/foo/bar'), (m.f, ['bar'], {}))
+        self.assertEqual(r.resolve('GET', '/10'), (m.g, [10], {}))
+
+    def test_trie_wildcard_route(self):
+        r = ice.Router('trie')
+        m = mock.Mock()
+        r.add('GET', '/api/<:int>/items/<name>', m.f)
+        r.add('GET', '/api/<!>/items', m.g)
+        r.add('GET', '/files/<:path>/edit', m.h)
+        r.add('GET', '/<>.<ext>', m.i)
+        self.assertEqual(r.resolve('GET', '/api/1/items/foo'),
+                         (m.f, [1], {'name': 'foo'}))
+        self.assertEqual(r.resolve('GET', '/api/foo/items'), (m.g, [], {}))
+        self.assertEqual(r.resolve('GET', '/files/a/b/edit'),
+                         (m.h, ['a/b'], {}))
+        self.assertEqual(r.resolve('GET', '/foo.txt'),
+                         (m.i, ['foo'], {'ext': 'txt'}))
+        self.assertIsNone(r.resolve('GET', '/api/foo/items/bar'))
+        self.assertIsNone(r.resolve('GET', '/files/edit'))
+
+    def test_trie_wildcard_route_precedence(self):
+        r = ice.Router('trie')
+        m = mock.Mock()
+        r.add('GET', '/foo/<:int>', m.f)
+        r.add('GET', '/<>/<>', m.g)
+        r.add('GET', '/foo/bar', m.h)
+        r.add('GET', '/<a>-<b:path>', m.i)
+        self.assertEqual(r.resolve('GET', '/foo/1'), (m.g, ['foo', '1'], {}))
+        self.assertEqual(r.resolve('GET', '/x-y/z'),
+                         (m.i, [], {'a': 'x', 'b': 'y/z'}))
+        r.add('GET', '/foo/<:int>', m.j)
+        self.assertEqual(r.resolve('GET', '/foo/1'), (m.j, [1], {}))
+
+    def test_trie_long_path(self):
+        r = ice.Router('trie')
+        m = mock.Mock()
+        r.add('GET', '/<p:path>/x', m.f)
+        r.add('GET', '/<p:path>/y/<q:path>/z', m.g)
+        index = r._build_wildcard_index('GET')
+        r._wildcard_index['GET'] = index
+        for path in ('/a' * 30000, '/y' * 30000):
+            with mock.patch.object(index, '_search',
+                                   wraps=index._search) as search:
+                self.assertIsNone(r.resolve('GET', path))
+            self.assertLess(search.call_count, 3 * 30000)
+        self.assertEqual(r.resolve('GET', '/a' * 30000 + '/y/b/z'),
+                         (m.g, [], {'p': '/'.join(['a'] * 30000),
+                                    'q': 'b'}))
+
+    def test_engines_agree(self):
+        patterns = [
+            '/<>', '/<:int>', '/<:path>', '/foo/<>', '/foo/<:+int>',
+            '/foo/<:-int>/bar', '/<>/<>/', '/<:path>/<>', '/<>-<:int>',
+            '/a<:path>', '//<>', '/foo/<!>/<:path>', '/<>/bar', '/foo/<>',
+            '/a/<x:int>', '/a/<p:path>', '/<:path>/b', '/a/<>-<:int>',
+        ]
+        paths = [
+            '/', '//', '/foo', '/foo/', '/foo/bar', '/foo/0', '/foo/-1',
+            '/foo/-1/bar', '/foo/01', '/1', '/x/y/', '/x/y/z', '/a/b',
+            '/ab/c', '/x-1', '/x-y', '//x', '/foo/x/a/b', '/a//b/c',
+            '/a/5\n', '/a/b\nc', '/a/b\n', '/a\n/b', '/a/b\n/b', '/\n',
+            '/a/x-1\n', '/a/x\n-1', '/foo/\n', '/foo/1\n\n',
+        ]
+        routers = [ice.Router(e) for e in ('linear', 'compiled', 'trie')]
+        for i, pattern in enumerate(patterns):
+            for r in routers:
+                r.add('GET', pattern, i)
+            for path in paths:
+                results = [r.resolve('GET', path) for r in routers]
+                self.assertEqual(results[1], results[0], (pattern, path))
+                self.assertEqual(results[2], results[0], (pattern, path))
+
+    # Route cache tests
+
+    def test_cache_disabled(self):
+        self.assertIsNone(ice.Router().cache)
+
+    def test_cache(self):
+        r = ice.Router(cache_size=2)
+        m = mock.Mock()
+        r.add('GET', '/foo', m.f)
+        r.add('GET', '/<:int>', m.g)
+        self.assertEqual(r.resolve('GET', '/1'), (m.g, [1], {}))
+        self.assertEqual(r.resolve('GET', '/1'), (m.g, [1], {}))
+        self.assertIsNone(r.resolve('GET', '/bar'))
+        self.assertIsNone(r.resolve('GET', '/bar'))
+        self.assertEqual(r.resolve('GET', '/foo'), (m.f, [], {}))
+        self.assertEqual((r.cache.hits, r.cache.misses), (2, 2))
+        r.resolve('GET', '/2')
+        self.assertEqual(r.cache.evictions, 1)
+
+    def test_cache_returns_copies(self):
+        r = ice.Router(cache_size=2)
+        m = mock.Mock()
+        r.add('GET', '/<>/<b>', m.f)
+        r.resolve('GET', '/foo/bar')[1].append('baz')
+        r.resolve('GET', '/foo/bar')[2]['b'] = 'baz'
+        self.assertEqual(r.resolve('GET', '/foo/bar'),
+                         (m.f, ['foo'], {'b': 'bar'}))
+
+    def test_cache_invalidated_by_add(self):
+        r = ice.Router(cache_size=2)
+        m = mock.Mock()
+        self.assertIsNone(r.resolve('GET', '/1'))
+        r.add('GET', '/<:int>', m.f)
+        self.assertEqual(r.resolve('GET', '/1'), (m.f, [1], {}))
+        r.add('GET', '/(.*)', m.g)
+        self.assertEqual(r.resolve('GET', '/1'), (m.f, [1], {}))
+        r.add('GET', '/1', m.h)
+        self.assertEqual(r.resolve('GET', '/1'), (m.h, [], {}))
+
+    # Method index tests
+
+    def test_contains_method(self):
+        r = ice.Router()
+        m = mock.Mock()
+        self.assertFalse(r.contains_method('GET'))
+        r.add('GET', '/foo', m.f)
+        r.add('POST', '/<>', m.g)
+        r.add('PUT', '/(.*)', m.h)
+        self.assertTrue(r.contains_method('GET'))
+        self.assertTrue(r.contains_method('POST'))
+        self.assertTrue(r.contains_method('PUT'))
+        self.assertFalse(r.contains_method('DELETE'))
+        # Resolving requests must not register methods.
+        r.resolve('DELETE', '/foo')
+        self.assertFalse(r.contains_method('DELETE'))
+
+    def test_allowed_methods(self):
+        r = ice.Router()
+        m = mock.Mock()
+        r.add('GET', '/foo', m.f)
+        r.add('POST', '/<>', m.g)
+        r.add('PUT', '/foo/(.*)', m.h)
+        self.assertEqual(r.allowed_methods('/foo'), ['GET', 'POST'])
+        self.assertEqual(r.allowed_methods('/bar'), ['POST'])
+        self.assertEqual(r.allowed_methods('/foo/bar'), ['PUT'])
+        self.assertEqual(r.allowed_methods('/bar/baz'), [])
+
+    def test_allowed_methods_exclude(self):
+        r = ice.Router()
+        m = mock.Mock()
+        r.add('GET', '/foo', m.f)
+        r.add('POST', '/<>', m.g)
+        r.add('PUT', '/(.*)', m.h)
+        with mock.patch.object(r, '_resolve_non_literal_route',
+                               wraps=r._resolve_non_literal_route) as resolve:
+            self.assertEqual(r.allowed_methods('/bar', 'PUT'), ['POST'])
+        resolve.assert_called_once_with('POST', '/bar')
+        self.assertEqual(r.allowed_methods('/foo', 'GET'),
+                         ['GET', 'POST', 'PUT'])
+
+    # Frozen router tests
+
+    def test_freeze(self):
+        for engine in ('linear', 'compiled', 'trie'):
+            r = ice.Router(engine)
+            m = mock.Mock()
+            r.add('GET', '/foo', m.f)
+            r.add('GET', '/<:int>', m.g)
+            r.add('POST', '/(.*)', m.h)
+            r.freeze()
+            r.freeze()
+            self.assertTrue(r.frozen)
+            self.assertEqual(r.resolve('GET', '/foo'), (m.f, [], {}))
+            self.assertEqual(r.resolve('GET', '/1'), (m.g, [1], {}))
+            self.assertEqual(r.resolve('POST', '/foo'), (m.h, ['foo'], {}))
+            self.assertIsNone(r.resolve('PUT', '/foo'))
+            self.assertEqual(r.allowed_methods('/foo'), ['GET', 'POST'])
+            self.assertFalse(r.contains_method('PUT'))
+
+    def test_add_to_frozen_router(self):
+        r = ice.Router()
+        r.freeze()
+        with self.assertRaises(ice.LogicError) as cm:
+            r.add('GET', '/', mock.Mock())
+        self.assertEqual(str(cm.exception),
+                         'Cannot add route to frozen router')
+
+    # Regex route index tests
+
+    def test_regex_route_buckets(self):
+        r = ice.Router()
+        m = mock.Mock()
+        r.add('GET', r'^/reports/(\d+)/csv$', m.f)
+        r.add('GET', r'/(\d+)/csv$', m.g)
+        r.add('GET', r'^/static/(.*)$', m.h)
+        r.add('GET', r'^/reports/(1)/csv$', m.i)
+        r.add('GET', r'^/rep(.*)$', m.j)
+        self.assertEqual(r.resolve('GET', '/reports/1/csv'),
+                         (m.j, ['orts/1/csv'], {}))
+        self.assertEqual(r.resolve('GET', '/static/1/csv'),
+                         (m.h, ['1/csv'], {}))
+        self.assertEqual(r.resolve('GET', '/foo/1/csv'), (m.g, ['1'], {}))
+        self.assertEqual(r.resolve('GET', '/reports'), (m.j, ['orts'], {}))
+        self.assertIsNone(r.resolve('GET', '/static'))
+
+    def test_regex_route_buckets_order(self):
+        r = ice.Router()
+        m = mock.Mock()
+        r.add('GET', r'^/reports/(\d+)/csv$', m.f)
+        r.add('GET', r'/(\d+)/csv$', m.g)
+        r.add('GET', r'^/reports/(2)/csv$', m.h)
+        self.assertEqual(r.resolve('GET', '/reports/1/csv'),
+                         (m.g, ['1'], {}))
+        self.assertEqual(r.resolve('GET', '/reports/2/csv'),
+                         (m.h, ['2'], {}))
+        self.assertEqual(r.resolve('GET', '/foo/3/csv'), (m.g, ['3'], {}))
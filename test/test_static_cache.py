@@ -0,0 +1,172 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2014-2017 Susam Pal
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Tests for class StaticCache."""
+
+
+import os
+import tempfile
+import unittest
+import unittest.mock
+import ice
+
+
+class StaticCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.root = root.name
+
+    def write(self, name, content):
+        path = os.path.join(self.root, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def test_load(self):
+        c = ice.StaticCache(1024)
+        path = self.write('foo.css', b'body {}')
+        e = c.load(path)
+        self.assertEqual(e.content, b'body {}')
+        self.assertEqual(e.media_type, 'text/css')
+        self.assertTrue(e.etag.startswith('"'))
+        self.assertTrue(e.last_modified.endswith(' GMT'))
+        self.assertIn(path, c)
+        self.assertEqual(c.size, 7)
+
+    def test_load_skips_large_file(self):
+        c = ice.StaticCache(1024, max_file_size=4)
+        path = self.write('foo.txt', b'hello')
+        self.assertIsNone(c.load(path))
+        self.assertNotIn(path, c)
+        self.assertEqual(c.size, 0)
+
+    def test_load_missing_file(self):
+        c = ice.StaticCache(1024)
+        self.assertIsNone(c.load(os.path.join(self.root, 'foo.txt')))
+        self.assertIsNone(c.load(self.root))
+        self.assertEqual(len(c), 0)
+
+    def test_lookup(self):
+        c = ice.StaticCache(1024)
+        path = self.write('foo.txt', b'foo')
+        self.assertIsNone(c.lookup(path))
+        e = c.load(path)
+        self.assertIs(c.lookup(path), e)
+        self.assertEqual(c.hits, 1)
+        self.assertEqual(c.misses, 1)
+
+    def test_evicts_least_recently_used_by_size(self):
+        c = ice.StaticCache(10)
+        foo = self.write('foo.txt', b'foo')
+        bar = self.write('bar.txt', b'barbar')
+        baz = self.write('baz.txt', b'bazbaz')
+        c.load(foo)
+        c.load(bar)
+        c.lookup(foo)
+        c.load(baz)
+        self.assertIn(foo, c)
+        self.assertNotIn(bar, c)
+        self.assertIn(baz, c)
+        self.assertEqual(c.size, 9)
+        self.assertEqual(c.evictions, 1)
+
+    def test_load_skips_file_larger_than_cache(self):
+        c = ice.StaticCache(4)
+        path = self.write('foo.txt', b'hello')
+        self.assertIsNone(c.load(path))
+        self.assertNotIn(path, c)
+        self.assertEqual(c.size, 0)
+
+    def test_fits(self):
+        c = ice.StaticCache(8, max_file_size=4)
+        self.assertTrue(c.fits(4))
+        self.assertFalse(c.fits(5))
+        c = ice.StaticCache(4, max_file_size=8)
+        self.assertTrue(c.fits(4))
+        self.assertFalse(c.fits(5))
+
+    def test_put_replaces_entry(self):
+        c = ice.StaticCache(1024)
+        path = self.write('foo.txt', b'foo')
+        c.load(path)
+        self.write('foo.txt', b'foobar')
+        c.load(path)
+        self.assertEqual(len(c), 1)
+        self.assertEqual(c.size, 6)
+
+    def test_discard_and_clear(self):
+        c = ice.StaticCache(1024)
+        foo = self.write('foo.txt', b'foo')
+        bar = self.write('bar.txt', b'barbar')
+        c.load(foo)
+        c.load(bar)
+        c.discard(foo)
+        c.discard(foo)
+        self.assertEqual(c.size, 6)
+        c.clear()
+        self.assertEqual(len(c), 0)
+        self.assertEqual(c.size, 0)
+
+    def test_lookup_discards_changed_file(self):
+        c = ice.StaticCache(1024, check_interval=0)
+        path = self.write('foo.txt', b'foo')
+        c.load(path)
+        os.utime(path, (1500000000, 1500000000))
+        self.assertIsNone(c.lookup(path))
+        self.assertNotIn(path, c)
+        self.assertEqual(c.size, 0)
+        self.assertEqual(c.misses, 1)
+
+    def test_lookup_discards_deleted_file(self):
+        c = ice.StaticCache(1024, check_interval=0)
+        path = self.write('foo.txt', b'foo')
+        c.load(path)
+        os.remove(path)
+        self.assertIsNone(c.lookup(path))
+        self.assertNotIn(path, c)
+
+    def test_lookup_throttles_checks(self):
+        c = ice.StaticCache(1024, check_interval=60)
+        path = self.write('foo.txt', b'foo')
+        e = c.load(path)
+        with unittest.mock.patch('os.stat') as stat:
+            self.assertIs(c.lookup(path), e)
+        self.assertFalse(stat.called)
+        checked = e.checked + 60
+        with unittest.mock.patch('time.monotonic', return_value=checked), \
+                unittest.mock.patch('os.stat', wraps=os.stat) as stat:
+            self.assertIs(c.lookup(path), e)
+        self.assertEqual(stat.call_count, 1)
+        self.assertEqual(e.checked, checked)
+
+    def test_lookup_without_checks(self):
+        c = ice.StaticCache(1024, check_interval=None)
+        path = self.write('foo.txt', b'foo')
+        e = c.load(path)
+        os.remove(path)
+        with unittest.mock.patch('os.stat') as stat:
+            self.assertIs(c.lookup(path), e)
+        self.assertFalse(stat.called)
@@ -105,6 +105,14 @@ class WildcardTest(unittest.TestCase):
         self.assertEqual(wildcard.value('0'), 0)
         self.assertEqual(wildcard.value('10'), 10)
 
+    def test_converter(self):
+        self.assertIsNone(ice.Wildcard('<>').converter)
+        self.assertIsNone(ice.Wildcard('<a:str>').converter)
+        self.assertIsNone(ice.Wildcard('<a:path>').converter)
+        self.assertIs(ice.Wildcard('<a:int>').converter, int)
+        self.assertIs(ice.Wildcard('<:+int>').converter, int)
+        self.assertIs(ice.Wildcard('<:-int>').converter, int)
+
     def test_name_validation(self):
         # No errors on positive test cases
         ice.Wildcard('<>')
@@ -61,6 +61,14 @@ class WildcardRouteTest(unittest.TestCase):
         self.assertEqual(ice.WildcardRoute.tokens('/foo/<bar/baz>'),
                          ['/', 'foo', '/', '<', 'bar', '/', 'baz', '>'])
 
+    def test_arguments(self):
+        m = mock.Mock()
+        r = ice.WildcardRoute('/<:int>/<!>/<a:-int>/<b:path>', m)
+        self.assertEqual(r.arguments(('1', 'foo', '-2', 'bar/baz')),
+                         (m, [1], {'a': -2, 'b': 'bar/baz'}))
+        self.assertEqual(r.plain_regex, r'/(?:0|[1-9][0-9]*)/(?:[^/]+)/'
+                                         r'(?:0|-?[1-9][0-9]*)/(?:.+)')
+
     def test_no_wildcard(self):
         m = mock.Mock()
         r = ice.WildcardRoute('/foo', m)